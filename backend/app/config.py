@@ -0,0 +1,73 @@
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Data source
+DATA_PATH = os.getenv('BIKE_DATA_PATH')  # Explicit CSV path, overrides the lookup list
+
+# Store money columns as float32 (see app/services/dataset_schema.py for the precision limits)
+FLOAT32_MEASURES = _env_bool('BIKE_FLOAT32_MEASURES', False)
+
+SAMPLE_ROWS = int(os.getenv('BIKE_SAMPLE_ROWS', 100000))  # Synthetic fallback when no CSV is found
+SAMPLE_SEED = int(os.getenv('BIKE_SAMPLE_SEED', 0))
+
+# Columnar snapshot of the CSV (see app/services/snapshot_service.py)
+SNAPSHOT_ENABLED = _env_bool('BIKE_SNAPSHOT_ENABLED', True)
+SNAPSHOT_DIR = os.getenv('BIKE_SNAPSHOT_DIR')  # Defaults to "<csv dir>/.snapshot"
+SNAPSHOT_MMAP = _env_bool('BIKE_SNAPSHOT_MMAP', True)
+INGEST_DIR = os.getenv('BIKE_INGEST_DIR')  # Ingested sales batches, defaults to "<csv dir>/ingest"
+RELOAD_INTERVAL_SECONDS = float(os.getenv('BIKE_RELOAD_INTERVAL_SECONDS', 0))  # 0 disables the watcher
+
+# Aggregate the CSV by partitioned map-reduce instead of loading it (see app/services/outofcore_service.py)
+OUT_OF_CORE = _env_bool('BIKE_OUT_OF_CORE', False)
+OUT_OF_CORE_MEMORY_MB = int(os.getenv('BIKE_OUT_OF_CORE_MEMORY_MB', 1024))
+OUT_OF_CORE_WORKERS = int(os.getenv('BIKE_OUT_OF_CORE_WORKERS', os.cpu_count() or 1))
+# Year/month Parquet partitions for out-of-core queries (see app/services/partition_store.py)
+PARTITIONS_ENABLED = _env_bool('BIKE_PARTITIONS_ENABLED', True)
+PARTITION_DIR = os.getenv('BIKE_PARTITION_DIR')  # Defaults to "<csv dir>/.partitions"
+PARTITION_CACHE_MB = int(os.getenv('BIKE_PARTITION_CACHE_MB', 256))
+
+# Approximate queries (approximate=true): stratified sample and sketches (see app/services/synopsis.py)
+APPROX_SAMPLE_FRACTION = float(os.getenv('BIKE_APPROX_SAMPLE_FRACTION', 0.01))
+APPROX_EXACT_REFRESH = _env_bool('BIKE_APPROX_EXACT_REFRESH', True)  # Compute the exact answer in the background
+
+# Day x country x age group x category pre-aggregation (see app/services/cube_service.py)
+CUBE_ENABLED = _env_bool('BIKE_CUBE_ENABLED', True)
+
+# Shared result cache (see app/services/cache_service.py)
+CACHE_ENABLED = _env_bool('BIKE_CACHE_ENABLED', True)
+CACHE_MAX_BYTES = int(os.getenv('BIKE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.getenv('BIKE_CACHE_MAX_ENTRIES', 4096))
+CACHE_TTL_SECONDS = float(os.getenv('BIKE_CACHE_TTL_SECONDS', 300))
+
+# Executor for blocking pandas work (see app/services/executor_service.py)
+EXECUTOR_MODE = os.getenv('BIKE_EXECUTOR_MODE', 'thread')  # "thread" or "process"
+EXECUTOR_WORKERS = int(os.getenv('BIKE_EXECUTOR_WORKERS', min(4, os.cpu_count() or 1)))
+EXECUTOR_MAX_QUEUE = int(os.getenv('BIKE_EXECUTOR_MAX_QUEUE', 64))
+EXECUTOR_TIMEOUT_SECONDS = float(os.getenv('BIKE_EXECUTOR_TIMEOUT_SECONDS', 30))
+EXECUTOR_RETRY_AFTER_SECONDS = int(os.getenv('BIKE_EXECUTOR_RETRY_AFTER_SECONDS', 1))
+# Identical concurrent calls share one computation (see app/services/singleflight.py)
+COALESCE_ENABLED = _env_bool('BIKE_COALESCE_ENABLED', True)
+
+# Fit RFM customer segments in the background whenever a dataset is published (see app/services/segmentation_service.py)
+RFM_PRETRAIN = _env_bool('BIKE_RFM_PRETRAIN', True)
+
+# Worker processes for large forecast fits (see app/services/forecast_service.py)
+FORECAST_WORKERS = int(os.getenv('BIKE_FORECAST_WORKERS', os.cpu_count() or 1))
+
+# Analytics responses (see app/routes/responses.py)
+RESPONSE_ETAGS = _env_bool('BIKE_RESPONSE_ETAGS', True)
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv('BIKE_RESPONSE_COMPRESS_MIN_BYTES', 1024))
+
+# Rows serialized at a time by /api/reports/export (see app/services/export_service.py)
+EXPORT_CHUNK_ROWS = int(os.getenv('BIKE_EXPORT_CHUNK_ROWS', 50000))
+
+# Request instrumentation: latency histograms, /metrics and the slow-request log (see app/services/metrics_service.py)
+METRICS_ENABLED = _env_bool('BIKE_METRICS_ENABLED', True)
+SLOW_REQUEST_SECONDS = float(os.getenv('BIKE_SLOW_REQUEST_MS', 1000)) / 1000
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import date
 
@@ -43,4 +43,47 @@ class FilterRequest(BaseModel):
     end_date: Optional[str] = None
     countries: Optional[List[str]] = None
     age_groups: Optional[List[str]] = None
-    product_categories: Optional[List[str]] = None
\ No newline at end of file
+    product_categories: Optional[List[str]] = None
+
+class SummaryRequest(FilterRequest):
+    """Filters of the dashboard summary, the only endpoint that can answer with an estimate"""
+    # Not a filter: left out of dict() so that it never reaches filter dicts or cache keys
+    approximate: bool = Field(False, exclude=True)
+
+class DashboardBatchRequest(BaseModel):
+    filters: FilterRequest = FilterRequest()
+    panels: Optional[List[str]] = None  # None means every panel
+
+class KPICompareRequest(BaseModel):
+    filters: FilterRequest = FilterRequest()
+    comparisons: Optional[List[str]] = None  # None means every comparison period
+
+class ExportRequest(BaseModel):
+    filters: FilterRequest = FilterRequest()
+    format: str = "csv"  # csv, ndjson or arrow
+    gzip: bool = False
+
+class QueryMeasure(BaseModel):
+    column: str  # Revenue, Profit, Cost or Order_Quantity
+    agg: str = "sum"  # sum, mean, count, min or max
+
+class QueryRequest(BaseModel):
+    filters: FilterRequest = FilterRequest()
+    group_by: List[str] = []
+    measures: List[QueryMeasure] = [QueryMeasure(column="Revenue")]
+    sort_by: Optional[str] = None  # a response column; None keeps the dimension order
+    descending: bool = True
+    limit: Optional[int] = Field(None, ge=1)
+    offset: int = Field(0, ge=0)
+
+class ForecastRequest(BaseModel):
+    filters: FilterRequest = FilterRequest()
+    group_by: List[str] = []  # e.g. ["Country", "Product_Category", "Product"]; empty for one overall series
+    measure: str = "Revenue"
+    horizon: int = 12  # months
+    include_history: bool = False
+    limit: Optional[int] = Field(None, ge=1)
+    offset: int = Field(0, ge=0)
+
+class IngestRequest(BaseModel):
+    rows: List[SalesData]
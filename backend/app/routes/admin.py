@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException
+from app.routes.compute import run_compute
+from app.services.cache_service import result_cache
+from app.services.data_service import data_service
+from app.services.executor_service import compute_executor
+from app.services.metrics_service import metrics_service
+from app.services.singleflight import single_flight
+
+router = APIRouter()
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get result cache counters"""
+    try:
+        return result_cache.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop every cached result"""
+    try:
+        result_cache.clear()
+        return result_cache.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/executor")
+async def get_executor_stats():
+    """Get compute executor load and counters"""
+    try:
+        return compute_executor.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/coalescing")
+async def get_coalescing_stats():
+    """Get how many computations were shared by identical concurrent requests"""
+    try:
+        return single_flight.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/latency")
+async def get_latency_summary():
+    """Get request counts and latency percentiles per route"""
+    try:
+        return metrics_service.summary()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/dataset")
+async def get_dataset_info():
+    """Get the version and source of the dataset being served"""
+    try:
+        return data_service.get_dataset_info()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/memory")
+async def get_memory_report():
+    """Get bytes held per dataset column and by the derived indexes"""
+    try:
+        return data_service.get_memory_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reload")
+async def reload_dataset():
+    """Reload the dataset if the source CSV changed"""
+    try:
+        reloaded = await run_compute(data_service.reload_if_changed, coalesce=False)
+        return {"reloaded": reloaded, **data_service.get_dataset_info()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
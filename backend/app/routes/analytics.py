@@ -1,15 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from app.routes.compute import run_compute
+from app.routes.responses import FastJSONRoute
 from app.services.data_service import data_service
-from app.models.schemas import FilterRequest
+from app.services.forecast_service import forecast_service
+from app.services.segmentation_service import SegmentationPendingError, segmentation_service
+from app.models.schemas import FilterRequest, ForecastRequest
+from typing import Dict, List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+SEGMENTATION_RETRY_AFTER_SECONDS = 5
+SEGMENTATION_METHODS = ('value', 'rfm')
+
+async def compute_segmentation(method: str, filter_dict: Optional[Dict] = None):
+    # "value" buckets customers by revenue; "rfm" reads the background-trained k-means model
+    if method not in SEGMENTATION_METHODS:
+        raise ValueError(f"Unknown segmentation method: {method}. Use one of {', '.join(SEGMENTATION_METHODS)}")
+    if method == 'value':
+        return await run_compute(data_service.get_customer_segmentation, filter_dict)
+    try:
+        return await run_compute(segmentation_service.get_rfm_segmentation, filter_dict)
+    except SegmentationPendingError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(SEGMENTATION_RETRY_AFTER_SECONDS)})
 
 @router.get("/products/top")
 async def get_top_products():
     """Get top products by revenue"""
     try:
-        products = data_service.get_top_products()
+        products = await run_compute(data_service.get_top_products)
         return products
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -18,8 +40,10 @@ async def get_filtered_top_products(filters: FilterRequest):
     """Get top products with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        products = data_service.get_top_products(filter_dict)
+        products = await run_compute(data_service.get_top_products, filter_dict)
         return products
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -27,8 +51,10 @@ async def get_filtered_top_products(filters: FilterRequest):
 async def get_seasonal_trends():
     """Get seasonal purchasing trends"""
     try:
-        seasonal = data_service.get_seasonal_trends()
+        seasonal = await run_compute(data_service.get_seasonal_trends)
         return seasonal
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -37,27 +63,37 @@ async def get_filtered_seasonal_trends(filters: FilterRequest):
     """Get seasonal trends with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        seasonal = data_service.get_seasonal_trends(filter_dict)
+        seasonal = await run_compute(data_service.get_seasonal_trends, filter_dict)
         return seasonal
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/customer-segments")
-async def get_customer_segmentation():
-    """Get customer segmentation analysis"""
+async def get_customer_segmentation(method: str = "value"):
+    """Get customer segmentation analysis (method=rfm for recency/frequency/monetary clusters)"""
     try:
-        segments = data_service.get_customer_segmentation()
+        segments = await compute_segmentation(method)
         return segments
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/customer-segments")
-async def get_filtered_customer_segmentation(filters: FilterRequest):
+async def get_filtered_customer_segmentation(filters: FilterRequest, method: str = "value"):
     """Get customer segmentation with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        segments = data_service.get_customer_segmentation(filter_dict)
+        segments = await compute_segmentation(method, filter_dict)
         return segments
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -65,17 +101,37 @@ async def get_filtered_customer_segmentation(filters: FilterRequest):
 async def get_filter_options():
     """Get available filter options"""
     try:
-        if data_service.df is None:
-            return {"countries": [], "age_groups": [], "product_categories": []}
-        
-        return {
-            "countries": sorted(data_service.df['Country'].unique().tolist()),
-            "age_groups": sorted(data_service.df['Age_Group'].unique().tolist()),
-            "product_categories": sorted(data_service.df['Product_Category'].unique().tolist()),
-            "date_range": {
-                "min_date": data_service.df['Date'].min().strftime('%Y-%m-%d'),
-                "max_date": data_service.df['Date'].max().strftime('%Y-%m-%d')
-            }
-        }
+        options = await run_compute(data_service.get_filter_options)
+        return options
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/forecast")
+async def get_forecast(group_by: List[str] = Query([]), measure: str = "Revenue", horizon: int = 12):
+    """Get monthly forecasts with prediction intervals, per series of the group_by dimensions"""
+    try:
+        forecast = await run_compute(forecast_service.forecast, None, tuple(group_by), measure, horizon)
+        return forecast
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/forecast")
+async def get_filtered_forecast(request: ForecastRequest):
+    """Get forecasts with filters, optional history and pagination over the series"""
+    try:
+        filter_dict = request.filters.dict(exclude_none=True)
+        forecast = await run_compute(forecast_service.forecast, filter_dict, tuple(request.group_by), request.measure,
+                                     request.horizon, request.include_history, request.limit, request.offset)
+        return forecast
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,26 @@
+from fastapi import HTTPException
+from app import config
+from app.services.executor_service import ComputeOverloadedError, ComputeTimeoutError, compute_executor
+from app.services.singleflight import call_key, single_flight
+from typing import Any, Callable
+
+async def run_compute(fn: Callable, *args, coalesce: bool = True, **kwargs) -> Any:
+    """Run a blocking service call on the compute executor.
+    
+    Identical concurrent calls (same method, canonical arguments and dataset
+    version) share one computation unless ``coalesce`` is off, which calls
+    with side effects must set.
+    """
+    key = call_key(fn, args, kwargs) if coalesce and config.COALESCE_ENABLED else None
+    try:
+        if key is None:
+            return await compute_executor.run(fn, *args, **kwargs)
+        return await single_flight.run(key, lambda: compute_executor.run(fn, *args, **kwargs))
+    except ComputeOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(config.EXECUTOR_RETRY_AFTER_SECONDS)}
+        )
+    except ComputeTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
@@ -1,26 +1,42 @@
 from fastapi import APIRouter, HTTPException
+from app.routes.compute import run_compute
+from app.routes.responses import FastJSONResponse, FastJSONRoute
+from app.services.dashboard_service import dashboard_service
 from app.services.data_service import data_service
-from app.models.schemas import FilterRequest
-from typing import Dict, Any
+from app.models.schemas import DashboardBatchRequest, FilterRequest, SummaryRequest
+from typing import Dict, Any, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/summary")
 async def get_dashboard_summary():
     """Get dashboard summary data"""
     try:
-        summary = data_service.get_summary_stats()
+        summary = await run_compute(data_service.get_summary_stats)
         return summary
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/summary")
-async def get_filtered_dashboard_summary(filters: FilterRequest):
-    """Get dashboard summary with filters"""
+async def get_filtered_dashboard_summary(filters: SummaryRequest):
+    """Get dashboard summary with filters (estimated, with confidence intervals, when approximate is set)"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        summary = data_service.get_summary_stats(filter_dict)
+        if filters.approximate:
+            summary = await run_compute(data_service.get_approximate_summary_stats, filter_dict)
+            if 'exact_pending' in summary:
+                # An estimate: the exact statistics replace it for the same request
+                # and dataset version, so it must not be revalidated by ETag
+                return FastJSONResponse(summary, headers={'Cache-Control': 'no-store'})
+            return summary
+        summary = await run_compute(data_service.get_summary_stats, filter_dict)
         return summary
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -28,8 +44,10 @@ async def get_filtered_dashboard_summary(filters: FilterRequest):
 async def get_revenue_trend():
     """Get revenue trend by month"""
     try:
-        trend = data_service.get_revenue_by_month()
+        trend = await run_compute(data_service.get_revenue_by_month)
         return trend
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,8 +56,37 @@ async def get_filtered_revenue_trend(filters: FilterRequest):
     """Get revenue trend with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        trend = data_service.get_revenue_by_month(filter_dict)
+        trend = await run_compute(data_service.get_revenue_by_month, filter_dict)
         return trend
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/timeseries")
+async def get_timeseries(granularity: str = "month", window: Optional[int] = None):
+    """Get measures per day/week/month/quarter/year, with an optional rolling mean over `window` buckets"""
+    try:
+        series = await run_compute(data_service.get_timeseries, None, granularity, window)
+        return series
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/timeseries")
+async def get_filtered_timeseries(filters: FilterRequest, granularity: str = "month", window: Optional[int] = None):
+    """Get the time series with filters"""
+    try:
+        filter_dict = filters.dict(exclude_none=True)
+        series = await run_compute(data_service.get_timeseries, filter_dict, granularity, window)
+        return series
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -47,8 +94,10 @@ async def get_filtered_revenue_trend(filters: FilterRequest):
 async def get_geographic_data():
     """Get geographic performance data"""
     try:
-        geo_data = data_service.get_geographic_performance()
+        geo_data = await run_compute(data_service.get_geographic_performance)
         return geo_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -57,8 +106,10 @@ async def get_filtered_geographic_data(filters: FilterRequest):
     """Get geographic performance with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        geo_data = data_service.get_geographic_performance(filter_dict)
+        geo_data = await run_compute(data_service.get_geographic_performance, filter_dict)
         return geo_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -66,8 +117,10 @@ async def get_filtered_geographic_data(filters: FilterRequest):
 async def get_age_group_data():
     """Get age group analysis"""
     try:
-        age_data = data_service.get_age_group_analysis()
+        age_data = await run_compute(data_service.get_age_group_analysis)
         return age_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -76,7 +129,23 @@ async def get_filtered_age_group_data(filters: FilterRequest):
     """Get age group analysis with filters"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        age_data = data_service.get_age_group_analysis(filter_dict)
+        age_data = await run_compute(data_service.get_age_group_analysis, filter_dict)
         return age_data
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def get_dashboard_batch(request: DashboardBatchRequest):
+    """Get several dashboard panels computed from one filtered view"""
+    try:
+        filter_dict = request.filters.dict(exclude_none=True)
+        batch = await run_compute(dashboard_service.get_batch, filter_dict, request.panels)
+        return batch
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
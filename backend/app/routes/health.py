@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.data_service import data_service
+
+router = APIRouter()
+
+# Seconds clients are told to wait while the dataset loads
+LOADING_RETRY_AFTER_SECONDS = 5
+
+
+class ReadinessMiddleware:
+    """ASGI middleware answering API requests with 503 until the initial dataset load has finished"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith('/api/') and not data_service.is_loaded:
+            # Apps served without the lifespan (e.g. some test clients) start the load on first request
+            data_service.start_loading()
+            response = JSONResponse(
+                {"detail": f"Dataset is loading ({data_service.load_phase})"},
+                status_code=503,
+                headers={"Retry-After": str(LOADING_RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+@router.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving HTTP (the dataset may still be loading)"""
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness():
+    """Whether the dataset is loaded from its source, with load progress, version and row count (503 until then)"""
+    status = data_service.get_load_status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import IngestRequest
+from app.routes.compute import run_compute
+from app.services.data_service import data_service
+
+router = APIRouter()
+
+@router.post("")
+async def ingest_sales(request: IngestRequest):
+    """Append new sales rows to the dataset without a full reload"""
+    try:
+        records = [row.dict() for row in request.rows]
+        return await run_compute(data_service.ingest, records, coalesce=False)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
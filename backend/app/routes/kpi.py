@@ -1,16 +1,20 @@
 from fastapi import APIRouter, HTTPException
+from app.routes.compute import run_compute
+from app.routes.responses import FastJSONRoute
 from app.services.kpi_service import kpi_service
-from app.models.schemas import FilterRequest, KPIResponse
+from app.models.schemas import FilterRequest, KPICompareRequest, KPIResponse
 from typing import List
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/main", response_model=List[KPIResponse])
 async def get_main_kpis():
     """Get main KPIs for the dashboard"""
     try:
-        kpis = kpi_service.calculate_main_kpis()
+        kpis = await run_compute(kpi_service.calculate_main_kpis)
         return kpis
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -19,8 +23,10 @@ async def get_filtered_kpis(filters: FilterRequest):
     """Get main KPIs with filters applied"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        kpis = kpi_service.calculate_main_kpis(filter_dict)
+        kpis = await run_compute(kpi_service.calculate_main_kpis, filter_dict)
         return kpis
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -28,8 +34,10 @@ async def get_filtered_kpis(filters: FilterRequest):
 async def get_performance_metrics():
     """Get detailed performance metrics"""
     try:
-        metrics = kpi_service.get_performance_metrics()
+        metrics = await run_compute(kpi_service.get_performance_metrics)
         return metrics
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -38,7 +46,23 @@ async def get_filtered_performance_metrics(filters: FilterRequest):
     """Get performance metrics with filters applied"""
     try:
         filter_dict = filters.dict(exclude_none=True)
-        metrics = kpi_service.get_performance_metrics(filter_dict)
+        metrics = await run_compute(kpi_service.get_performance_metrics, filter_dict)
         return metrics
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/compare")
+async def compare_kpis(request: KPICompareRequest):
+    """Compare KPIs of the filtered period with previous period, YoY, MoM and trailing windows"""
+    try:
+        filter_dict = request.filters.dict(exclude_none=True)
+        comparisons = tuple(request.comparisons) if request.comparisons else None
+        return await run_compute(kpi_service.compare_periods, filter_dict, comparisons)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
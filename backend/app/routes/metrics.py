@@ -0,0 +1,89 @@
+import time
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services.cache_service import result_cache
+from app.services.data_service import data_service
+from app.services.executor_service import compute_executor
+from app.services.metrics_service import metrics_service
+from app.services.singleflight import single_flight
+
+router = APIRouter()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Latency is recorded per method, route template and status, together
+    with the per-phase breakdown collected while the request ran. Slow and
+    failed requests are logged with their canonical filters.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        metrics, token = metrics_service.start_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics_service.finish_request(token, metrics, scope['method'], _route_template(scope), status,
+                                           time.perf_counter() - start)
+
+
+def _route_template(scope) -> str:
+    """Matched route's full path template, so path parameters don't multiply the series"""
+    route = scope.get('route')
+    if route is None:
+        return 'unmatched'
+    path = scope['path']
+    try:
+        # Included routers may report their route path without the router prefix
+        matched = route.path_format.format(**scope.get('path_params', {}))
+    except (AttributeError, KeyError, IndexError):
+        return route.path
+    prefix = path[:-len(matched)] if matched and path.endswith(matched) else ''
+    return prefix + route.path
+
+
+def _gauges():
+    cache = result_cache.stats()
+    executor = compute_executor.stats()
+    coalescing = single_flight.stats()
+    # Never wait for the initial load here: scrapes must answer while it runs
+    dataset = data_service.dataset if data_service.is_loaded else None
+    return {
+        'bike_cache_hits_total': ("Result cache hits", cache['hits']),
+        'bike_cache_misses_total': ("Result cache misses", cache['misses']),
+        'bike_cache_bytes': ("Estimated bytes held by the result cache", cache['bytes']),
+        'bike_executor_in_flight': ("Computations running or queued", executor['in_flight']),
+        'bike_executor_rejected_total': ("Computations rejected because the queue was full", executor['rejected']),
+        'bike_executor_timeouts_total': ("Computations that exceeded the timeout", executor['timeouts']),
+        'bike_compute_calls_total': ("Service calls submitted by requests", coalescing['calls']),
+        'bike_coalesced_calls_total': ("Calls that joined an identical in-flight computation", coalescing['coalesced']),
+        'bike_dataset_loaded': ("Whether the initial dataset load has finished", int(data_service.is_loaded)),
+        'bike_dataset_rows': ("Rows in the served dataset", len(dataset.df) if dataset is not None else 0)
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request latency, phase breakdown, cache and executor counters in the Prometheus text format"""
+    try:
+        return PlainTextResponse(metrics_service.render(_gauges()), media_type='text/plain; version=0.0.4')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
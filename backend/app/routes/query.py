@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from app.routes.compute import run_compute
+from app.routes.responses import FastJSONRoute
+from app.services.data_service import data_service
+from app.models.schemas import QueryRequest
+
+router = APIRouter(route_class=FastJSONRoute)
+
+@router.post("/query")
+async def run_query(request: QueryRequest):
+    """Get measures grouped by any dimensions, sorted and paginated"""
+    try:
+        filter_dict = request.filters.dict(exclude_none=True)
+        measures = tuple((measure.column, measure.agg) for measure in request.measures)
+        result = await run_compute(data_service.query, filter_dict, tuple(request.group_by), measures,
+                                   request.sort_by, request.descending, request.limit, request.offset)
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.schemas import ExportRequest
+from app.routes.compute import run_compute
+from app.services.export_service import export_service
+
+router = APIRouter()
+
+@router.post("/export")
+async def export_rows(request: ExportRequest):
+    """Stream the transactions matching the filters as CSV, NDJSON or Arrow IPC"""
+    try:
+        filter_dict = request.filters.dict(exclude_none=True)
+        export = await run_compute(export_service.prepare, filter_dict, request.format, request.gzip)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # The body is generated chunk by chunk on Starlette's thread pool while it is sent
+    return StreamingResponse(
+        export_service.stream(export),
+        media_type=export['media_type'],
+        headers={
+            'Content-Disposition': f'attachment; filename="{export["filename"]}"',
+            'X-Export-Rows': str(export['rows'])
+        }
+    )
@@ -0,0 +1,154 @@
+import functools
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app import config
+from app.services.data_service import data_service
+from app.services.filter_engine import DIMENSION_COLUMNS, canonical_filters
+from app.services.metrics_service import phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+FILTER_FIELDS = {'start_date', 'end_date', *DIMENSION_COLUMNS}
+
+
+def _default(obj: Any) -> Any:
+    # Types orjson does not encode natively
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, pd.Period)):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    NumPy arrays and scalars are written directly, without converting them
+    to Python lists first. NaN and infinity become null.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with phase('serialize'):
+            return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _canonical_body(value: Any) -> Any:
+    """Request body with equivalent filters made equal"""
+    if isinstance(value, dict):
+        if value and set(value) <= FILTER_FIELDS:
+            return canonical_filters(value)
+        return {key: _canonical_body(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_canonical_body(item) for item in value]
+    return value
+
+
+async def request_etag(request: Request) -> str:
+    """Weak ETag of a read-only request: dataset version, route, query and canonical body"""
+    body = await request.body()
+    if body:
+        try:
+            body = json.dumps(_canonical_body(json.loads(body)), sort_keys=True, default=str).encode()
+        except ValueError:
+            pass
+    digest = hashlib.sha1()
+    for part in (str(data_service.version).encode(), request.method.encode(), request.url.path.encode(),
+                 str(sorted(request.query_params.multi_items())).encode(), body):
+        digest.update(part)
+        digest.update(b'\0')
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def _vary_accept_encoding(response: Response):
+    vary = [value.strip() for value in response.headers.get('vary', '').split(',') if value.strip()]
+    if 'accept-encoding' not in (value.lower() for value in vary):
+        response.headers['vary'] = ', '.join([*vary, 'Accept-Encoding'])
+
+
+def compress_response(request: Request, response: Response) -> Response:
+    """Compress a buffered response body with brotli or gzip, as the client accepts.
+
+    Every response gets ``Vary: Accept-Encoding``, compressed or not, so a
+    shared cache never serves one encoding to every client.
+    """
+    _vary_accept_encoding(response)
+    if isinstance(response, StreamingResponse) or 'content-encoding' in response.headers:
+        return response
+    body = response.body
+    if len(body) < config.RESPONSE_COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = {coding.split(';')[0].strip() for coding in request.headers.get('accept-encoding', '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        encoding, body = 'br', brotli.compress(body, quality=4)
+    elif 'gzip' in accepted:
+        encoding, body = 'gzip', gzip.compress(body, compresslevel=5)
+    else:
+        return response
+    response.body = body
+    response.headers['content-length'] = str(len(body))
+    response.headers['content-encoding'] = encoding
+    return response
+
+
+class FastJSONRoute(APIRoute):
+    """Route for read-only analytics endpoints.
+
+    Results are encoded with ``FastJSONResponse`` directly, skipping
+    FastAPI's ``jsonable_encoder`` pass, and compressed when large. Each
+    response carries an ETag of the dataset version and the canonical
+    request; a request whose If-None-Match matches gets a 304 before any
+    computation runs. A response that sets its own Cache-Control (such as
+    an estimate that a later exact result replaces) keeps it and gets no
+    ETag.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        @functools.wraps(endpoint)
+        async def encode_result(*args, **endpoint_kwargs):
+            result = await endpoint(*args, **endpoint_kwargs)
+            return result if isinstance(result, Response) else FastJSONResponse(result)
+
+        super().__init__(path, encode_result, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            etag: Optional[str] = await request_etag(request) if config.RESPONSE_ETAGS else None
+            cache_headers = {'ETag': etag, 'Cache-Control': 'no-cache'} if etag else {}
+            if etag and _etag_matches(request, etag):
+                return Response(status_code=304, headers={**cache_headers, 'Vary': 'Accept-Encoding'})
+
+            response = await handler(request)
+            if response.status_code == 200 and 'cache-control' not in response.headers:
+                response.headers.update(cache_headers)
+            with phase('compress'):
+                return compress_response(request, response)
+
+        return route_handler
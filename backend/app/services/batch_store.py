@@ -0,0 +1,61 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from app import config
+
+INGEST_DIRNAME = 'ingest'
+
+
+def ingest_dir(csv_path: Optional[str]) -> Optional[str]:
+    """Drop directory holding ingested sales batches"""
+    if config.INGEST_DIR:
+        return config.INGEST_DIR
+    if csv_path:
+        return os.path.join(os.path.dirname(csv_path), INGEST_DIRNAME)
+    return None
+
+
+def new_batch_id() -> str:
+    """Batch ids sort in arrival order"""
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+
+def next_version(version: str, batch_id: str) -> str:
+    """Dataset version after applying a batch; the same on every process applying the same batches"""
+    return hashlib.sha1(f'{version}+{batch_id}'.encode()).hexdigest()[:12]
+
+
+def list_batches(directory: Optional[str]) -> List[str]:
+    """Ids of the batch files in the drop directory, oldest first"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.csv'))
+
+
+def read_batch(directory: str, batch_id: str) -> pd.DataFrame:
+    df = pd.read_csv(os.path.join(directory, f'{batch_id}.csv'))
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def write_batch(directory: str, df: pd.DataFrame) -> str:
+    """Persist a batch atomically and return its id"""
+    os.makedirs(directory, exist_ok=True)
+    batch_id = new_batch_id()
+    tmp_path = os.path.join(directory, f'.{batch_id}.tmp')
+    df.to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+    os.replace(tmp_path, os.path.join(directory, f'{batch_id}.csv'))
+    return batch_id
+
+
+def records_to_frame(records: List[Dict]) -> pd.DataFrame:
+    """Convert SalesData records (snake_case fields) to dataset columns"""
+    df = pd.DataFrame.from_records(records)
+    df.columns = ['_'.join(part.capitalize() for part in column.split('_')) for column in df.columns]
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
@@ -0,0 +1,195 @@
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app import config
+from app.services.filter_engine import filters_key
+from app.services.metrics_service import note_filters, phase
+
+
+def estimate_size(obj: Any) -> int:
+    """Rough deep size in bytes of a result payload"""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_size(item) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + estimate_size(vars(obj))
+    return sys.getsizeof(obj)
+
+
+class ResultCache:
+    """Thread-safe LRU cache of computed results with TTL and a byte budget.
+
+    The cache serves one dataset version at a time. ``reset`` switches to a
+    new version and drops every entry; lookups and stores for any other
+    version bypass the cache, so results never outlive the data they were
+    computed from, even for requests still running against a replaced dataset.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self._version = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: Hashable):
+        """Return (found, value) for a key"""
+        with self._lock:
+            entry = self._entries.get(key) if version == self._version else None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any, version: Hashable):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def reset(self, version: Hashable):
+        """Start serving a new dataset version"""
+        with self._lock:
+            self._version = version
+            self._clear()
+
+    def _clear(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': config.CACHE_ENABLED,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'dataset_version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+def _cache_key(qualname: str, filters: Optional[Dict], args: tuple, kwargs: Dict) -> Hashable:
+    return (qualname, filters_key(filters), args, tuple(sorted(kwargs.items())))
+
+
+def cached(method: Callable) -> Callable:
+    """Cache a service method's result per (method, canonical filters, arguments, dataset version).
+
+    The decorated method's owner must expose the current dataset version as
+    ``self.version``. Cached results are shared between callers and must
+    not be mutated.
+    """
+    @functools.wraps(method)
+    def wrapper(self, filters: Optional[Dict] = None, *args, **kwargs):
+        note_filters(filters)
+        if not config.CACHE_ENABLED:
+            with phase('aggregate'):
+                return method(self, filters, *args, **kwargs)
+
+        version = self.version
+        with phase('cache'):
+            key = _cache_key(method.__qualname__, filters, args, kwargs)
+            found, value = result_cache.get(key, version)
+        if found:
+            return value
+        with phase('aggregate'):
+            value = method(self, filters, *args, **kwargs)
+        result_cache.put(key, value, version)
+        return value
+
+    return wrapper
+
+
+def cached_result(method: Callable, filters: Optional[Dict] = None, *args, **kwargs):
+    """Return (found, value) of a ``cached`` bound method's result, without computing it"""
+    if not config.CACHE_ENABLED:
+        return False, None
+    key = _cache_key(method.__qualname__, filters, args, kwargs)
+    return result_cache.get(key, method.__self__.version)
+
+
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-refresh')
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def refresh_in_background(method: Callable, filters: Optional[Dict] = None, *args, **kwargs) -> bool:
+    """Compute a ``cached`` bound method's result on a background thread, so that later calls find it cached.
+
+    Returns whether the result is (or already was) being computed; without
+    a cache there is nothing to fill and nothing is started.
+    """
+    if not config.CACHE_ENABLED:
+        return False
+    key = _cache_key(method.__qualname__, filters, args, kwargs)
+    with _refresh_lock:
+        if key in _refreshing:
+            return True
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            method(filters, *args, **kwargs)
+        except Exception as e:
+            print(f"Background refresh of {method.__qualname__} failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    _refresh_executor.submit(refresh)
+    return True
+
+
+# Global instance
+result_cache = ResultCache(
+    max_bytes=config.CACHE_MAX_BYTES,
+    max_entries=config.CACHE_MAX_ENTRIES,
+    ttl_seconds=config.CACHE_TTL_SECONDS
+)
@@ -0,0 +1,147 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.filter_engine import RowSelector
+
+# The dataset has no customer id; a customer is approximated by these columns
+CUSTOMER_KEY = ['Customer_Age', 'Customer_Gender', 'Country']
+
+
+def _sum_by_id(ids: np.ndarray, values: np.ndarray, n_customers: int) -> np.ndarray:
+    sums = np.bincount(ids, weights=values, minlength=n_customers)
+    # Integer measures are summed exactly in float64 (below 2**53) and keep their type
+    if np.issubdtype(values.dtype, np.integer):
+        return sums.astype(np.int64)
+    return sums
+
+
+class CustomerIndex:
+    """Integer customer ids for every row plus per-customer totals.
+
+    The multi-column customer key is grouped once at load time. Distinct
+    counts, orders per customer and per-customer sums over any row
+    selection are then ``bincount`` calls over the id array instead of a
+    multi-key groupby. Ids of the initial load follow the sorted key order,
+    like a groupby would; customers first seen in an appended batch get the
+    next free ids. ``appended`` holds the customer ids touched by each
+    appended batch, in append order.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        grouped = df.groupby(CUSTOMER_KEY, sort=True, observed=True)
+        self.keys = grouped.size().index
+        # ngroup() gives NaN for rows with a missing key part; those get id -1
+        self.ids = grouped.ngroup().fillna(-1).to_numpy().astype(np.int32)
+        self.complete = bool(len(self.ids) == 0 or self.ids.min() >= 0)
+        self.totals = self._aggregate(df, self.ids, len(self.keys))
+        self.appended: Tuple[np.ndarray, ...] = ()
+
+    @staticmethod
+    def _aggregate(df: pd.DataFrame, ids: np.ndarray, n_customers: int) -> pd.DataFrame:
+        """Revenue, profit, order count and first/last order date per customer id"""
+        valid = ids >= 0
+        ids = ids[valid]
+        positions = np.flatnonzero(valid)
+        first = np.full(n_customers, len(df), dtype=np.int64)
+        last = np.full(n_customers, -1, dtype=np.int64)
+        np.minimum.at(first, ids, positions)
+        np.maximum.at(last, ids, positions)
+
+        dates = df['Date'].to_numpy()
+        seen = last >= 0
+        first_date = np.full(n_customers, np.datetime64('NaT'), dtype=dates.dtype)
+        last_date = first_date.copy()
+        first_date[seen] = dates[first[seen]]
+        last_date[seen] = dates[last[seen]]
+
+        return pd.DataFrame({
+            'Revenue': _sum_by_id(ids, df['Revenue'].to_numpy()[valid], n_customers),
+            'Profit': _sum_by_id(ids, df['Profit'].to_numpy()[valid], n_customers),
+            'Orders': np.bincount(ids, minlength=n_customers),
+            'First_Date': first_date,
+            'Last_Date': last_date
+        })
+
+    def append(self, rows: pd.DataFrame, order: Optional[np.ndarray] = None) -> 'CustomerIndex':
+        """New index including extra rows, computed from those rows alone.
+
+        ``order`` is the permutation that took the current rows followed by
+        ``rows`` to the new frame, when the batch was merged in by date
+        rather than appended at the end.
+        """
+        batch_keys = pd.MultiIndex.from_frame(rows[CUSTOMER_KEY])
+        batch_ids = self.keys.get_indexer(batch_keys)
+        new_keys = batch_keys[batch_ids < 0].unique()
+        new_keys = new_keys[~new_keys.to_frame().isna().any(axis=1).to_numpy()]
+        keys = self.keys.append(new_keys) if len(new_keys) else self.keys
+        if len(new_keys):
+            batch_ids = keys.get_indexer(batch_keys)
+
+        index = CustomerIndex.__new__(CustomerIndex)
+        index.keys = keys
+        index.ids = np.concatenate([self.ids, batch_ids.astype(np.int32)])
+        if order is not None:
+            index.ids = index.ids[order]
+        index.complete = self.complete and bool((batch_ids >= 0).all())
+        index.appended = self.appended + (np.unique(batch_ids[batch_ids >= 0]).astype(np.int32),)
+
+        batch = self._aggregate(rows, batch_ids.astype(np.int32), len(keys))
+        totals = self.totals.reindex(range(len(keys)))
+        index.totals = pd.DataFrame({
+            'Revenue': totals['Revenue'].fillna(0).to_numpy().astype(batch['Revenue'].dtype) + batch['Revenue'].to_numpy(),
+            'Profit': totals['Profit'].fillna(0).to_numpy().astype(batch['Profit'].dtype) + batch['Profit'].to_numpy(),
+            'Orders': totals['Orders'].fillna(0).to_numpy().astype(np.int64) + batch['Orders'].to_numpy(),
+            'First_Date': np.fmin(totals['First_Date'].to_numpy(), batch['First_Date'].to_numpy()),
+            'Last_Date': np.fmax(totals['Last_Date'].to_numpy(), batch['Last_Date'].to_numpy())
+        })
+        return index
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def select(self, selector: RowSelector) -> np.ndarray:
+        """Customer ids of the selected rows (rows without a customer dropped)"""
+        ids = self.ids[selector]
+        return ids if self.complete else ids[ids >= 0]
+
+    def covers_all(self, selector: RowSelector) -> bool:
+        """Whether the selection is the whole dataset, so the stored totals apply"""
+        return isinstance(selector, slice) and selector.start == 0 and selector.stop == len(self.ids)
+
+    def orders_per_customer(self, selector: RowSelector) -> np.ndarray:
+        """Order count per customer id over the selection (0 for absent customers)"""
+        if self.covers_all(selector):
+            return self.totals['Orders'].to_numpy()
+        return np.bincount(self.select(selector), minlength=len(self))
+
+    def sum_per_customer(self, selector: RowSelector, values: np.ndarray) -> np.ndarray:
+        """Sum of a row-aligned column per customer id over the selection"""
+        values = values[selector]
+        ids = self.ids[selector]
+        if not self.complete:
+            values, ids = values[ids >= 0], ids[ids >= 0]
+        return _sum_by_id(ids, values, len(self))
+
+    def distinct_count(self, selector: RowSelector) -> int:
+        return int(np.count_nonzero(self.orders_per_customer(selector)))
+
+    def repeat_rate(self, selector: RowSelector) -> float:
+        """Share of the selection's customers with more than one order"""
+        orders = self.orders_per_customer(selector)
+        customers = np.count_nonzero(orders)
+        return float(np.count_nonzero(orders > 1) / customers) if customers else 0.0
+
+    def summary(self, selector: RowSelector, df: pd.DataFrame) -> pd.DataFrame:
+        """Revenue, profit and orders of every customer present in the selection"""
+        if self.covers_all(selector):
+            totals = self.totals
+            return totals.loc[totals['Orders'] > 0, ['Revenue', 'Profit', 'Orders']]
+        orders = self.orders_per_customer(selector)
+        present = orders > 0
+        return pd.DataFrame({
+            'Revenue': self.sum_per_customer(selector, df['Revenue'].to_numpy())[present],
+            'Profit': self.sum_per_customer(selector, df['Profit'].to_numpy())[present],
+            'Orders': orders[present]
+        })
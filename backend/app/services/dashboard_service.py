@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional
+
+from app.services.cache_service import cached
+from app.services.data_service import data_service
+from app.services.kpi_service import kpi_service
+
+
+class DashboardService:
+    def __init__(self):
+        self.data_service = data_service
+        self.kpi_service = kpi_service
+        # Panel name -> computation over a shared FilteredView
+        self.panels = {
+            'kpis': self.kpi_service.compute_main_kpis,
+            'performance': self.kpi_service.compute_performance_metrics,
+            'summary': self.data_service.compute_summary_stats,
+            'revenue_trend': self.data_service.compute_revenue_by_month,
+            'geographic': self.data_service.compute_geographic_performance,
+            'age_groups': self.data_service.compute_age_group_analysis,
+            'seasonal': self.data_service.compute_seasonal_trends,
+            'top_products': self.data_service.compute_top_products,
+            'customer_segments': self.data_service.compute_customer_segmentation
+        }
+    
+    @property
+    def version(self):
+        """Version of the dataset the panels are computed from"""
+        return self.data_service.version
+    
+    def get_batch(self, filters: Dict = None, panels: Optional[List[str]] = None) -> Dict:
+        """Compute several dashboard panels from one filtered view"""
+        panels = tuple(panels) if panels else tuple(self.panels)
+        unknown = [panel for panel in panels if panel not in self.panels]
+        if unknown:
+            raise ValueError(f"Unknown panels: {', '.join(unknown)}. Available: {', '.join(self.panels)}")
+        return self._compute_batch(filters, tuple(dict.fromkeys(panels)))
+    
+    @cached
+    def _compute_batch(self, filters: Dict, panels: tuple) -> Dict:
+        view = self.data_service.get_view(filters)
+        return {panel: self.panels[panel](view) for panel in panels}
+
+# Global instance
+dashboard_service = DashboardService()
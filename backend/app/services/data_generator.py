@@ -0,0 +1,235 @@
+import os
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from app.services.dataset_schema import apply_compact_schema
+
+# Column order of the source CSV
+SALES_COLUMNS = [
+    'Date', 'Day', 'Month', 'Year', 'Customer_Age', 'Age_Group', 'Customer_Gender',
+    'Country', 'State', 'Product_Category', 'Sub_Category', 'Product',
+    'Order_Quantity', 'Unit_Cost', 'Unit_Price', 'Profit', 'Cost', 'Revenue'
+]
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# Relative order volume per calendar month (spring/summer riding season, December gifts)
+MONTH_SEASONALITY = [0.80, 0.80, 0.95, 1.00, 1.10, 1.20, 1.15, 1.05, 0.95, 0.90, 0.90, 1.25]
+
+# Yearly order growth
+ANNUAL_GROWTH = 0.15
+
+# Country -> (share of orders, states)
+COUNTRIES = {
+    'United States': (0.34, ['California', 'Washington', 'Oregon', 'Texas', 'New York', 'Florida']),
+    'Australia': (0.21, ['New South Wales', 'Victoria', 'Queensland', 'South Australia', 'Tasmania']),
+    'Canada': (0.13, ['British Columbia', 'Alberta', 'Ontario']),
+    'United Kingdom': (0.12, ['England']),
+    'Germany': (0.10, ['Hessen', 'Hamburg', 'Saarland', 'Nordrhein-Westfalen', 'Bayern', 'Brandenburg']),
+    'France': (0.10, ['Seine (Paris)', 'Nord', 'Hauts de Seine', 'Essonne', 'Yveline', 'Moselle', 'Loiret'])
+}
+
+# Category -> (share of orders, max order quantity, markup range, {sub-category: unit cost range})
+CATEGORIES = {
+    'Accessories': (0.63, 32, (1.6, 2.6), {
+        'Bike Racks': (45, 60), 'Bike Stands': (59, 65), 'Bottles and Cages': (2, 4),
+        'Cleaners': (3, 4), 'Fenders': (8, 9), 'Helmets': (13, 15),
+        'Hydration Packs': (21, 23), 'Tires and Tubes': (1, 14)
+    }),
+    'Bikes': (0.20, 4, (1.4, 1.9), {
+        'Mountain Bikes': (295, 1266), 'Road Bikes': (188, 2171), 'Touring Bikes': (461, 1482)
+    }),
+    'Clothing': (0.17, 32, (1.7, 2.9), {
+        'Caps': (7, 7), 'Gloves': (9, 17), 'Jerseys': (38, 42),
+        'Shorts': (27, 30), 'Socks': (3, 4), 'Vests': (24, 24)
+    })
+}
+PRODUCTS_PER_SUB_CATEGORY = 5
+
+AGE_GROUPS = [(25, 'Youth (<25)'), (35, 'Young Adults (25-34)'), (65, 'Adults (35-64)'), (200, 'Seniors (64+)')]
+MIN_AGE, MAX_AGE = 17, 87
+
+
+def _categorical(codes: np.ndarray, names: List[str]) -> pd.Categorical:
+    """Categorical over sorted categories, as the dataset schema expects"""
+    order = np.argsort(names)
+    rank = np.empty(len(names), dtype=np.int32)
+    rank[order] = np.arange(len(names))
+    return pd.Categorical.from_codes(rank[codes], categories=[names[i] for i in order])
+
+
+def _csv_table(table):
+    """Arrow table in the source CSV layout: plain strings and YYYY-MM-DD dates"""
+    import pyarrow as pa
+
+    columns = []
+    for field in table.schema:
+        column = table[field.name]
+        if pa.types.is_dictionary(field.type):
+            column = column.cast(pa.string())
+        elif pa.types.is_timestamp(field.type):
+            column = column.cast(pa.date32())
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+class SalesGenerator:
+    """Seeded, vectorized generator of synthetic sales in the dataset schema.
+
+    Orders are spread over the days of the range by a multinomial draw
+    weighted by monthly seasonality and yearly growth, so rows come out
+    sorted by date and a chunk covers a contiguous run of days. Every other
+    column is drawn with whole-array operations, and text columns are built
+    as categoricals straight from integer codes. Cost, Revenue and Profit
+    are consistent with quantity and the product's unit cost and price.
+    Output is reproducible for a given seed, row count and chunk size.
+    """
+
+    def __init__(self, seed: int = 0, start_date: str = '2011-01-01', end_date: str = '2016-07-31'):
+        self.seed = seed
+        self.days = pd.date_range(start_date, end_date, freq='D')
+        if len(self.days) == 0:
+            raise ValueError("End date must not be before start date")
+
+        years = (self.days - self.days[0]).days.to_numpy() / 365.25
+        weights = np.asarray(MONTH_SEASONALITY)[self.days.month.to_numpy() - 1] * (1 + ANNUAL_GROWTH) ** years
+        self.day_weights = weights / weights.sum()
+
+        self.countries = list(COUNTRIES)
+        self.country_shares = np.array([share for share, _ in COUNTRIES.values()])
+        self.states = [state for _, states in COUNTRIES.values() for state in states]
+        self.state_offsets = np.cumsum([0] + [len(states) for _, states in COUNTRIES.values()])[:-1]
+        self.state_counts = np.array([len(states) for _, states in COUNTRIES.values()])
+
+        # Product catalogue with fixed unit cost and price per product
+        catalog_rng = np.random.default_rng([seed, 1])
+        self.categories = list(CATEGORIES)
+        self.category_shares = np.array([spec[0] for spec in CATEGORIES.values()])
+        self.category_max_quantity = np.array([spec[1] for spec in CATEGORIES.values()])
+        self.sub_categories = []
+        self.products, product_cost, product_price = [], [], []
+        sub_offsets, sub_counts = [], []
+        for _, _, markup, sub_categories in CATEGORIES.values():
+            sub_offsets.append(len(self.sub_categories))
+            sub_counts.append(len(sub_categories))
+            for sub_category, (low, high) in sub_categories.items():
+                self.sub_categories.append(sub_category)
+                cost = catalog_rng.integers(low, high + 1, PRODUCTS_PER_SUB_CATEGORY)
+                price = np.round(cost * catalog_rng.uniform(*markup, PRODUCTS_PER_SUB_CATEGORY)).astype(np.int64)
+                self.products.extend(f'{sub_category} {i + 1}' for i in range(PRODUCTS_PER_SUB_CATEGORY))
+                product_cost.append(cost)
+                product_price.append(price)
+        self.sub_offsets, self.sub_counts = np.array(sub_offsets), np.array(sub_counts)
+        self.product_cost = np.concatenate(product_cost)
+        self.product_price = np.concatenate(product_price)
+
+    def _day_counts(self, n_rows: int) -> np.ndarray:
+        return np.random.default_rng([self.seed, 0]).multinomial(n_rows, self.day_weights)
+
+    def iter_chunks(self, n_rows: int, chunk_rows: int = 1_000_000) -> Iterator[pd.DataFrame]:
+        """Date-sorted chunks of at most chunk_rows rows, n_rows in total (one empty chunk for 0 rows)"""
+        if n_rows == 0:
+            yield self._rows(np.random.default_rng(self.seed), np.array([], dtype=np.int64))
+            return
+        ends = np.cumsum(self._day_counts(n_rows))
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_rows)):
+            stop = min(start + chunk_rows, n_rows)
+            day_index = np.searchsorted(ends, np.arange(start, stop), side='right')
+            rng = np.random.default_rng([self.seed, 2, chunk_index])
+            yield self._rows(rng, day_index)
+
+    def generate(self, n_rows: int, chunk_rows: int = 1_000_000) -> pd.DataFrame:
+        """Whole dataset in memory"""
+        chunks = list(self.iter_chunks(n_rows, chunk_rows))
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    def _rows(self, rng: np.random.Generator, day_index: np.ndarray) -> pd.DataFrame:
+        n = len(day_index)
+        dates = self.days[day_index]
+
+        ages = np.clip(np.round(rng.normal(36, 11, n)), MIN_AGE, MAX_AGE).astype(np.int64)
+        age_group = np.searchsorted([bound for bound, _ in AGE_GROUPS], ages, side='right')
+
+        country = rng.choice(len(self.countries), n, p=self.country_shares)
+        state = self.state_offsets[country] + (rng.random(n) * self.state_counts[country]).astype(np.int64)
+
+        category = rng.choice(len(self.categories), n, p=self.category_shares)
+        sub_category = self.sub_offsets[category] + (rng.random(n) * self.sub_counts[category]).astype(np.int64)
+        product = sub_category * PRODUCTS_PER_SUB_CATEGORY + rng.integers(0, PRODUCTS_PER_SUB_CATEGORY, n)
+
+        # Smaller orders are more common
+        max_quantity = self.category_max_quantity[category]
+        quantity = np.minimum(1 + np.floor(rng.power(0.6, n) * max_quantity).astype(np.int64), max_quantity)
+        unit_cost = self.product_cost[product]
+        unit_price = self.product_price[product]
+        cost = quantity * unit_cost
+        revenue = quantity * unit_price
+
+        df = pd.DataFrame({
+            'Date': dates,
+            'Day': dates.day.to_numpy(),
+            'Month': _categorical(dates.month.to_numpy() - 1, MONTHS),
+            'Year': dates.year.to_numpy(),
+            'Customer_Age': ages,
+            'Age_Group': _categorical(age_group, [label for _, label in AGE_GROUPS]),
+            'Customer_Gender': _categorical(rng.integers(0, 2, n), ['M', 'F']),
+            'Country': _categorical(country, self.countries),
+            'State': _categorical(state, self.states),
+            'Product_Category': _categorical(category, self.categories),
+            'Sub_Category': _categorical(sub_category, self.sub_categories),
+            'Product': _categorical(product, self.products),
+            'Order_Quantity': quantity,
+            'Unit_Cost': unit_cost,
+            'Unit_Price': unit_price,
+            'Profit': revenue - cost,
+            'Cost': cost,
+            'Revenue': revenue
+        })
+        return apply_compact_schema(df[SALES_COLUMNS])
+
+    def write(self, path: str, n_rows: int, file_format: str = 'csv', chunk_rows: int = 1_000_000) -> Dict:
+        """Write n_rows to a CSV or Parquet file chunk by chunk; returns a summary"""
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unknown output format: {file_format}")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+
+        written = 0
+        writer = None
+        header = (','.join(SALES_COLUMNS) + '\n').encode()
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in self.iter_chunks(n_rows, chunk_rows):
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if file_format == 'csv':
+                        table = _csv_table(table)
+                        if writer is None:
+                            f.write(header)
+                            # Catalogue values contain no commas or quotes, so nothing needs quoting
+                            options = pa_csv.WriteOptions(include_header=False, quoting_style='none')
+                            writer = pa_csv.CSVWriter(f, table.schema, write_options=options)
+                    elif writer is None:
+                        writer = pq.ParquetWriter(f, table.schema)
+                    writer.write_table(table)
+                    written += len(chunk)
+                if writer is not None:
+                    writer.close()
+                    writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+
+        os.replace(tmp_path, path)
+        return {'path': path, 'rows': written, 'format': file_format, 'bytes': os.path.getsize(path)}
+
+
+def generate_sales(n_rows: int, seed: int = 0, **kwargs) -> pd.DataFrame:
+    """Synthetic sales dataset, sorted by date"""
+    return SalesGenerator(seed, **kwargs).generate(n_rows)
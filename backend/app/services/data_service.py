@@ -1,210 +1,785 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import os
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import config
+from app.services.batch_store import ingest_dir, list_batches, new_batch_id, next_version, read_batch, records_to_frame, write_batch
+from app.services.cache_service import cached, cached_result, refresh_in_background, result_cache
+from app.services.cube_service import DataCube
+from app.services.data_generator import generate_sales
+from app.services.customer_index import CustomerIndex
+from app.services.dataset_schema import align_categories, apply_compact_schema, is_memory_mapped, memory_report
+from app.services.filter_engine import FilterEngine, RowSelector
+from app.services.metrics_service import phase
+from app.services.outofcore_service import OutOfCoreEngine, Partial
+from app.services.period_comparison import PeriodComparison, comparison_window, window_bounds
+from app.services.query_engine import GroupedResult, Measure, cells_can_answer, group_aggregate, validate_query
+from app.services.snapshot_service import dataset_version, find_csv_path, read_source_csv, snapshot_service
+from app.services.synopsis import Synopsis, month_slices
+from app.services.timeseries_index import TimeSeriesIndex, rolling_mean
+
+class FilteredView:
+    """One set of filters applied to the dataset.
+    
+    Several aggregations over the same filters share a view, so the rows,
+    cube cells and totals are each computed at most once.
+    """
+    
+    def __init__(self, dataset: 'Dataset', filters: Dict = None):
+        self.dataset = dataset
+        self.filters = filters
+    
+    def with_filters(self, filters: Dict = None) -> 'FilteredView':
+        """Another view over the same dataset"""
+        return FilteredView(self.dataset, filters)
+    
+    @cached_property
+    def selector(self) -> RowSelector:
+        with phase('filter'):
+            return self.dataset.filter_engine.select(self.filters)
+    
+    @cached_property
+    def row_count(self) -> int:
+        return FilterEngine.count(self.selector)
+    
+    @cached_property
+    def rows(self) -> pd.DataFrame:
+        """Matching transactions (read-only)"""
+        selector = self.selector
+        with phase('filter'):
+            return FilterEngine.apply(self.dataset.df, selector)
+    
+    @cached_property
+    def cells(self) -> pd.DataFrame:
+        """Matching data for sum/count/mean aggregations, with a ``Rows`` count column"""
+        with phase('filter'):
+            return self.dataset.get_aggregate_frame(self.filters)
+    
+    @cached_property
+    def totals(self) -> Dict:
+        """Summed measures and the order count"""
+        df = self.cells
+        orders = int(df['Rows'].sum())
+        revenue = df['Revenue'].sum()
+        
+        return {
+            'revenue': revenue,
+            'profit': df['Profit'].sum(),
+            'cost': df['Cost'].sum(),
+            'order_quantity': df['Order_Quantity'].sum(),
+            'orders': orders,
+            'avg_order_value': revenue / orders if orders > 0 else np.nan
+        }
+    
+    @cached_property
+    def customer_count(self) -> int:
+        """Distinct customers"""
+        return self.dataset.customers.distinct_count(self.selector)
+    
+    @cached_property
+    def customers(self) -> pd.DataFrame:
+        """Revenue, Profit and Orders per matching customer, in customer id order"""
+        return self.dataset.customers.summary(self.selector, self.dataset.df)
+    
+    @cached_property
+    def product_revenue(self) -> pd.Series:
+        """Revenue per matching product, by product name"""
+        return self.rows.groupby('Product', observed=True)['Revenue'].sum()
+    
+    def aggregate(self, dimensions: List[str], measures: List[Measure], dropna: bool = True) -> GroupedResult:
+        """Measures per group of the dimensions (see query_engine.group_aggregate), from the cells when they suffice"""
+        frame = self.cells if cells_can_answer(dimensions, measures) else self.rows
+        return group_aggregate(frame, dimensions, measures, dropna)
+    
+    def series(self, granularity: str = 'month') -> Dict:
+        """Measure totals per period bucket (see TimeSeriesIndex.series)"""
+        return self.dataset.timeseries.series(self.filters, granularity)
+    
+    def compare(self, comparisons: List[str]) -> Dict[str, Dict]:
+        """Totals of the current window and of each comparison window"""
+        return PeriodComparison(self.dataset, self.filters).compute(comparisons)
+    
+    def can_estimate(self) -> bool:
+        """Whether an estimate would beat the exact totals: they scan rows and the synopsis is built"""
+        return self.dataset.cube is None and 'synopsis' in vars(self.dataset)
+    
+    def estimate_summary(self) -> Dict:
+        """Summary statistics estimated from the dataset's synopsis, with confidence intervals"""
+        return self.dataset.synopsis.summary(self.filters, self.dataset.get_filtered_data)
+
+class OutOfCoreView(FilteredView):
+    """Filtered view computed by a partitioned scan of the source file.
+    
+    Serves the same aggregates as an in-memory view from merged partial
+    aggregates (see app/services/outofcore_service.py). Row-level access
+    is not available.
+    """
+    
+    def __init__(self, engine: OutOfCoreEngine, filters: Dict = None, partial: Partial = None):
+        super().__init__(None, filters)
+        self.engine = engine
+        if partial is not None:
+            self.partial = partial
+    
+    def with_filters(self, filters: Dict = None) -> 'OutOfCoreView':
+        return OutOfCoreView(self.engine, filters)
+    
+    @cached_property
+    def partial(self) -> Partial:
+        with phase('filter'):
+            return self.engine.scan([self.filters])[0]
+    
+    @property
+    def selector(self) -> RowSelector:
+        raise ValueError("Row-level data is not available in out-of-core mode")
+    
+    @property
+    def rows(self) -> pd.DataFrame:
+        raise ValueError("Row-level data is not available in out-of-core mode")
+    
+    @cached_property
+    def row_count(self) -> int:
+        return int(self.cells['Rows'].sum())
+    
+    @cached_property
+    def cells(self) -> pd.DataFrame:
+        return self.partial.cells
+    
+    @cached_property
+    def customer_count(self) -> int:
+        return len(self.partial.customers)
+    
+    @cached_property
+    def customers(self) -> pd.DataFrame:
+        return self.partial.customers[['Revenue', 'Profit', 'Orders']].reset_index(drop=True)
+    
+    @cached_property
+    def product_revenue(self) -> pd.Series:
+        return self.partial.products
+    
+    def series(self, granularity: str = 'month') -> Dict:
+        cells = self.cells
+        index = TimeSeriesIndex(cells, FilterEngine(cells), calendar=self.engine.date_range())
+        return index.series(self.filters, granularity)
+    
+    def compare(self, comparisons: List[str]) -> Dict[str, Dict]:
+        filters = dict(self.filters or {})
+        start, end = window_bounds(filters, *self.engine.date_range())
+        windows = {'current': (start, end)}
+        for name in comparisons:
+            windows[name] = comparison_window(name, start, end, filters)
+        
+        # One scan aggregates every window
+        window_filters = [dict(filters, start_date=first.isoformat(), end_date=last.isoformat())
+                          for first, last in windows.values()]
+        with phase('filter'):
+            partials = self.engine.scan(window_filters)
+        
+        results = {}
+        for (name, (first, last)), window, partial in zip(windows.items(), window_filters, partials):
+            view = OutOfCoreView(self.engine, window, partial)
+            orders = partial.customers['Orders'].to_numpy()
+            results[name] = {
+                **view.totals,
+                'customers': view.customer_count,
+                'repeat_customer_rate': float(np.count_nonzero(orders > 1) / len(orders)) if len(orders) else 0.0,
+                'start_date': first,
+                'end_date': last
+            }
+        return results
+    
+    def can_estimate(self) -> bool:
+        return self.engine.synopsis is not None
+    
+    def estimate_summary(self) -> Dict:
+        synopsis = self.engine.get_synopsis(config.APPROX_SAMPLE_FRACTION)
+        return synopsis.summary(self.filters, self.engine.rows)
+
+class Dataset:
+    """One loaded version of the data together with its derived indexes.
+    
+    Datasets are never modified after construction. DataService publishes a
+    reload by swapping in a whole new Dataset, so a request that captured
+    one keeps a consistent frame, indexes and version throughout.
+    """
+    
+    def __init__(self, df: pd.DataFrame, version: str, source: str,
+                 source_version: str = None, batches: Tuple[str, ...] = (), cube: DataCube = None,
+                 customers: CustomerIndex = None):
+        df = apply_compact_schema(df, config.FLOAT32_MEASURES)
+        if not df['Date'].is_monotonic_increasing:
+            df = df.sort_values('Date', kind='stable', ignore_index=True)
+        self.df = df
+        self.version = version
+        self.source = source
+        self.source_version = source_version or version
+        self.batches = batches
+        self.loaded_at = datetime.now()
+        self.filter_engine = FilterEngine(df)
+        if cube is None and config.CUBE_ENABLED:
+            cube = DataCube(df)
+        self.cube = cube
+        self.customers = customers if customers is not None else CustomerIndex(df)
+    
+    def append(self, rows: pd.DataFrame, batch_ids: List[str]) -> 'Dataset':
+        """New dataset with extra rows.
+        
+        The cube is updated from the new rows alone and the filter indexes
+        reuse the categorical codes, so the cost is a copy of the columns
+        rather than a reload.
+        """
+        rows = rows.reindex(columns=self.df.columns)
+        rows['Date'] = rows['Date'].astype(self.df['Date'].dtype)
+        rows = apply_compact_schema(rows.sort_values('Date', kind='stable', ignore_index=True), config.FLOAT32_MEASURES)
+        base, rows = align_categories(self.df, rows)
+        df = pd.concat([base, rows], ignore_index=True)
+        order = None
+        if len(base) and len(rows) and rows['Date'].iloc[0] < base['Date'].iloc[-1]:
+            # Back-dated rows are merged in by date here rather than by the
+            # constructor, so the customer ids can follow the same permutation
+            order = np.argsort(df['Date'].to_numpy(), kind='stable')
+            df = df.take(order).reset_index(drop=True)
+        
+        version = self.version
+        for batch_id in batch_ids:
+            version = next_version(version, batch_id)
+        cube = self.cube.append(rows) if self.cube is not None else None
+        return Dataset(df, version, self.source, self.source_version, self.batches + tuple(batch_ids),
+                       cube, self.customers.append(rows, order))
+    
+    @cached_property
+    def timeseries(self) -> TimeSeriesIndex:
+        """Daily prefix sums per dimension combination, built on first use"""
+        return TimeSeriesIndex.from_dataset(self)
+    
+    @cached_property
+    def synopsis(self) -> Synopsis:
+        """Sample and sketches for approximate queries (built in the background by DataService)"""
+        return Synopsis.build(month_slices(self.df), config.APPROX_SAMPLE_FRACTION)
+    
+    def get_filtered_data(self, filters: Dict = None) -> pd.DataFrame:
+        return self.filter_engine.apply(self.df, self.filter_engine.select(filters))
+    
+    def get_aggregate_frame(self, filters: Dict = None) -> pd.DataFrame:
+        if self.cube is not None:
+            return self.cube.get_filtered(filters)
+        return self.get_filtered_data(filters).assign(Rows=1)
+    
+    def is_memory_mapped(self) -> bool:
+        """Whether the columns are backed by shared memory-mapped files"""
+        return is_memory_mapped(self.df['Revenue'].to_numpy())
 
 class DataService:
+    """Serves analytics over the current dataset.
+    
+    Nothing is loaded at construction: the initial load runs on a
+    background thread, started by ``start_loading`` (the app does so at
+    startup) or by the first access to the data, which waits for it. This
+    keeps imports cheap and lets the server answer health probes while the
+    CSV is parsed.
+    """
+    
     def __init__(self):
-        self.df = None
-        self.load_data()
+        self._dataset = None
+        self._out_of_core = None
+        self.ingest_dir = None
+        self._reload_lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._loader = None
+        self.load_phase = 'not started'
+        self.load_started_at = None
+        self.load_seconds = None
+        self.load_error = None
+        self.degraded = False  # Serving the synthetic fallback because the source failed to load
+        self._publish_listeners: List[Callable[[Dataset], None]] = []
+        self._synopsis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='synopsis')
+    
+    @property
+    def dataset(self) -> Optional[Dataset]:
+        """The in-memory dataset being served (None in out-of-core mode); waits for the initial load"""
+        self.wait_until_loaded()
+        return self._dataset
+    
+    @property
+    def out_of_core(self) -> Optional[OutOfCoreEngine]:
+        """OutOfCoreEngine when the source is aggregated without loading it; waits for the initial load"""
+        self.wait_until_loaded()
+        return self._out_of_core
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded.is_set()
+    
+    def start_loading(self):
+        """Start the initial load on a background thread, once"""
+        with self._load_lock:
+            if self._loader is None:
+                self.load_started_at = time.time()
+                self._loader = threading.Thread(target=self._initial_load, name='dataset-load', daemon=True)
+                self._loader.start()
+    
+    def wait_until_loaded(self, timeout: float = None) -> bool:
+        """Block until the initial load has finished, starting it if needed"""
+        # The loader itself reads the state it is building
+        if self._loaded.is_set() or threading.current_thread() is self._loader:
+            return True
+        self.start_loading()
+        return self._loaded.wait(timeout)
+    
+    def _initial_load(self):
+        started = time.perf_counter()
+        try:
+            self.load_data()
+        finally:
+            self.load_seconds = time.perf_counter() - started
+            self._loaded.set()
+    
+    def get_load_status(self) -> Dict:
+        """Initial load progress and the dataset being served, for readiness probes"""
+        loaded = self.is_loaded
+        serving = self._dataset is not None or self._out_of_core is not None
+        status = {
+            'ready': loaded and serving and not self.degraded,
+            'loaded': loaded,
+            'phase': self.load_phase,
+            'elapsed_seconds': (self.load_seconds if loaded else
+                                time.time() - self.load_started_at if self.load_started_at else None),
+            'degraded': self.degraded,
+            'error': self.load_error
+        }
+        if loaded and serving:
+            status['version'] = self.version
+            if self._out_of_core is not None:
+                profile = self._out_of_core.profile
+                status['source'] = self._out_of_core.csv_path
+                status['rows'] = profile['rows'] if profile else None
+                status['out_of_core'] = True
+            else:
+                status['source'] = self._dataset.source
+                status['rows'] = int(len(self._dataset.df))
+                status['out_of_core'] = False
+        return status
+    
+    def shutdown(self):
+        """Stop the synopsis builder and the out-of-core worker processes, if any"""
+        self._synopsis_executor.shutdown(wait=False, cancel_futures=True)
+        if self._out_of_core is not None:
+            self._out_of_core.shutdown()
+    
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        return self.dataset.df if self.dataset else None
+    
+    @property
+    def version(self) -> Optional[str]:
+        if self.out_of_core is not None:
+            return self.out_of_core.version
+        return self.dataset.version if self.dataset else None
+    
+    @property
+    def filter_engine(self) -> Optional[FilterEngine]:
+        return self.dataset.filter_engine if self.dataset else None
+    
+    @property
+    def cube(self) -> Optional[DataCube]:
+        return self.dataset.cube if self.dataset else None
     
     def load_data(self):
         """Load the CSV data"""
         try:
-            # Look for the CSV file in the data directory or root
-            csv_path = None
-            possible_paths = [
-                'data/bike sport company.csv',
-                '../bike sport company.csv',
-                '../../bike sport company.csv',
-                os.path.join(os.path.dirname(__file__), '../../data/bike sport company.csv')
-            ]
-            
-            for path in possible_paths:
-                abs_path = os.path.abspath(path)
-                if os.path.exists(abs_path):
-                    csv_path = abs_path
-                    break
+            self.load_phase = 'locating source'
+            csv_path = find_csv_path()
             
-            if csv_path:
-                self.df = pd.read_csv(csv_path)
-                self.df['Date'] = pd.to_datetime(self.df['Date'])
+            if csv_path and config.OUT_OF_CORE:
+                self.ingest_dir = ingest_dir(csv_path)
+                if list_batches(self.ingest_dir):
+                    print("Ingested batches are not applied in out-of-core mode")
+                self.load_phase = 'preparing out-of-core source'
+                engine = OutOfCoreEngine(csv_path, config.OUT_OF_CORE_MEMORY_MB * 1024 * 1024,
+                                         config.OUT_OF_CORE_WORKERS, config.PARTITIONS_ENABLED,
+                                         config.PARTITION_DIR, config.PARTITION_CACHE_MB * 1024 * 1024)
+                if engine.store is not None:
+                    print(f"Serving {csv_path} out of core from {len(engine.store.partitions)} monthly partitions")
+                else:
+                    print(f"Serving {csv_path} out of core in {len(engine.ranges)} ranges")
+                self._publish_out_of_core(engine)
+            elif csv_path:
+                version = dataset_version(csv_path)
+                if config.SNAPSHOT_ENABLED:
+                    self.load_phase = 'reading snapshot'
+                    df = snapshot_service.load_or_build(csv_path)
+                else:
+                    self.load_phase = 'reading CSV'
+                    df = read_source_csv(csv_path)
                 print(f"Data loaded successfully from {csv_path}")
-                print(f"Dataset shape: {self.df.shape}")
+                print(f"Dataset shape: {df.shape}")
+                self.ingest_dir = ingest_dir(csv_path)
+                self.load_phase = 'building indexes'
+                dataset = Dataset(df, version, csv_path)
+                batch_ids = list_batches(self.ingest_dir)
+                if batch_ids:
+                    self.load_phase = 'applying ingested batches'
+                    dataset = self._apply_batches(dataset, batch_ids)
+                    print(f"Applied {len(batch_ids)} ingested batches")
+                self._publish(dataset)
             else:
                 print("CSV file not found. Creating sample data.")
-                self.create_sample_data()
+                self.load_phase = 'generating sample data'
+                self.ingest_dir = ingest_dir(None)
+                self._publish(Dataset(self.create_sample_data(), self.sample_version(), 'sample'))
+            self.load_error = None
+            self.degraded = False
+            self.load_phase = 'ready'
                 
         except Exception as e:
             print(f"Error loading data: {e}")
-            self.create_sample_data()
-    
-    def create_sample_data(self):
-        """Create sample data if CSV not found"""
-        # This creates a minimal dataset structure for testing
-        dates = pd.date_range('2013-01-01', '2016-12-31', freq='D')
-        sample_data = []
-        
-        countries = ['Canada', 'Australia', 'United States', 'Germany', 'France', 'United Kingdom']
-        age_groups = ['Youth (<25)', 'Young Adults (25-34)', 'Adults (35-64)', 'Seniors (64+)']
-        genders = ['M', 'F']
-        categories = ['Accessories', 'Bikes', 'Clothing']
-        
-        for i in range(1000):  # Create 1000 sample records
-            date = np.random.choice(dates)
-            # Convert numpy.datetime64 to Python datetime
-            date_py = pd.to_datetime(date).to_pydatetime()
-            sample_data.append({
-                'Date': date,
-                'Day': date_py.day,
-                'Month': date_py.strftime('%B'),
-                'Year': date_py.year,
-                'Customer_Age': np.random.randint(16, 85),
-                'Age_Group': np.random.choice(age_groups),
-                'Customer_Gender': np.random.choice(genders),
-                'Country': np.random.choice(countries),
-                'State': 'Sample State',
-                'Product_Category': np.random.choice(categories),
-                'Sub_Category': 'Sample Sub Category',
-                'Product': 'Sample Product',
-                'Order_Quantity': np.random.randint(1, 30),
-                'Unit_Cost': np.random.uniform(20, 100),
-                'Unit_Price': np.random.uniform(50, 200),
-                'Profit': 0,  # Will calculate
-                'Cost': 0,    # Will calculate
-                'Revenue': 0  # Will calculate
-            })
-        
-        self.df = pd.DataFrame(sample_data)
-        # Calculate derived fields
-        self.df['Cost'] = self.df['Order_Quantity'] * self.df['Unit_Cost']
-        self.df['Revenue'] = self.df['Order_Quantity'] * self.df['Unit_Price']
-        self.df['Profit'] = self.df['Revenue'] - self.df['Cost']
+            self.load_error = str(e)
+            if self._dataset is None and self._out_of_core is None:
+                self.load_phase = 'generating sample data'
+                self._publish(Dataset(self.create_sample_data(), self.sample_version(), 'sample'))
+                self.degraded = True
+                self.load_phase = 'serving sample data'
+            else:
+                # A failed reload keeps serving the previous dataset
+                self.load_phase = 'ready'
+    
+    def on_publish(self, listener: Callable[[Dataset], None]):
+        """Call listener(dataset) whenever an in-memory dataset is published; it must return quickly"""
+        self._publish_listeners.append(listener)
+    
+    def _publish(self, dataset: Dataset):
+        """Atomically make a dataset the current one"""
+        result_cache.reset(dataset.version)
+        self._dataset = dataset
+        self._publish_out_of_core(None)
+        if dataset.cube is None:
+            # Without the cube the exact totals scan rows, so approximate queries use the synopsis
+            self._synopsis_executor.submit(self._build_synopsis, dataset)
+        for listener in self._publish_listeners:
+            try:
+                listener(dataset)
+            except Exception as e:
+                print(f"Error notifying dataset listener: {e}")
+    
+    def _publish_out_of_core(self, engine: Optional[OutOfCoreEngine]):
+        previous, self._out_of_core = self._out_of_core, engine
+        if engine is not None:
+            result_cache.reset(engine.version)
+            self._dataset = None
+            if engine.store is not None:
+                self._synopsis_executor.submit(self._build_synopsis, engine)
+        if previous is not None and previous is not engine:
+            previous.shutdown()
+    
+    def _build_synopsis(self, source):
+        """Build the synopsis of a dataset or out-of-core engine, unless it is no longer served"""
+        if source is not self._dataset and source is not self._out_of_core:
+            return
+        try:
+            started = time.perf_counter()
+            if isinstance(source, Dataset):
+                source.synopsis  # the cached property builds it
+            else:
+                source.get_synopsis(config.APPROX_SAMPLE_FRACTION)
+            print(f"Synopsis of {source.version} built in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"Error building synopsis: {e}")
+    
+    def _apply_batches(self, dataset: Dataset, batch_ids: List[str]) -> Dataset:
+        rows = pd.concat([read_batch(self.ingest_dir, batch_id) for batch_id in batch_ids], ignore_index=True)
+        return dataset.append(rows, batch_ids)
+    
+    def reload_if_changed(self) -> bool:
+        """Reload when the source CSV has changed, or apply newly dropped batches"""
+        with self._reload_lock:
+            csv_path = find_csv_path()
+            if self.out_of_core is not None:
+                if csv_path != self.out_of_core.csv_path or dataset_version(csv_path) != self.out_of_core.version:
+                    self.load_data()
+                    return True
+                return False
+            if csv_path and dataset_version(csv_path) != self.dataset.source_version:
+                self.load_data()
+                return True
+            
+            pending = [b for b in list_batches(self.ingest_dir) if b not in set(self.dataset.batches)]
+            if not pending:
+                return False
+            self._publish(self._apply_batches(self.dataset, pending))
+            return True
+    
+    def ingest(self, records: List[Dict]) -> Dict:
+        """Append sales rows and publish them as a new dataset version.
+        
+        The batch is first written to the ingest directory, so it survives
+        restarts and other workers pick it up on their next reload check.
+        """
+        if not records:
+            raise ValueError("No rows to ingest")
+        if self.out_of_core is not None:
+            raise ValueError("Ingest is not available in out-of-core mode")
+        rows = records_to_frame(records)
+        
+        with self._reload_lock:
+            # Catch up on batches dropped by other workers first, to keep versions in step
+            self.reload_if_changed()
+            batch_id = write_batch(self.ingest_dir, rows) if self.ingest_dir else new_batch_id()
+            self._publish(self.dataset.append(rows, [batch_id]))
+        
+        return {'ingested_rows': len(rows), 'batch_id': batch_id, **self.get_dataset_info()}
+    
+    def start_reload_watcher(self, interval_seconds: float):
+        """Poll the source CSV in the background and reload it when it changes"""
+        def watch():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"Error reloading data: {e}")
+        
+        threading.Thread(target=watch, name='dataset-reload', daemon=True).start()
+    
+    def get_dataset_info(self) -> Dict:
+        """Describe the dataset currently being served"""
+        if self.out_of_core is not None:
+            return {'version': self.out_of_core.version, 'source': self.out_of_core.csv_path,
+                    'out_of_core': self.out_of_core.stats()}
+        dataset = self.dataset
+        return {
+            'version': dataset.version,
+            'source': dataset.source,
+            'rows': int(len(dataset.df)),
+            'loaded_at': dataset.loaded_at.isoformat(),
+            'batches': len(dataset.batches),
+            'memory_mapped': dataset.is_memory_mapped(),
+            'customers': len(dataset.customers),
+            'cube_cells': len(dataset.cube) if dataset.cube is not None else None
+        }
+    
+    def get_memory_report(self) -> Dict:
+        """Bytes held by each column of the dataset and by its derived indexes"""
+        if self.out_of_core is not None:
+            # Nothing is held between scans
+            return {'version': self.out_of_core.version, 'out_of_core': self.out_of_core.stats()}
+        dataset = self.dataset
+        report = memory_report(dataset.df)
+        report['version'] = dataset.version
+        report['cube'] = memory_report(dataset.cube.df) if dataset.cube is not None else None
+        report['filter_index_bytes'] = int(sum(codes.nbytes for codes in dataset.filter_engine.codes.values()))
+        # Lazy indexes are only reported once a query has built them; a memory
+        # probe must not build them itself
+        report['timeseries_index_bytes'] = dataset.timeseries.nbytes if 'timeseries' in vars(dataset) else None
+        report['customer_index_bytes'] = int(dataset.customers.ids.nbytes + dataset.customers.totals.memory_usage(index=False).sum())
+        report['synopsis_bytes'] = dataset.synopsis.nbytes if 'synopsis' in vars(dataset) else None
+        return report
+    
+    def create_sample_data(self) -> pd.DataFrame:
+        """Create synthetic data if CSV not found"""
+        return generate_sales(config.SAMPLE_ROWS, seed=config.SAMPLE_SEED)
+    
+    def sample_version(self) -> str:
+        # The synthetic data is a function of its seed and size, so every worker gets the same version
+        return f'sample-{config.SAMPLE_SEED}-{config.SAMPLE_ROWS}'
+    
+    def get_row_selector(self, filters: Dict = None) -> RowSelector:
+        """Rows matching the filters, as a slice or an array of row positions"""
+        return self.dataset.filter_engine.select(filters)
     
     def get_filtered_data(self, filters: Dict = None) -> pd.DataFrame:
-        """Apply filters to the dataset"""
-        filtered_df = self.df.copy()
+        """Apply filters to the dataset.
         
-        if filters:
-            if filters.get('start_date'):
-                start_date = pd.to_datetime(filters['start_date'])
-                filtered_df = filtered_df[filtered_df['Date'] >= start_date]
-            
-            if filters.get('end_date'):
-                end_date = pd.to_datetime(filters['end_date'])
-                filtered_df = filtered_df[filtered_df['Date'] <= end_date]
-            
-            if filters.get('countries'):
-                filtered_df = filtered_df[filtered_df['Country'].isin(filters['countries'])]
-            
-            if filters.get('age_groups'):
-                filtered_df = filtered_df[filtered_df['Age_Group'].isin(filters['age_groups'])]
-            
-            if filters.get('product_categories'):
-                filtered_df = filtered_df[filtered_df['Product_Category'].isin(filters['product_categories'])]
+        A pure date-range filter returns a view of the date-sorted dataset;
+        the returned frame must be treated as read-only.
+        """
+        return self.dataset.get_filtered_data(filters)
+    
+    def get_aggregate_frame(self, filters: Dict = None) -> pd.DataFrame:
+        """Filtered data for sum/count/mean aggregations.
         
-        return filtered_df
+        Comes from the pre-aggregated cube when it is enabled; every row
+        carries a ``Rows`` column holding the number of transactions it stands for.
+        """
+        return self.dataset.get_aggregate_frame(filters)
+    
+    def get_view(self, filters: Dict = None) -> FilteredView:
+        """Filtered view shared by several aggregations over the same filters"""
+        if self.out_of_core is not None:
+            return OutOfCoreView(self.out_of_core, filters)
+        return FilteredView(self.dataset, filters)
     
+    def get_totals(self, filters: Dict = None) -> Dict:
+        """Get summed measures and the order count"""
+        return self.get_view(filters).totals
+    
+    @cached
     def get_summary_stats(self, filters: Dict = None) -> Dict:
         """Get summary statistics"""
-        df = self.get_filtered_data(filters)
+        return self.compute_summary_stats(self.get_view(filters))
+    
+    def compute_summary_stats(self, view: FilteredView) -> Dict:
+        """Get summary statistics from a filtered view"""
+        totals = view.totals
         
         return {
-            'total_revenue': float(df['Revenue'].sum()),
-            'total_profit': float(df['Profit'].sum()),
-            'total_orders': int(df.shape[0]),
-            'avg_order_value': float(df['Revenue'].mean()),
-            'total_customers': int(df.groupby(['Customer_Age', 'Customer_Gender', 'Country'])['Date'].count().shape[0]),
-            'profit_margin': float((df['Profit'].sum() / df['Revenue'].sum()) * 100) if df['Revenue'].sum() > 0 else 0
+            'total_revenue': float(totals['revenue']),
+            'total_profit': float(totals['profit']),
+            'total_orders': int(totals['orders']),
+            'avg_order_value': float(totals['avg_order_value']),
+            'total_customers': view.customer_count,
+            'profit_margin': float((totals['profit'] / totals['revenue']) * 100) if totals['revenue'] > 0 else 0
         }
     
+    def get_approximate_summary_stats(self, filters: Dict = None) -> Dict:
+        """Get summary statistics estimated from a sample and sketches.
+        
+        The estimate carries confidence intervals. It is only used when the
+        exact statistics would scan rows (out-of-core mode, or no cube) and
+        the synopsis has been built in the background; otherwise the exact
+        statistics are returned (``approximate`` false). Unless disabled,
+        the exact statistics behind an estimate are computed in the
+        background into the result cache and replace it once there.
+        """
+        found, exact = cached_result(self.get_summary_stats, filters)
+        if found:
+            return dict(exact, approximate=False)
+        if not self.get_view(filters).can_estimate():
+            return dict(self.get_summary_stats(filters), approximate=False)
+        estimate = self._estimate_summary_stats(filters)
+        pending = config.APPROX_EXACT_REFRESH and refresh_in_background(self.get_summary_stats, filters)
+        return dict(estimate, exact_pending=bool(pending))
+    
+    @cached
+    def _estimate_summary_stats(self, filters: Dict = None) -> Dict:
+        return self.get_view(filters).estimate_summary()
+    
+    def query(self, filters: Dict = None, dimensions: Tuple[str, ...] = (), measures: Tuple[Measure, ...] = (('Revenue', 'sum'),),
+              sort_by: str = None, descending: bool = True, limit: int = None, offset: int = 0) -> Dict:
+        """Group-by query: measures per combination of the dimensions, sorted and paginated.
+        
+        The grouping is cached per filters, dimensions and measures, so
+        further pages and other sort orders only sort the groups. Unlike
+        the preset panels, rows with a missing dimension value are kept,
+        as a group labelled None.
+        """
+        validate_query(dimensions, measures)
+        return self._group(filters, tuple(dimensions), tuple(measures)).page(sort_by, descending, limit, offset)
+    
+    @cached
+    def _group(self, filters: Dict, dimensions: Tuple[str, ...], measures: Tuple[Measure, ...]) -> GroupedResult:
+        return self.get_view(filters).aggregate(list(dimensions), list(measures), dropna=False)
+    
+    @cached
     def get_revenue_by_month(self, filters: Dict = None) -> Dict:
         """Get revenue trend by month"""
-        df = self.get_filtered_data(filters)
-        monthly_revenue = df.groupby(df['Date'].dt.to_period('M'))['Revenue'].sum()
+        return self.compute_revenue_by_month(self.get_view(filters))
+    
+    def compute_revenue_by_month(self, view: FilteredView) -> Dict:
+        """Get revenue trend by month from a filtered view"""
+        monthly = view.series('month')
+        # Only months with orders, as a groupby would return
+        has_orders = monthly['series']['orders'] > 0
         
         return {
-            'labels': [str(period) for period in monthly_revenue.index],
-            'data': monthly_revenue.values.tolist()
+            'labels': [label for label, keep in zip(monthly['labels'], has_orders) if keep],
+            'data': monthly['series']['revenue'][has_orders]
+        }
+    
+    @cached
+    def get_timeseries(self, filters: Dict = None, granularity: str = 'month', window: int = None) -> Dict:
+        """Get every measure per day/week/month/quarter/year, optionally with a rolling mean"""
+        if window is not None and window < 1:
+            raise ValueError("Rolling window must be at least 1")
+        result = self.get_view(filters).series(granularity)
+        response = {
+            'granularity': granularity,
+            'labels': result['labels'],
+            'series': result['series']
         }
+        if window:
+            response['rolling_window'] = window
+            response['rolling'] = {name: rolling_mean(values, window) for name, values in result['series'].items()}
+        return response
     
+    @cached
     def get_top_products(self, filters: Dict = None, limit: int = 10) -> Dict:
         """Get top products by revenue"""
-        df = self.get_filtered_data(filters)
-        top_products = df.groupby('Product')['Revenue'].sum().sort_values(ascending=False).head(limit)
+        return self.compute_top_products(self.get_view(filters), limit)
+    
+    def compute_top_products(self, view: FilteredView, limit: int = 10) -> Dict:
+        """Get top products by revenue from a filtered view"""
+        top_products = view.product_revenue.sort_values(ascending=False).head(limit)
         
         return {
             'labels': top_products.index.tolist(),
-            'data': top_products.values.tolist()
+            'data': top_products.to_numpy()
         }
     
+    @cached
     def get_geographic_performance(self, filters: Dict = None) -> Dict:
         """Get performance by geographic region"""
-        df = self.get_filtered_data(filters)
-        geo_performance = df.groupby('Country').agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'Order_Quantity': 'sum'
-        }).round(2)
+        return self.compute_geographic_performance(self.get_view(filters))
+    
+    def compute_geographic_performance(self, view: FilteredView) -> Dict:
+        """Get performance by geographic region from a filtered view"""
+        geo = view.aggregate(['Country'], [('Revenue', 'sum'), ('Profit', 'sum'), ('Order_Quantity', 'sum')])
         
         return {
-            'countries': geo_performance.index.tolist(),
-            'revenue': geo_performance['Revenue'].tolist(),
-            'profit': geo_performance['Profit'].tolist(),
-            'orders': geo_performance['Order_Quantity'].tolist()
+            'countries': geo.keys('Country'),
+            'revenue': geo.values[('Revenue', 'sum')].round(2),
+            'profit': geo.values[('Profit', 'sum')].round(2),
+            'orders': geo.values[('Order_Quantity', 'sum')]
         }
     
+    @cached
     def get_age_group_analysis(self, filters: Dict = None) -> Dict:
         """Analyze customer behavior by age group"""
-        df = self.get_filtered_data(filters)
-        age_analysis = df.groupby('Age_Group').agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'Customer_Age': 'count',
-            'Order_Quantity': 'mean'
-        }).round(2)
+        return self.compute_age_group_analysis(self.get_view(filters))
+    
+    def compute_age_group_analysis(self, view: FilteredView) -> Dict:
+        """Analyze customer behavior by age group from a filtered view"""
+        ages = view.aggregate(['Age_Group'], [('Revenue', 'sum'), ('Profit', 'sum'), ('Revenue', 'count'),
+                                              ('Order_Quantity', 'mean')])
         
         return {
-            'age_groups': age_analysis.index.tolist(),
-            'revenue': age_analysis['Revenue'].tolist(),
-            'profit': age_analysis['Profit'].tolist(),
-            'customer_count': age_analysis['Customer_Age'].tolist(),
-            'avg_order_quantity': age_analysis['Order_Quantity'].tolist()
+            'age_groups': ages.keys('Age_Group'),
+            'revenue': ages.values[('Revenue', 'sum')].round(2),
+            'profit': ages.values[('Profit', 'sum')].round(2),
+            'customer_count': ages.values[('Revenue', 'count')],
+            'avg_order_quantity': ages.values[('Order_Quantity', 'mean')].round(2)
         }
     
+    @cached
     def get_seasonal_trends(self, filters: Dict = None) -> Dict:
         """Analyze seasonal purchasing patterns"""
-        df = self.get_filtered_data(filters)
-        seasonal_data = df.groupby('Month').agg({
-            'Revenue': 'sum',
-            'Order_Quantity': 'sum',
-            'Profit': 'sum'
-        }).round(2)
-        
-        # Order months correctly
-        month_order = ['January', 'February', 'March', 'April', 'May', 'June',
-                      'July', 'August', 'September', 'October', 'November', 'December']
-        seasonal_data = seasonal_data.reindex([m for m in month_order if m in seasonal_data.index])
+        return self.compute_seasonal_trends(self.get_view(filters))
+    
+    def compute_seasonal_trends(self, view: FilteredView) -> Dict:
+        """Analyze seasonal purchasing patterns from a filtered view"""
+        # Months come out in calendar order
+        seasonal = view.aggregate(['Month'], [('Revenue', 'sum'), ('Order_Quantity', 'sum'), ('Profit', 'sum')])
         
         return {
-            'months': seasonal_data.index.tolist(),
-            'revenue': seasonal_data['Revenue'].tolist(),
-            'orders': seasonal_data['Order_Quantity'].tolist(),
-            'profit': seasonal_data['Profit'].tolist()
+            'months': seasonal.keys('Month'),
+            'revenue': seasonal.values[('Revenue', 'sum')].round(2),
+            'orders': seasonal.values[('Order_Quantity', 'sum')],
+            'profit': seasonal.values[('Profit', 'sum')].round(2)
         }
     
+    @cached
     def get_customer_segmentation(self, filters: Dict = None) -> Dict:
         """Customer segmentation analysis"""
-        df = self.get_filtered_data(filters)
-        
+        return self.compute_customer_segmentation(self.get_view(filters))
+    
+    def compute_customer_segmentation(self, view: FilteredView) -> Dict:
+        """Customer segmentation analysis from a filtered view"""
         # Create customer lifetime value
-        customer_data = df.groupby(['Customer_Age', 'Customer_Gender', 'Country']).agg({
-            'Revenue': 'sum',
-            'Profit': 'sum',
-            'Date': 'count',
-            'Order_Quantity': 'sum'
-        }).rename(columns={'Date': 'Order_Count'})
+        customer_data = view.customers.rename(columns={'Orders': 'Order_Count'})
         
         # Segment customers by value
         customer_data['CLV'] = customer_data['Revenue']
@@ -221,10 +796,38 @@ class DataService:
         
         return {
             'segments': segment_summary.index.tolist(),
-            'revenue': segment_summary['Revenue'].tolist(),
-            'profit': segment_summary['Profit'].tolist(),
-            'customer_count': segment_summary['Customer_Count'].tolist(),
-            'order_count': segment_summary['Order_Count'].tolist()
+            'revenue': segment_summary['Revenue'].to_numpy(),
+            'profit': segment_summary['Profit'].to_numpy(),
+            'customer_count': segment_summary['Customer_Count'].to_numpy(),
+            'order_count': segment_summary['Order_Count'].to_numpy()
+        }
+
+    @cached
+    def get_filter_options(self, filters: Dict = None) -> Dict:
+        """Get available filter options"""
+        if self.out_of_core is not None:
+            profile = self.out_of_core.get_profile()
+            first, last = self.out_of_core.date_range()
+            return {
+                "countries": sorted(profile['values']['Country']),
+                "age_groups": sorted(profile['values']['Age_Group']),
+                "product_categories": sorted(profile['values']['Product_Category']),
+                "date_range": {
+                    "min_date": first.strftime('%Y-%m-%d'),
+                    "max_date": last.strftime('%Y-%m-%d')
+                }
+            }
+        if self.df is None:
+            return {"countries": [], "age_groups": [], "product_categories": []}
+        
+        return {
+            "countries": sorted(self.df['Country'].unique().tolist()),
+            "age_groups": sorted(self.df['Age_Group'].unique().tolist()),
+            "product_categories": sorted(self.df['Product_Category'].unique().tolist()),
+            "date_range": {
+                "min_date": self.df['Date'].min().strftime('%Y-%m-%d'),
+                "max_date": self.df['Date'].max().strftime('%Y-%m-%d')
+            }
         }
 
 # Global instance
@@ -0,0 +1,137 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Text columns stored as dictionary-encoded Categoricals. Categories are kept
+# sorted so that groupbys return keys in the same order as for plain strings.
+CATEGORICAL_COLUMNS = [
+    'Month', 'Age_Group', 'Customer_Gender', 'Country', 'State',
+    'Product_Category', 'Sub_Category', 'Product'
+]
+
+# Small integer columns and the narrowest type that holds their domain
+INTEGER_COLUMNS = {
+    'Day': np.int8,
+    'Year': np.int16,
+    'Customer_Age': np.int8,
+    'Order_Quantity': np.int16
+}
+
+# Money columns. They stay 64-bit unless float32 is requested: float32 keeps
+# about 7 significant digits per value (whole amounts are exact up to
+# 16,777,216). The cube accumulates its sums in float64, but aggregations on
+# raw rows (top products, customer segments) then add up in float32.
+MEASURE_COLUMNS = ['Unit_Cost', 'Unit_Price', 'Profit', 'Cost', 'Revenue']
+
+
+def _fits(series: pd.Series, dtype) -> bool:
+    if not pd.api.types.is_integer_dtype(series.dtype):
+        return False
+    if len(series) == 0:
+        return True
+    info = np.iinfo(dtype)
+    return info.min <= series.min() and series.max() <= info.max
+
+
+def apply_compact_schema(df: pd.DataFrame, float32_measures: bool = False) -> pd.DataFrame:
+    """Convert the dataset to its compact in-memory types.
+
+    Columns that already have their target type are left untouched, so an
+    already compact (e.g. memory-mapped) frame is returned without copies.
+    Integer columns whose values do not fit the narrow type keep their type.
+    """
+    converted = {}
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            values = df[column]
+            converted[column] = pd.Categorical(values, categories=sorted(values.dropna().unique()))
+
+    for column, dtype in INTEGER_COLUMNS.items():
+        if column in df and df[column].dtype != dtype and _fits(df[column], dtype):
+            converted[column] = df[column].to_numpy().astype(dtype)
+
+    if float32_measures:
+        for column in MEASURE_COLUMNS:
+            if column in df and df[column].dtype != np.float32:
+                converted[column] = df[column].to_numpy().astype(np.float32)
+
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def align_categories(left: pd.DataFrame, right: pd.DataFrame):
+    """Give the categorical columns of two frames the same sorted categories.
+
+    Needed before concatenating, which otherwise falls back to object
+    columns. Existing codes are only recomputed when new values appear.
+    """
+    left_updates, right_updates = {}, {}
+    for column in left.columns:
+        if column not in right or not isinstance(left[column].dtype, pd.CategoricalDtype):
+            continue
+        categories = left[column].dtype.categories
+        extra = pd.Index(pd.unique(right[column].dropna().astype(object))).difference(categories)
+        if len(extra):
+            categories = pd.Index(sorted(categories.append(extra)))
+            left_updates[column] = pd.Categorical(left[column], categories=categories)
+        if right[column].dtype != left_updates.get(column, left[column]).dtype:
+            right_updates[column] = pd.Categorical(right[column], categories=categories)
+
+    if left_updates:
+        left = left.assign(**left_updates)
+    if right_updates:
+        right = right.assign(**right_updates)
+    return left, right
+
+
+def concat_aligned(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate frames whose categorical columns may have different categories"""
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    updates = [{} for _ in frames]
+    for column, dtype in frames[0].dtypes.items():
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        categories = pd.Index(sorted(set().union(*(frame[column].dtype.categories for frame in frames))))
+        for update, frame in zip(updates, frames):
+            if not frame[column].dtype.categories.equals(categories):
+                update[column] = frame[column].cat.set_categories(categories)
+    return pd.concat([frame.assign(**update) if update else frame for frame, update in zip(frames, updates)],
+                     ignore_index=True)
+
+
+def memory_report(df: pd.DataFrame) -> Dict:
+    """Bytes held by each column, and whether they live in a shared memory-mapped file"""
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.array.codes
+            nbytes = values.nbytes + int(series.dtype.categories.memory_usage(deep=True))
+        else:
+            values = series.to_numpy()
+            nbytes = int(series.memory_usage(index=False, deep=True))
+        columns[column] = {
+            'dtype': str(series.dtype),
+            'bytes': int(nbytes),
+            'memory_mapped': is_memory_mapped(values)
+        }
+
+    return {
+        'rows': int(len(df)),
+        'total_bytes': sum(info['bytes'] for info in columns.values()),
+        'memory_mapped_bytes': sum(info['bytes'] for info in columns.values() if info['memory_mapped']),
+        'columns': columns
+    }
+
+
+def is_memory_mapped(values) -> bool:
+    """Whether an array is a view of a memory-mapped file"""
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, 'base', None)
+    return False
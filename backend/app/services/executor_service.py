@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import importlib
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from app import config
+from app.services.metrics_service import record_phase
+
+
+class ComputeOverloadedError(Exception):
+    """Raised when the executor's workers and queue are all taken"""
+
+
+class ComputeTimeoutError(Exception):
+    """Raised when a computation does not finish within the request timeout"""
+
+
+def _locate_bound_method(fn: Callable) -> Tuple[str, str, str]:
+    """Find (module, global instance name, method name) for a service method"""
+    instance = getattr(fn, '__self__', None)
+    if instance is None:
+        raise TypeError("Process mode needs a bound method of a module-level service instance")
+    module_name = type(instance).__module__
+    for name, value in vars(sys.modules[module_name]).items():
+        if value is instance:
+            return module_name, name, fn.__name__
+    raise TypeError(f"{type(instance).__name__} instance is not a global of {module_name}")
+
+
+def _invoke_service_method(module_name: str, instance_name: str, method_name: str, args, kwargs):
+    # Runs in a worker process, against that process's own service instances
+    instance = getattr(importlib.import_module(module_name), instance_name)
+    return getattr(instance, method_name)(*args, **kwargs)
+
+
+def _run_queued(submitted_at: float, fn: Callable, args, kwargs):
+    # Runs inside a copy of the caller's context, so phase timings reach the request
+    record_phase('queue', time.perf_counter() - submitted_at)
+    return fn(*args, **kwargs)
+
+
+def _warm_up_worker():
+    importlib.import_module('app.services.dashboard_service')
+    importlib.import_module('app.services.data_service').data_service.start_loading()
+
+
+class ComputeExecutor:
+    """Runs blocking pandas work off the event loop with bounded concurrency.
+
+    At most ``workers`` computations run at once and at most ``max_queue``
+    more wait for a worker; beyond that, submissions are rejected so callers
+    can shed load instead of piling up. In ``process`` mode each worker
+    process loads its own copy of the services and only global service
+    methods can be submitted.
+    """
+
+    def __init__(self, mode: str = 'thread', workers: int = 4, max_queue: int = 64,
+                 timeout_seconds: float = 30.0):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up_worker)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='compute')
+        return self._executor
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, timeout: float = None, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on a worker and await its result"""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise ComputeOverloadedError(f"{self._in_flight} computations already running or queued")
+            self._in_flight += 1
+
+        try:
+            if self.mode == 'process':
+                future = self._get_executor().submit(_invoke_service_method, *_locate_bound_method(fn), args, kwargs)
+            else:
+                context = contextvars.copy_context()
+                future = self._get_executor().submit(context.run, _run_queued, time.perf_counter(), fn, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout_seconds)
+        except asyncio.TimeoutError:
+            # A queued task is dropped; a running one finishes but its result is discarded
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise ComputeTimeoutError(f"Computation exceeded {timeout or self.timeout_seconds}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'timeout_seconds': self.timeout_seconds,
+                'in_flight': self._in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+compute_executor = ComputeExecutor(
+    mode=config.EXECUTOR_MODE,
+    workers=config.EXECUTOR_WORKERS,
+    max_queue=config.EXECUTOR_MAX_QUEUE,
+    timeout_seconds=config.EXECUTOR_TIMEOUT_SECONDS
+)
@@ -0,0 +1,116 @@
+import io
+import zlib
+from typing import Dict, Iterator
+
+import pandas as pd
+
+from app import config
+from app.services.data_service import Dataset, data_service
+from app.services.filter_engine import FilterEngine
+
+# Export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+
+class ExportService:
+    """Streams the rows matching a filter in fixed-size chunks.
+
+    Only one chunk is materialized and serialized at a time, so memory use
+    does not depend on the size of the result and the first bytes go out
+    before the last rows are read. An export reads the dataset version
+    that was current when it started, even if a reload happens meanwhile.
+    """
+
+    def __init__(self, chunk_rows: int):
+        self.data_service = data_service
+        self.chunk_rows = chunk_rows
+
+    def prepare(self, filters: Dict = None, export_format: str = 'csv', compress: bool = False) -> Dict:
+        """Validate an export and describe it, before any row is streamed"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}. Use one of {', '.join(EXPORT_FORMATS)}")
+        if export_format == 'arrow':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Arrow export needs the pyarrow package")
+
+        dataset = self.data_service.dataset
+        if dataset is None:
+            raise ValueError("Export is not available in out-of-core mode")
+        selector = dataset.filter_engine.select(filters)
+        media_type, extension = EXPORT_FORMATS[export_format]
+        filename = f'sales-{dataset.version}.{extension}'
+        if compress:
+            media_type, filename = 'application/gzip', filename + '.gz'
+        return {
+            'dataset': dataset,
+            'selector': selector,
+            'rows': FilterEngine.count(selector),
+            'format': export_format,
+            'compress': compress,
+            'media_type': media_type,
+            'filename': filename
+        }
+
+    def iter_chunks(self, dataset: Dataset, selector) -> Iterator[pd.DataFrame]:
+        """Matching rows, chunk_rows at a time, with dates as YYYY-MM-DD strings"""
+        total = FilterEngine.count(selector)
+        for offset in range(0, total, self.chunk_rows):
+            if isinstance(selector, slice):
+                part = slice(selector.start + offset, min(selector.start + offset + self.chunk_rows, selector.stop))
+            else:
+                part = selector[offset:offset + self.chunk_rows]
+            chunk = FilterEngine.apply(dataset.df, part)
+            yield chunk.assign(Date=chunk['Date'].dt.strftime('%Y-%m-%d'))
+
+    def stream(self, export: Dict) -> Iterator[bytes]:
+        """Serialized (and optionally gzipped) export body"""
+        chunks = self.iter_chunks(export['dataset'], export['selector'])
+        if export['format'] == 'csv':
+            body = self._csv(chunks, export['dataset'])
+        elif export['format'] == 'ndjson':
+            body = self._ndjson(chunks)
+        else:
+            body = self._arrow(chunks, export['dataset'])
+
+        if not export['compress']:
+            yield from body
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        for data in body:
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def _csv(self, chunks: Iterator[pd.DataFrame], dataset: Dataset) -> Iterator[bytes]:
+        yield (','.join(dataset.df.columns) + '\n').encode()
+        for chunk in chunks:
+            yield chunk.to_csv(index=False, header=False, lineterminator='\n').encode()
+
+    def _ndjson(self, chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+        for chunk in chunks:
+            data = chunk.to_json(orient='records', lines=True, force_ascii=False)
+            yield (data if data.endswith('\n') else data + '\n').encode()
+
+    def _arrow(self, chunks: Iterator[pd.DataFrame], dataset: Dataset) -> Iterator[bytes]:
+        import pyarrow as pa
+
+        schema = pa.Schema.from_pandas(dataset.df.head(0).assign(Date=pd.Series(dtype=str)), preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for chunk in chunks:
+                writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        yield sink.getvalue()
+
+
+# Global instance
+export_service = ExportService(chunk_rows=config.EXPORT_CHUNK_ROWS)
@@ -0,0 +1,112 @@
+import json
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+# FilterRequest list fields and the columns they match against
+DIMENSION_COLUMNS = {
+    'countries': 'Country',
+    'age_groups': 'Age_Group',
+    'product_categories': 'Product_Category'
+}
+
+RowSelector = Union[slice, np.ndarray]
+
+
+class FilterEngine:
+    """Turns filter dicts into row selections without copying the dataset.
+
+    Expects the DataFrame to be sorted by ``Date`` so that a date range maps
+    to a contiguous slice found with ``searchsorted``. The categorical filter
+    dimensions are factorized once into integer codes; each request then
+    evaluates all of them over the date slice into a single boolean mask.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.dates = df['Date'].to_numpy()
+        self.codes = {}
+        self.categories = {}
+        for key, column in DIMENSION_COLUMNS.items():
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Reuse the existing codes rather than building a private copy
+                self.codes[key] = series.array.codes
+                self.categories[key] = series.dtype.categories
+                continue
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            code_dtype = np.int16 if len(uniques) < np.iinfo(np.int16).max else np.int32
+            self.codes[key] = codes.astype(code_dtype)
+            self.categories[key] = pd.Index(uniques)
+
+    def _date_bounds(self, filters: Dict):
+        start, stop = 0, self.n_rows
+        if filters.get('start_date'):
+            start_date = pd.to_datetime(filters['start_date']).to_datetime64().astype(self.dates.dtype)
+            start = int(np.searchsorted(self.dates, start_date, side='left'))
+        if filters.get('end_date'):
+            end_date = pd.to_datetime(filters['end_date']).to_datetime64().astype(self.dates.dtype)
+            stop = int(np.searchsorted(self.dates, end_date, side='right'))
+        return start, max(start, stop)
+
+    def _lookup_table(self, key: str, values) -> np.ndarray:
+        # One extra False slot so that the NA code (-1) never matches
+        table = np.zeros(len(self.categories[key]) + 1, dtype=bool)
+        wanted = self.categories[key].get_indexer(list(values))
+        table[wanted[wanted >= 0]] = True
+        return table
+
+    def select(self, filters: Dict = None) -> RowSelector:
+        """Rows matching the filters, as a slice or a sorted array of row positions"""
+        if not filters:
+            return slice(0, self.n_rows)
+
+        start, stop = self._date_bounds(filters)
+        mask = None
+        for key in DIMENSION_COLUMNS:
+            if filters.get(key):
+                matches = self._lookup_table(key, filters[key])[self.codes[key][start:stop]]
+                mask = matches if mask is None else mask & matches
+        if mask is None:
+            return slice(start, stop)
+        return np.flatnonzero(mask) + start
+
+    @staticmethod
+    def count(selector: RowSelector) -> int:
+        if isinstance(selector, slice):
+            return selector.stop - selector.start
+        return len(selector)
+
+    @staticmethod
+    def apply(df: pd.DataFrame, selector: RowSelector) -> pd.DataFrame:
+        """Materialize a selection; slices come back as views of the dataset"""
+        if isinstance(selector, slice):
+            return df.iloc[selector]
+        return df.take(selector)
+
+
+def canonical_filters(filters: Dict = None) -> Dict:
+    """Normalize a filter dict so that equivalent filters compare equal.
+
+    Empty values are dropped (they do not filter anything), lists are
+    de-duplicated and sorted, and dates are rendered in ISO format.
+    """
+    canonical = {}
+    for key, value in (filters or {}).items():
+        if not value:
+            continue
+        if key in ('start_date', 'end_date'):
+            try:
+                value = pd.Timestamp(value).isoformat()
+            except (ValueError, TypeError):
+                value = str(value)
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(set(value))
+        canonical[key] = value
+    return canonical
+
+
+def filters_key(filters: Dict = None) -> str:
+    """Stable string form of the canonical filters"""
+    return json.dumps(canonical_filters(filters), sort_keys=True, separators=(',', ':'), default=str)
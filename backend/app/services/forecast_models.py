@@ -0,0 +1,99 @@
+from typing import Dict
+
+import numpy as np
+from scipy.special import stdtrit
+
+# Design columns: intercept, trend in years, then indicators for February..December
+SEASONAL_PARAMETERS = 13
+TREND_PARAMETERS = 2
+
+# Months of history (from a series' first sale) needed for each model; shorter series are not forecast
+SEASONAL_MIN_MONTHS = 24
+TREND_MIN_MONTHS = 3
+
+# Model of each series, as stored in ``kind``
+NO_MODEL, TREND_MODEL, SEASONAL_MODEL = 0, 1, 2
+MODEL_NAMES = {NO_MODEL: None, TREND_MODEL: 'trend', SEASONAL_MODEL: 'seasonal'}
+
+
+def design_matrix(start_month: int, n_months: int, offset: int = 0) -> np.ndarray:
+    """Regressors of ``n_months`` consecutive months, ``offset`` months after the calendar start.
+
+    ``start_month`` is the calendar start as months since year 0 (year * 12 + month - 1).
+    """
+    periods = np.arange(offset, offset + n_months)
+    month_of_year = (start_month + periods) % 12
+    design = np.zeros((n_months, SEASONAL_PARAMETERS))
+    design[:, 0] = 1.0
+    design[:, 1] = periods / 12.0
+    later = month_of_year > 0
+    design[np.flatnonzero(later), 1 + month_of_year[later]] = 1.0
+    return design
+
+
+def fit_series(history: np.ndarray, start_month: int) -> Dict[str, np.ndarray]:
+    """Fit a trend + month-of-year regression to every row of a (series x month) matrix at once.
+
+    Each series is fitted by least squares over the months from its first
+    non-zero value on, so products launched late are not dragged down by
+    the zeros before their launch. Series with at least
+    ``SEASONAL_MIN_MONTHS`` months get the seasonal model, series with at
+    least ``TREND_MIN_MONTHS`` a linear trend. All series sharing a model are
+    solved together from batched normal equations: the work is a few
+    (series x month x parameter) array operations, whatever the number of
+    series. Returns the padded coefficients, the inverse normal matrices
+    and residual variances that the prediction intervals need.
+    """
+    n_series, n_months = history.shape
+    design = design_matrix(start_month, n_months)
+    active = np.cumsum(history != 0, axis=1) > 0
+    observed = active.sum(axis=1)
+
+    kind = np.full(n_series, NO_MODEL, dtype=np.int8)
+    kind[observed >= TREND_MIN_MONTHS] = TREND_MODEL
+    kind[observed >= SEASONAL_MIN_MONTHS] = SEASONAL_MODEL
+
+    coef = np.zeros((n_series, SEASONAL_PARAMETERS))
+    inverse = np.zeros((n_series, SEASONAL_PARAMETERS, SEASONAL_PARAMETERS))
+    variance = np.full(n_series, np.nan)
+    for model, n_params in ((TREND_MODEL, TREND_PARAMETERS), (SEASONAL_MODEL, SEASONAL_PARAMETERS)):
+        rows = np.flatnonzero(kind == model)
+        if not len(rows):
+            continue
+        x = design[:, :n_params]
+        weights = active[rows].astype(np.float64)
+        y = history[rows] * weights
+        weighted_x = weights[:, :, None] * x  # series x month x parameter
+        normal_inverse = np.linalg.inv(np.matmul(weighted_x.transpose(0, 2, 1), x))
+        beta = np.einsum('spq,sq->sp', normal_inverse, y @ x)
+        residuals = (y - beta @ x.T) * weights
+        coef[rows, :n_params] = beta
+        inverse[rows, :n_params, :n_params] = normal_inverse
+        variance[rows] = (residuals ** 2).sum(axis=1) / (observed[rows] - n_params)
+
+    dof = np.where(kind == SEASONAL_MODEL, observed - SEASONAL_PARAMETERS,
+                   np.where(kind == TREND_MODEL, observed - TREND_PARAMETERS, 0))
+    return {'kind': kind, 'coef': coef, 'inverse': inverse, 'variance': variance, 'dof': dof}
+
+
+def predict(model: Dict[str, np.ndarray], start_month: int, n_history: int, horizon: int,
+            confidence_level: float, non_negative: bool) -> Dict[str, np.ndarray]:
+    """Point forecasts and prediction intervals for the next ``horizon`` months of every series.
+
+    The interval is the OLS prediction interval, sigma * sqrt(1 + x'(X'X)^-1 x)
+    with a Student t quantile; it widens with the distance from the fitted
+    months. Measures that cannot be negative are clipped at zero. Series
+    without a model get NaN.
+    """
+    design = design_matrix(start_month, horizon, offset=n_history)
+    forecast = model['coef'] @ design.T
+    leverage = np.einsum('hp,spq,hq->sh', design, model['inverse'], design)
+    with np.errstate(invalid='ignore'):
+        quantile = stdtrit(np.maximum(model['dof'], 1), 0.5 + confidence_level / 2)
+        half_width = quantile[:, None] * np.sqrt(model['variance'][:, None] * (1.0 + leverage))
+    missing = model['kind'] == NO_MODEL
+    forecast[missing] = np.nan
+    lower, upper = forecast - half_width, forecast + half_width
+    if non_negative:
+        forecast, lower, upper = (np.maximum(values, 0.0) for values in (forecast, lower, upper))
+    return {'forecast': forecast, 'lower': lower, 'upper': upper}
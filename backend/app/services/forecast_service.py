@@ -0,0 +1,194 @@
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.services.cache_service import cached
+from app.services.data_generator import MONTHS
+from app.services.data_service import data_service
+from app.services.forecast_models import MODEL_NAMES, NO_MODEL, fit_series, predict
+from app.services.query_engine import QUERY_DIMENSIONS, QUERY_MEASURES, output_name
+
+# Series can be split by any query dimension except the calendar ones
+FORECAST_DIMENSIONS = [d for d in QUERY_DIMENSIONS if d not in ('Year', 'Month')]
+NON_NEGATIVE_MEASURES = {'Revenue', 'Cost', 'Order_Quantity'}
+MAX_HORIZON = 36
+CONFIDENCE_LEVEL = 0.95
+
+# The vectorized fit takes well under a second for 10,000 series, less than
+# shipping them to workers and back, so only larger batches use the pool
+PARALLEL_MIN_SERIES = 50_000
+MIN_CHUNK_SERIES = 10_000
+
+
+class ForecastModel:
+    """Monthly history and fitted parameters of every series of one forecast request"""
+
+    def __init__(self, dimensions: List[str], labels: Dict[str, List], start_month: int,
+                 history: np.ndarray, params: Dict[str, np.ndarray], fit_seconds: float):
+        self.dimensions = dimensions
+        self.labels = labels  # per dimension, the label of each series
+        self.start_month = start_month  # year * 12 + month - 1 of the first history month
+        self.history = history  # series x month
+        self.params = params
+        self.fit_seconds = fit_seconds
+
+    def month_labels(self, offset: int, count: int) -> List[str]:
+        months = self.start_month + offset + np.arange(count)
+        return [f'{month // 12:04d}-{month % 12 + 1:02d}' for month in months]
+
+
+def _month_index(timestamp: pd.Timestamp) -> int:
+    return timestamp.year * 12 + timestamp.month - 1
+
+
+class ForecastService:
+    """Forecasts a measure for many monthly series at once.
+
+    A request names the dimensions that split the data into series, from
+    none (one overall series) to e.g. country x category x product. The
+    monthly history of every series comes from one group-by query; the
+    fit (see app/services/forecast_models.py) is vectorized across series
+    and, for large batches, split over a process pool. Fitted parameters
+    are cached per filters, dimensions and dataset version, so other
+    horizons and pages only evaluate the models.
+    """
+
+    def __init__(self, workers: int):
+        self.data_service = data_service
+        self.workers = max(1, workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.data_service.version
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the server process runs threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def forecast(self, filters: Dict = None, dimensions: Tuple[str, ...] = (), measure: str = 'Revenue',
+                 horizon: int = 12, include_history: bool = False, limit: Optional[int] = None,
+                 offset: int = 0) -> Dict:
+        """Forecast of the next ``horizon`` months per series, with prediction intervals"""
+        unknown = [d for d in dimensions if d not in FORECAST_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(unknown)}. Available: {', '.join(FORECAST_DIMENSIONS)}")
+        if measure not in QUERY_MEASURES:
+            raise ValueError(f"Unknown measure: {measure}. Available: {', '.join(QUERY_MEASURES)}")
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"Horizon must be between 1 and {MAX_HORIZON} months")
+
+        model = self._fit(filters, tuple(dict.fromkeys(dimensions)), measure)
+        n_series, n_months = model.history.shape
+        stop = None if limit is None else offset + limit
+        page = np.arange(n_series)[offset:stop]
+        params = {key: values[page] for key, values in model.params.items()}
+        predictions = predict(params, model.start_month, n_months, horizon, CONFIDENCE_LEVEL,
+                              measure in NON_NEGATIVE_MEASURES)
+
+        series = []
+        for position, index in enumerate(page):
+            entry = {output_name(d): model.labels[d][index] for d in model.dimensions}
+            entry['model'] = MODEL_NAMES[int(params['kind'][position])]
+            entry['forecast'] = predictions['forecast'][position]
+            entry['lower'] = predictions['lower'][position]
+            entry['upper'] = predictions['upper'][position]
+            if include_history:
+                entry['history'] = model.history[index]
+            series.append(entry)
+
+        response = {
+            'measure': output_name(measure),
+            'dimensions': [output_name(d) for d in model.dimensions],
+            'horizon': horizon,
+            'confidence_level': CONFIDENCE_LEVEL,
+            'labels': model.month_labels(n_months, horizon),
+            'total_series': n_series,
+            'unforecast_series': int(np.count_nonzero(model.params['kind'] == NO_MODEL)),
+            'fit_seconds': model.fit_seconds,
+            'offset': offset,
+            'limit': limit,
+            'series': series
+        }
+        if include_history:
+            response['history_labels'] = model.month_labels(0, n_months)
+        return response
+
+    @cached
+    def _fit(self, filters: Dict, dimensions: Tuple[str, ...], measure: str) -> ForecastModel:
+        started = time.perf_counter()
+        labels, start_month, history = self._monthly_history(filters, list(dimensions), measure)
+        params = self._fit_history(history, start_month)
+        return ForecastModel(list(dimensions), labels, start_month, history, params,
+                             time.perf_counter() - started)
+
+    def _history_window(self, filters: Dict) -> Tuple[int, int]:
+        """First and last whole month covered by the data and the filter dates"""
+        date_range = self.data_service.get_filter_options()['date_range']
+        first = pd.Timestamp(date_range['min_date'])
+        last = pd.Timestamp(date_range['max_date'])
+        if filters and filters.get('start_date'):
+            first = max(first, pd.Timestamp(filters['start_date']))
+        if filters and filters.get('end_date'):
+            last = min(last, pd.Timestamp(filters['end_date']))
+        # Months cut by a bound would read as a drop in sales
+        first_month = _month_index(first) + (first.day > 1)
+        last_month = _month_index(last) - (not last.is_month_end)
+        return first_month, last_month
+
+    def _monthly_history(self, filters: Dict, dimensions: List[str], measure: str):
+        """Series labels, first month and the (series x month) matrix of monthly totals"""
+        first_month, last_month = self._history_window(filters)
+        n_months = max(0, last_month - first_month + 1)
+        grouped = self.data_service.get_view(filters).aggregate([*dimensions, 'Year', 'Month'], [(measure, 'sum')])
+        values = grouped.values[(measure, 'sum')]
+
+        years = grouped.labels['Year'][grouped.codes['Year'] + 1]
+        month_of_code = np.array([MONTHS.index(m) for m in grouped.labels['Month'][1:]] + [-1], dtype=np.int64)
+        months = years.astype(np.int64) * 12 + month_of_code[grouped.codes['Month']] - first_month
+        in_window = (grouped.codes['Month'] >= 0) & (months >= 0) & (months < n_months)
+
+        if dimensions:
+            sizes = [len(grouped.labels[d]) for d in dimensions]
+            keys = np.ravel_multi_index([grouped.codes[d] + 1 for d in dimensions], sizes)
+            series_keys, series_index = np.unique(keys, return_inverse=True)
+            series_codes = np.unravel_index(series_keys, sizes)
+            labels = {d: grouped.labels[d][codes].tolist() for d, codes in zip(dimensions, series_codes)}
+        else:
+            series_keys, series_index, labels = np.zeros(1), np.zeros(len(values), dtype=np.int64), {}
+
+        history = np.zeros((len(series_keys), n_months))
+        history[series_index.ravel()[in_window], months[in_window]] = values[in_window]
+        return labels, first_month, history
+
+    def _fit_history(self, history: np.ndarray, start_month: int) -> Dict[str, np.ndarray]:
+        n_series = len(history)
+        if self.workers == 1 or n_series < PARALLEL_MIN_SERIES:
+            return fit_series(history, start_month)
+        chunk = max(MIN_CHUNK_SERIES, math.ceil(n_series / self.workers))
+        chunks = [history[i:i + chunk] for i in range(0, n_series, chunk)]
+        parts = list(self._get_executor().map(fit_series, chunks, repeat(start_month)))
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+# Global instance
+forecast_service = ForecastService(config.FORECAST_WORKERS)
@@ -1,25 +1,40 @@
-from app.services.data_service import data_service
+from app.services.cache_service import cached
+from app.services.data_service import FilteredView, data_service
 from app.models.schemas import KPIResponse
-from typing import List, Dict
+from app.services.period_comparison import COMPARISON_PERIODS
+from typing import List, Dict, Tuple
+import numpy as np
 import pandas as pd
 
+# Metrics compared between periods
+PERIOD_METRICS = ['revenue', 'profit', 'orders', 'avg_order_value', 'profit_margin', 'customers', 'customer_satisfaction']
+
 class KPIService:
     def __init__(self):
         self.data_service = data_service
     
+    @property
+    def version(self):
+        """Version of the dataset the KPIs are computed from"""
+        return self.data_service.version
+    
+    @cached
     def calculate_main_kpis(self, filters: Dict = None) -> List[KPIResponse]:
         """Calculate main KPIs for the dashboard"""
-        df = self.data_service.get_filtered_data(filters)
-        
-        # Get comparison data (previous period)
-        prev_filters = self._get_previous_period_filters(filters)
-        prev_df = self.data_service.get_filtered_data(prev_filters)
+        return self.compute_main_kpis(self.data_service.get_view(filters))
+    
+    def compute_main_kpis(self, view: FilteredView) -> List[KPIResponse]:
+        """Calculate main KPIs from a filtered view"""
+        # Current and previous period in one pass
+        periods = view.compare(['previous_period'])
+        totals = periods['current']
+        prev_totals = periods['previous_period']
         
         kpis = []
         
         # Total Revenue
-        current_revenue = df['Revenue'].sum()
-        prev_revenue = prev_df['Revenue'].sum()
+        current_revenue = totals['revenue']
+        prev_revenue = prev_totals['revenue']
         revenue_change = ((current_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
         
         kpis.append(KPIResponse(
@@ -31,8 +46,8 @@ class KPIService:
         ))
         
         # Total Profit
-        current_profit = df['Profit'].sum()
-        prev_profit = prev_df['Profit'].sum()
+        current_profit = totals['profit']
+        prev_profit = prev_totals['profit']
         profit_change = ((current_profit - prev_profit) / prev_profit * 100) if prev_profit > 0 else 0
         
         kpis.append(KPIResponse(
@@ -44,8 +59,8 @@ class KPIService:
         ))
         
         # Orders Count
-        current_orders = len(df)
-        prev_orders = len(prev_df)
+        current_orders = totals['orders']
+        prev_orders = prev_totals['orders']
         orders_change = ((current_orders - prev_orders) / prev_orders * 100) if prev_orders > 0 else 0
         
         kpis.append(KPIResponse(
@@ -57,8 +72,8 @@ class KPIService:
         ))
         
         # Average Order Value
-        current_aov = df['Revenue'].mean()
-        prev_aov = prev_df['Revenue'].mean()
+        current_aov = totals['avg_order_value']
+        prev_aov = prev_totals['avg_order_value']
         aov_change = ((current_aov - prev_aov) / prev_aov * 100) if prev_aov > 0 else 0
         
         kpis.append(KPIResponse(
@@ -83,8 +98,8 @@ class KPIService:
         ))
         
         # Customer Satisfaction Score (simulated based on repeat customers)
-        customer_satisfaction = self._calculate_customer_satisfaction(df)
-        prev_satisfaction = self._calculate_customer_satisfaction(prev_df)
+        customer_satisfaction = self._calculate_customer_satisfaction(totals)
+        prev_satisfaction = self._calculate_customer_satisfaction(prev_totals)
         satisfaction_change = customer_satisfaction - prev_satisfaction
         
         kpis.append(KPIResponse(
@@ -97,32 +112,46 @@ class KPIService:
         
         return kpis
     
-    def _get_previous_period_filters(self, filters: Dict = None) -> Dict:
-        """Get filters for the previous period for comparison"""
-        if not filters:
-            filters = {}
-        
-        prev_filters = filters.copy()
-        
-        # If date range is specified, shift it back by the same duration
-        if filters.get('start_date') and filters.get('end_date'):
-            start_date = pd.to_datetime(filters['start_date'])
-            end_date = pd.to_datetime(filters['end_date'])
-            duration = end_date - start_date
-            
-            prev_filters['start_date'] = (start_date - duration).strftime('%Y-%m-%d')
-            prev_filters['end_date'] = (end_date - duration).strftime('%Y-%m-%d')
-        else:
-            # Default to previous year comparison
-            current_year = pd.Timestamp.now().year
-            prev_filters['start_date'] = f'{current_year-1}-01-01'
-            prev_filters['end_date'] = f'{current_year-1}-12-31'
-        
-        return prev_filters
+    @cached
+    def compare_periods(self, filters: Dict = None, comparisons: Tuple[str, ...] = None) -> Dict:
+        """KPIs of the filtered period against several comparison periods"""
+        comparisons = list(comparisons) if comparisons else COMPARISON_PERIODS
+        periods = self.data_service.get_view(filters).compare(comparisons)
+        
+        metrics = {name: self._period_metrics(totals) for name, totals in periods.items()}
+        current = metrics['current']
+        result = {'current': current, 'comparisons': {}}
+        for name in comparisons:
+            previous = metrics[name]
+            change = {}
+            for key in PERIOD_METRICS:
+                if current[key] is None or not previous[key]:
+                    change[key] = None
+                elif key in ('profit_margin', 'customer_satisfaction'):
+                    change[key] = current[key] - previous[key]  # Percentage points
+                else:
+                    change[key] = (current[key] - previous[key]) / previous[key] * 100
+            result['comparisons'][name] = {**previous, 'change': change}
+        return result
     
-    def _calculate_customer_satisfaction(self, df: pd.DataFrame) -> float:
+    def _period_metrics(self, totals: Dict) -> Dict:
+        revenue = float(totals['revenue'])
+        orders = totals['orders']
+        return {
+            'start_date': totals['start_date'].strftime('%Y-%m-%d'),
+            'end_date': totals['end_date'].strftime('%Y-%m-%d'),
+            'revenue': revenue,
+            'profit': float(totals['profit']),
+            'orders': orders,
+            'avg_order_value': revenue / orders if orders > 0 else None,
+            'profit_margin': float(totals['profit']) / revenue * 100 if revenue > 0 else 0.0,
+            'customers': totals['customers'],
+            'customer_satisfaction': self._calculate_customer_satisfaction(totals)
+        }
+    
+    def _calculate_customer_satisfaction(self, totals: Dict) -> float:
         """Calculate customer satisfaction score based on business metrics"""
-        if df.empty:
+        if totals['orders'] == 0:
             return 0.0
         
         # Simulate customer satisfaction based on:
@@ -130,30 +159,33 @@ class KPIService:
         # 2. Average order value
         # 3. Profit margin per customer
         
-        customers = df.groupby(['Customer_Age', 'Customer_Gender', 'Country']).size()
-        repeat_customers = (customers > 1).sum()
-        total_customers = len(customers)
-        repeat_rate = (repeat_customers / total_customers) if total_customers > 0 else 0
+        repeat_rate = totals['repeat_customer_rate']
         
         # Normalize metrics to 0-100 scale
         satisfaction_score = min(100, (repeat_rate * 80) + 20)  # Base 20% + up to 80% based on repeat rate
         
         return round(satisfaction_score, 1)
     
+    @cached
     def get_performance_metrics(self, filters: Dict = None) -> Dict:
         """Get detailed performance metrics"""
-        df = self.data_service.get_filtered_data(filters)
+        return self.compute_performance_metrics(self.data_service.get_view(filters))
+    
+    def compute_performance_metrics(self, view: FilteredView) -> Dict:
+        """Get detailed performance metrics from a filtered view"""
+        totals = view.totals
+        orders = totals['orders']
         
         return {
             "conversion_metrics": {
-                "total_visitors": len(df) * 3,  # Simulated: assuming 3 visitors per order
-                "total_orders": len(df),
+                "total_visitors": orders * 3,  # Simulated: assuming 3 visitors per order
+                "total_orders": orders,
                 "conversion_rate": 33.3  # Simulated conversion rate
             },
             "financial_metrics": {
-                "revenue_per_customer": df.groupby(['Customer_Age', 'Customer_Gender', 'Country'])['Revenue'].sum().mean(),
-                "profit_per_order": df['Profit'].mean(),
-                "cost_per_acquisition": df['Cost'].mean() * 0.1  # Simulated CPA
+                "revenue_per_customer": view.customers['Revenue'].mean(),
+                "profit_per_order": totals['profit'] / orders if orders > 0 else np.nan,
+                "cost_per_acquisition": (totals['cost'] / orders if orders > 0 else np.nan) * 0.1  # Simulated CPA
             },
             "operational_metrics": {
                 "avg_order_processing_time": 2.5,  # Simulated in days
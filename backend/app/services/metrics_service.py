@@ -0,0 +1,228 @@
+import contextvars
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.services.filter_engine import canonical_filters
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS)
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound below which a fraction q of observations fall"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class RequestMetrics:
+    """Per-request accumulator of exclusive time per phase.
+
+    Phases nest: time spent in an inner phase is not counted again in the
+    enclosing one, so the phases of a request add up to at most its latency.
+    """
+
+    __slots__ = ('phases', 'filters', '_children')
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.filters = None
+        self._children: List[float] = []
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_current_request = contextvars.ContextVar('bike_request_metrics', default=None)
+
+
+class _PhaseTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: RequestMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics._children.append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        children = self.metrics._children
+        nested = children.pop()
+        self.metrics.add(self.name, elapsed - nested)
+        if children:
+            children[-1] += elapsed
+        return False
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def phase(name: str):
+    """Context manager timing a phase of the current request (a no-op outside requests or when disabled)"""
+    metrics = _current_request.get() if config.METRICS_ENABLED else None
+    if metrics is None:
+        return _NO_TIMER
+    return _PhaseTimer(metrics, name)
+
+
+def record_phase(name: str, seconds: float):
+    """Add time measured elsewhere (e.g. executor queueing) to a phase of the current request"""
+    metrics = _current_request.get()
+    if metrics is not None:
+        metrics.add(name, seconds)
+
+
+def note_filters(filters: Optional[Dict]):
+    """Remember the first filter payload a request computes with, for the slow-request log"""
+    metrics = _current_request.get()
+    if metrics is not None and metrics.filters is None:
+        metrics.filters = canonical_filters(filters)
+
+
+class MetricsService:
+    """Request latency and phase histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, slow_request_seconds: float):
+        self.slow_request_seconds = slow_request_seconds
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self._phases: Dict[Tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+        self.slow_requests = 0
+
+    def start_request(self) -> Tuple[RequestMetrics, contextvars.Token]:
+        metrics = RequestMetrics()
+        with self._lock:
+            self.in_flight += 1
+        return metrics, _current_request.set(metrics)
+
+    def finish_request(self, token: contextvars.Token, metrics: RequestMetrics,
+                       method: str, route: str, status: int, seconds: float):
+        _current_request.reset(token)
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, str(status))
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+            for name, phase_seconds in metrics.phases.items():
+                histogram = self._phases.get((route, name))
+                if histogram is None:
+                    histogram = self._phases[(route, name)] = Histogram()
+                histogram.observe(phase_seconds)
+            slow = seconds >= self.slow_request_seconds
+            if slow:
+                self.slow_requests += 1
+
+        # 503s are deliberate rejections (executor full, dataset still loading): counted, not logged
+        if slow or (status >= 500 and status != 503):
+            print(json.dumps({
+                'event': 'slow_request' if slow else 'failed_request',
+                'method': method,
+                'route': route,
+                'status': status,
+                'duration_ms': round(seconds * 1e3, 2),
+                'phases_ms': {name: round(value * 1e3, 2) for name, value in metrics.phases.items()},
+                'filters': metrics.filters
+            }, default=str))
+
+    def summary(self) -> Dict:
+        """Latency percentiles per route, for humans"""
+        with self._lock:
+            routes = {}
+            for (method, route, status), histogram in sorted(self._requests.items()):
+                routes[f'{method} {route} {status}'] = {
+                    'count': histogram.count,
+                    'mean_ms': histogram.sum / histogram.count * 1e3,
+                    'p50_le_ms': histogram.quantile(0.5) * 1e3,
+                    'p99_le_ms': histogram.quantile(0.99) * 1e3
+                }
+            return {'in_flight': self.in_flight, 'slow_requests': self.slow_requests, 'routes': routes}
+
+    def render(self, gauges: Dict[str, Tuple[str, float]] = None) -> str:
+        """Prometheus text exposition; gauges maps metric name -> (help, value)"""
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'bike_http_request_duration_seconds', "Request latency",
+                                    ('method', 'route', 'status'), self._requests)
+            self._render_histograms(lines, 'bike_request_phase_duration_seconds',
+                                    "Time per request spent in each phase (filter, aggregate, serialize, queue, ...)",
+                                    ('route', 'phase'), self._phases)
+            gauges = dict(gauges or {})
+            gauges['bike_http_requests_in_flight'] = ("Requests being handled", self.in_flight)
+            gauges['bike_slow_requests_total'] = ("Requests slower than the slow-request threshold", self.slow_requests)
+
+        for name, (help_text, value) in gauges.items():
+            kind = 'counter' if name.endswith('_total') else 'gauge'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines: List[str], name: str, help_text: str, label_names, histograms: Dict):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(histograms.items()):
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if value is None:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+# Global instance
+metrics_service = MetricsService(slow_request_seconds=config.SLOW_REQUEST_SECONDS)
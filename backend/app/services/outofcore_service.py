@@ -0,0 +1,364 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.services.cube_service import DataCube
+from app.services.customer_index import CUSTOMER_KEY
+from app.services.dataset_schema import concat_aligned
+from app.services.filter_engine import DIMENSION_COLUMNS, FilterEngine
+from app.services.partition_store import PartitionStore, read_partition
+from app.services.snapshot_service import dataset_version, prepare_source_frame
+from app.services.synopsis import Synopsis
+
+# Parsed rows take several times their CSV size until the compact schema applies
+PARSE_EXPANSION = 8
+MIN_RANGE_BYTES = 1 << 20
+
+
+class Partial:
+    """Combinable aggregates of the rows matching one filter.
+
+    ``cells`` has the cube's grain and columns, so every sum, count and
+    mean over the filter dimensions (the mean order quantity included, as
+    a sum over a ``Rows`` count) re-aggregates from it. ``products`` holds
+    revenue per product and ``customers`` revenue, profit and order count
+    per customer key. Merging partials is a concatenation and a regroup,
+    and the merged result does not depend on how the rows were split.
+    """
+
+    __slots__ = ('cells', 'products', 'customers')
+
+    def __init__(self, cells: pd.DataFrame, products: pd.Series, customers: pd.DataFrame):
+        self.cells = cells
+        self.products = products
+        self.customers = customers
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.cells.memory_usage(index=False).sum() + self.products.memory_usage(index=False)
+                   + self.customers.memory_usage(index=False).sum())
+
+    @classmethod
+    def from_rows(cls, df: pd.DataFrame) -> 'Partial':
+        products = df.groupby('Product', observed=True)['Revenue'].sum()
+        grouped = df.groupby(CUSTOMER_KEY, sort=True, observed=True)
+        customers = grouped[['Revenue', 'Profit']].sum()
+        customers['Orders'] = grouped.size()
+        # Plain labels, so partials with different categories concatenate cleanly
+        products.index = products.index.astype(object)
+        customers.index = customers.index.set_levels(
+            [level.astype(object) for level in customers.index.levels])
+        return cls(DataCube._aggregate(df), products, customers)
+
+    @classmethod
+    def merge(cls, partials: List['Partial']) -> 'Partial':
+        if len(partials) == 1:
+            return partials[0]
+        products = pd.concat([partial.products for partial in partials])
+        customers = pd.concat([partial.customers for partial in partials])
+        return cls(
+            DataCube._aggregate(concat_aligned([partial.cells for partial in partials])),
+            products.groupby(level=0, sort=True).sum(),
+            customers.groupby(level=list(range(len(CUSTOMER_KEY))), sort=True).sum()
+        )
+
+
+def _profile(df: pd.DataFrame) -> Dict:
+    dates = df['Date']
+    return {
+        'rows': len(df),
+        'min_date': dates.iloc[0] if len(df) else None,
+        'max_date': dates.iloc[-1] if len(df) else None,
+        'values': {column: set(df[column].dropna().unique().tolist()) for column in DIMENSION_COLUMNS.values()}
+    }
+
+
+def _merge_profiles(profiles: List[Dict]) -> Dict:
+    min_dates = [p['min_date'] for p in profiles if p['min_date'] is not None]
+    max_dates = [p['max_date'] for p in profiles if p['max_date'] is not None]
+    return {
+        'rows': sum(p['rows'] for p in profiles),
+        'min_date': min(min_dates) if min_dates else None,
+        'max_date': max(max_dates) if max_dates else None,
+        'values': {column: set().union(*(p['values'][column] for p in profiles)) for column in DIMENSION_COLUMNS.values()}
+    }
+
+
+def _map_partition(csv_path: str, columns: List[str], start: int, stop: int,
+                   filters_list: List[Optional[Dict]]) -> Tuple[Dict, List[Partial]]:
+    # Runs in a worker process: parse one byte range of the CSV and aggregate it per filter
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    df = prepare_source_frame(pd.read_csv(io.BytesIO(data), header=None, names=columns))
+    engine = FilterEngine(df)
+    partials = [Partial.from_rows(FilterEngine.apply(df, engine.select(filters))) for filters in filters_list]
+    return _profile(df), partials
+
+
+# Partitions a worker process has read, least recently used first, with their byte sizes
+_worker_partitions: 'OrderedDict[Tuple[str, ...], Tuple[pd.DataFrame, FilterEngine, int]]' = OrderedDict()
+
+
+def _map_stored_partition(version: str, path: str, files: List[str], filters_list: List[Optional[Dict]],
+                          cache_bytes: int) -> List[Partial]:
+    # Runs in a worker process: aggregate one stored partition per filter. Each
+    # worker keeps the partitions it read in its own LRU of cache_bytes, so
+    # repeated scans skip the Parquet reads. Rebuilt partitions reuse their
+    # file names, so the source version is part of the key
+    key = (version, path, *files)
+    if key in _worker_partitions:
+        _worker_partitions.move_to_end(key)
+        df, engine, _ = _worker_partitions[key]
+    else:
+        df = read_partition(path, files)
+        engine = FilterEngine(df)
+        _worker_partitions[key] = (df, engine, int(df.memory_usage(index=False, deep=True).sum()))
+        while sum(entry[2] for entry in _worker_partitions.values()) > cache_bytes and len(_worker_partitions) > 1:
+            _worker_partitions.popitem(last=False)
+    return [Partial.from_rows(FilterEngine.apply(df, engine.select(filters))) for filters in filters_list]
+
+
+class _PartialMerger:
+    """Collects partials per filter and merges them whenever the buffer outgrows its byte limit"""
+
+    def __init__(self, n_filters: int, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.merged: List[Optional[Partial]] = [None] * n_filters
+        self.pending: List[List[Partial]] = [[] for _ in range(n_filters)]
+        self.pending_bytes = 0
+
+    def add(self, index: int, partial: Partial):
+        self.pending[index].append(partial)
+        self.pending_bytes += partial.nbytes
+        # Merging costs a regroup of everything merged so far, so it waits for a full buffer
+        if self.pending_bytes > self.limit_bytes:
+            for i in range(len(self.pending)):
+                self._flush(i)
+            self.pending_bytes = 0
+
+    def _flush(self, index: int):
+        parts = ([self.merged[index]] if self.merged[index] else []) + self.pending[index]
+        if parts:
+            self.merged[index] = Partial.merge(parts)
+        self.pending[index] = []
+
+    def results(self) -> List[Optional[Partial]]:
+        for index in range(len(self.pending)):
+            self._flush(index)
+        return self.merged
+
+
+class OutOfCoreEngine:
+    """Aggregates a CSV larger than memory by map-reduce over its partitions.
+
+    The file is cut into byte ranges at line boundaries, sized so that all
+    workers parsing a range at once stay within the memory budget. Each
+    worker process parses its range and reduces it to a ``Partial`` per
+    requested filter; the parent merges partials as they arrive, so it never
+    holds more than the merged aggregates and a buffer of partials. The
+    merged partial is what a full in-memory pass over the matching rows
+    would produce, so the usual aggregations run on it unchanged. Integer
+    sums are exact; float sums may differ in the last ulp, as the additions
+    happen in a different order.
+
+    With a ``PartitionStore`` the byte ranges are only parsed once, to write
+    the year/month partitions; queries then read just the partitions their
+    filters can match. Scans fan those out to the workers, one partition
+    per task, except for partitions already resident in the store's LRU
+    (filled by row-level reads). Each worker also caches the partitions it
+    read, within its share of the LRU budget. With a single worker the
+    partitions are read into the LRU and aggregated in the calling thread.
+    """
+
+    def __init__(self, csv_path: str, memory_budget_bytes: int, workers: int,
+                 partitioned: bool = False, partition_dir: Optional[str] = None, partition_cache_bytes: int = 0):
+        self.csv_path = csv_path
+        self.version = dataset_version(csv_path)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.workers = max(1, workers)
+        self.columns, self.ranges = self._plan()
+        self.profile = None
+        self.scans = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self.synopsis = None
+        self._synopsis_lock = threading.Lock()
+        self.store = None
+        if partitioned:
+            self.store = PartitionStore(csv_path, partition_dir, partition_cache_bytes).open(
+                self.ranges, self.columns, self._get_executor())
+            self.profile = self._store_profile()
+
+    def _plan(self) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """Header columns and the (start, stop) byte range of every part of the file"""
+        size = os.path.getsize(self.csv_path)
+        range_bytes = max(MIN_RANGE_BYTES, self.memory_budget_bytes // (self.workers * PARSE_EXPANSION))
+        ranges = []
+        with open(self.csv_path, 'rb') as f:
+            columns = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns.tolist()
+            start = f.tell()
+            while start < size:
+                f.seek(min(start + range_bytes, size))
+                f.readline()
+                stop = min(f.tell(), size)
+                ranges.append((start, stop))
+                start = stop
+        return columns, ranges
+
+    def _store_profile(self) -> Dict:
+        partitions = self.store.partitions
+        if not partitions:
+            return self._empty_profile()
+        return {
+            'rows': sum(entry['rows'] for entry in partitions),
+            'min_date': min(entry['min_date'] for entry in partitions),
+            'max_date': max(entry['max_date'] for entry in partitions),
+            'values': {column: set().union(*(entry['values'][column] for entry in partitions))
+                       for column in DIMENSION_COLUMNS.values()}
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the server process runs threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def scan(self, filters_list: List[Optional[Dict]]) -> List[Partial]:
+        """One pass over the data, returning the merged partial of each filter"""
+        merger = _PartialMerger(len(filters_list), self.memory_budget_bytes // 4)
+        if self.store is not None:
+            self._scan_partitions(filters_list, merger)
+        else:
+            self._scan_ranges(filters_list, merger)
+        with self._lock:
+            self.scans += 1
+        return [partial if partial is not None else self._empty_partial() for partial in merger.results()]
+
+    def _scan_ranges(self, filters_list: List[Optional[Dict]], merger: _PartialMerger):
+        executor = self._get_executor()
+        futures = [executor.submit(_map_partition, self.csv_path, self.columns, start, stop, list(filters_list))
+                   for start, stop in self.ranges]
+        profiles = []
+        try:
+            for future in as_completed(futures):
+                profile, partials = future.result()
+                profiles.append(profile)
+                for index, partial in enumerate(partials):
+                    merger.add(index, partial)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        with self._lock:
+            if self.profile is None:
+                self.profile = _merge_profiles(profiles) if profiles else self._empty_profile()
+
+    def _scan_partitions(self, filters_list: List[Optional[Dict]], merger: _PartialMerger):
+        # Partitions already in the LRU are aggregated here; the others are read and
+        # aggregated by the workers, one task per partition, while this runs
+        resident, stored = [], []
+        for entry, wanted in self.store.select(filters_list):
+            found = self.store.resident(entry)
+            if found is None and self.workers == 1:
+                # A single worker would only add the transfer of the partials
+                found = self.store.get(entry)
+            if found is not None:
+                resident.append((found, wanted))
+            else:
+                stored.append((entry, wanted))
+
+        futures = {}
+        try:
+            if stored:
+                executor = self._get_executor()
+                for entry, wanted in stored:
+                    future = executor.submit(_map_stored_partition, self.version, self.store.path, entry['files'],
+                                             [filters_list[index] for index in wanted],
+                                             self.store.cache_bytes // self.workers)
+                    futures[future] = wanted
+            for (df, engine), wanted in resident:
+                for index in wanted:
+                    merger.add(index, Partial.from_rows(FilterEngine.apply(df, engine.select(filters_list[index]))))
+            for future in as_completed(futures):
+                for index, partial in zip(futures[future], future.result()):
+                    merger.add(index, partial)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def rows(self, filters: Optional[Dict] = None) -> pd.DataFrame:
+        """Rows matching the filters, read from the partitions they can match"""
+        if self.store is None:
+            raise ValueError("Row-level data in out-of-core mode needs the partition store")
+        frames = []
+        for entry, _ in self.store.select([filters]):
+            df, engine = self.store.get(entry)
+            frames.append(FilterEngine.apply(df, engine.select(filters)))
+        return concat_aligned(frames) if frames else pd.DataFrame(columns=self.columns)
+
+    def get_synopsis(self, sample_fraction: float) -> Synopsis:
+        """Sample and sketches for approximate queries, built from the partitions on first use"""
+        if self.store is None:
+            raise ValueError("Approximate queries in out-of-core mode need the partition store")
+        with self._synopsis_lock:
+            if self.synopsis is None:
+                # Every partition holds one month
+                self.synopsis = Synopsis.build((self.store.get(entry)[0] for entry in self.store.partitions),
+                                               sample_fraction)
+            return self.synopsis
+
+    def _empty_partial(self) -> Partial:
+        if self.store is not None and self.store.partitions:
+            # Typed like real rows, so empty results aggregate like empty selections
+            df, _ = self.store.get(self.store.partitions[0])
+            return Partial.from_rows(df.iloc[:0])
+        df = prepare_source_frame(pd.DataFrame({column: pd.Series(dtype=object) for column in self.columns}))
+        return Partial.from_rows(df)
+
+    def _empty_profile(self) -> Dict:
+        return {'rows': 0, 'min_date': None, 'max_date': None,
+                'values': {column: set() for column in DIMENSION_COLUMNS.values()}}
+
+    def get_profile(self) -> Dict:
+        """Row count, date range and dimension values of the whole file (from the partition
+        manifest, or from the first scan)"""
+        if self.profile is None:
+            self.scan([])
+        return self.profile
+
+    def date_range(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        profile = self.get_profile()
+        if profile['min_date'] is None:
+            now = pd.Timestamp.now()
+            return now, now
+        return pd.Timestamp(profile['min_date']), pd.Timestamp(profile['max_date'])
+
+    def stats(self) -> Dict:
+        profile = self.profile
+        return {
+            'source': self.csv_path,
+            'bytes': os.path.getsize(self.csv_path),
+            'ranges': len(self.ranges),
+            'workers': self.workers,
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'scans': self.scans,
+            'rows': profile['rows'] if profile else None,
+            'synopsis_bytes': self.synopsis.nbytes if self.synopsis is not None else None,
+            'partitions': self.store.stats() if self.store is not None else None
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,214 @@
+import glob
+import io
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.services.dataset_schema import concat_aligned
+from app.services.filter_engine import DIMENSION_COLUMNS, FilterEngine
+from app.services.snapshot_service import MANIFEST_NAME, file_lock, prepare_source_frame, source_fingerprint, source_matches
+
+PARTITION_FORMAT_VERSION = 1
+
+
+def _write_range(csv_path: str, columns: List[str], start: int, stop: int, target: str, part: int) -> List[Dict]:
+    # Runs in a worker process: split one byte range of the CSV by month and write a file per month
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    df = prepare_source_frame(pd.read_csv(io.BytesIO(data), header=None, names=columns))
+    months = df['Date'].dt.to_period('M')
+    written = []
+    for period, rows in df.groupby(months, sort=True):
+        key = f'year={period.year}/month={period.month:02d}'
+        os.makedirs(os.path.join(target, key), exist_ok=True)
+        filename = f'{key}/part-{part:05d}.parquet'
+        rows.to_parquet(os.path.join(target, filename), index=False)
+        written.append({
+            'key': key,
+            'file': filename,
+            'rows': len(rows),
+            'min_date': rows['Date'].iloc[0].isoformat(),
+            'max_date': rows['Date'].iloc[-1].isoformat(),
+            'values': {column: sorted(str(value) for value in rows[column].dropna().unique())
+                       for column in DIMENSION_COLUMNS.values()}
+        })
+    return written
+
+
+def read_partition(path: str, files: List[str]) -> pd.DataFrame:
+    """Rows of one partition, read from its Parquet files"""
+    frames = [pd.read_parquet(os.path.join(path, filename)) for filename in files]
+    return prepare_source_frame(concat_aligned(frames))
+
+
+def _merge_entries(pieces: List[Dict]) -> List[Dict]:
+    """One manifest entry per partition from the per-file statistics"""
+    partitions = {}
+    for piece in pieces:
+        entry = partitions.setdefault(piece['key'], {
+            'key': piece['key'], 'files': [], 'rows': 0, 'min_date': piece['min_date'], 'max_date': piece['max_date'],
+            'values': {column: [] for column in DIMENSION_COLUMNS.values()}
+        })
+        entry['files'].append(piece['file'])
+        entry['rows'] += piece['rows']
+        entry['min_date'] = min(entry['min_date'], piece['min_date'])
+        entry['max_date'] = max(entry['max_date'], piece['max_date'])
+        for column, values in piece['values'].items():
+            entry['values'][column] = sorted(set(entry['values'][column]) | set(values))
+    for entry in partitions.values():
+        entry['files'].sort()
+    return [partitions[key] for key in sorted(partitions)]
+
+
+class PartitionStore:
+    """Year/month partitioned Parquet copy of the source CSV.
+
+    The manifest records, for every month, its files, row count, first and
+    last date and the distinct values of each filter dimension. A query
+    reads only the partitions whose statistics can match its date range
+    and dimension lists, so a narrow date range costs in proportion to the
+    months it covers. Partitions are loaded on first use and kept in an LRU
+    bounded in bytes. Like the snapshot, the store is rebuilt when the
+    source fingerprint no longer matches.
+    """
+
+    def __init__(self, csv_path: str, partition_dir: Optional[str] = None, cache_bytes: int = 256 * 1024 * 1024):
+        base_dir = partition_dir or os.path.join(os.path.dirname(csv_path), '.partitions')
+        self.csv_path = csv_path
+        self.path = os.path.join(base_dir, os.path.splitext(os.path.basename(csv_path))[0])
+        self.cache_bytes = cache_bytes
+        self.partitions: List[Dict] = []
+        self._resident: 'OrderedDict[str, Tuple[pd.DataFrame, FilterEngine, int]]' = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.pruned = 0
+
+    def read_manifest(self) -> Optional[Dict]:
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != PARTITION_FORMAT_VERSION or not source_matches(self.csv_path, manifest['source']):
+            return None
+        return manifest
+
+    def open(self, ranges: List[Tuple[int, int]], columns: List[str], executor) -> 'PartitionStore':
+        """Load the manifest, first (re)building the partitions on the executor if they are missing or stale"""
+        manifest = self.read_manifest()
+        if manifest is None:
+            with file_lock(f'{self.path}.lock'):
+                manifest = self.read_manifest()
+                if manifest is None:
+                    self.build(ranges, columns, executor)
+                    print(f"Partitions written to {self.path}")
+                    manifest = self.read_manifest()
+        for entry in manifest['partitions']:
+            entry['min_date'] = pd.Timestamp(entry['min_date'])
+            entry['max_date'] = pd.Timestamp(entry['max_date'])
+            entry['values'] = {column: set(values) for column, values in entry['values'].items()}
+        self.partitions = manifest['partitions']
+        return self
+
+    def build(self, ranges: List[Tuple[int, int]], columns: List[str], executor):
+        """Write the partitions, one worker per byte range, then swap them into place"""
+        # Called under the build lock, so any other temporary directory is left over from a killed build
+        for stale in glob.glob(f'{glob.escape(self.path)}.tmp-*'):
+            shutil.rmtree(stale, ignore_errors=True)
+        tmp_dir = f'{self.path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_dir)
+        futures = [executor.submit(_write_range, self.csv_path, columns, start, stop, tmp_dir, part)
+                   for part, (start, stop) in enumerate(ranges)]
+        pieces = [piece for future in futures for piece in future.result()]
+
+        manifest = {
+            'format_version': PARTITION_FORMAT_VERSION,
+            'source': source_fingerprint(self.csv_path),
+            'partitions': _merge_entries(pieces)
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+        old_dir = f'{self.path}.old-{os.getpid()}'
+        if os.path.exists(self.path):
+            os.replace(self.path, old_dir)
+        os.replace(tmp_dir, self.path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @staticmethod
+    def may_match(entry: Dict, filters: Optional[Dict]) -> bool:
+        """Whether a partition's statistics allow any row to match the filters"""
+        if not filters:
+            return True
+        if filters.get('start_date') and entry['max_date'] < pd.to_datetime(filters['start_date']):
+            return False
+        if filters.get('end_date') and entry['min_date'] > pd.to_datetime(filters['end_date']):
+            return False
+        for key, column in DIMENSION_COLUMNS.items():
+            if filters.get(key) and entry['values'][column].isdisjoint(filters[key]):
+                return False
+        return True
+
+    def select(self, filters_list: List[Optional[Dict]]) -> List[Tuple[Dict, List[int]]]:
+        """Partitions to read, each with the indexes of the filters it may match"""
+        selected = []
+        for entry in self.partitions:
+            wanted = [index for index, filters in enumerate(filters_list) if self.may_match(entry, filters)]
+            if wanted:
+                selected.append((entry, wanted))
+        with self._lock:
+            self.pruned += len(self.partitions) - len(selected)
+        return selected
+
+    def resident(self, entry: Dict) -> Optional[Tuple[pd.DataFrame, FilterEngine]]:
+        """A partition's rows and filter engine if it is in the LRU, else None"""
+        key = entry['key']
+        with self._lock:
+            if key not in self._resident:
+                return None
+            self._resident.move_to_end(key)
+            self.hits += 1
+            df, engine, _ = self._resident[key]
+            return df, engine
+
+    def get(self, entry: Dict) -> Tuple[pd.DataFrame, FilterEngine]:
+        """A partition's rows and filter engine, from the LRU or read from disk"""
+        found = self.resident(entry)
+        if found is not None:
+            return found
+
+        key = entry['key']
+        df = read_partition(self.path, entry['files'])
+        engine = FilterEngine(df)
+        nbytes = int(df.memory_usage(index=False, deep=True).sum())
+
+        with self._lock:
+            self.loads += 1
+            if key not in self._resident:
+                self._resident[key] = (df, engine, nbytes)
+                self._resident_bytes += nbytes
+            while self._resident_bytes > self.cache_bytes and len(self._resident) > 1:
+                _, (_, _, evicted) = self._resident.popitem(last=False)
+                self._resident_bytes -= evicted
+        return df, engine
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'path': self.path,
+                'partitions': len(self.partitions),
+                'resident': len(self._resident),
+                'resident_bytes': self._resident_bytes,
+                'cache_bytes': self.cache_bytes,
+                'loads': self.loads,
+                'hits': self.hits,
+                'pruned': self.pruned
+            }
@@ -0,0 +1,133 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.filter_engine import RowSelector
+
+# Comparison windows, relative to the current [start, end] window
+COMPARISON_PERIODS = [
+    'previous_period', 'year_over_year', 'month_over_month',
+    'trailing_7d', 'trailing_30d', 'trailing_90d'
+]
+TRAILING_DAYS = {'trailing_7d': 7, 'trailing_30d': 30, 'trailing_90d': 90}
+
+# Summed measures, by aggregate-frame column and result key
+MEASURES = {
+    'Revenue': 'revenue',
+    'Profit': 'profit',
+    'Cost': 'cost',
+    'Order_Quantity': 'order_quantity',
+    'Rows': 'orders'
+}
+
+Window = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+def window_bounds(filters: Dict, first: pd.Timestamp, last: pd.Timestamp) -> Window:
+    """Current window: the filtered dates, defaulting to the dataset's first and last day"""
+    start = pd.to_datetime(filters['start_date']) if filters.get('start_date') else first
+    end = pd.to_datetime(filters['end_date']) if filters.get('end_date') else last
+    return start, end
+
+
+def comparison_window(name: str, start: pd.Timestamp, end: pd.Timestamp, filters: Dict) -> Window:
+    """Inclusive date window of a comparison period"""
+    if name == 'previous_period':
+        if filters.get('start_date') and filters.get('end_date'):
+            # Shift back by the same duration
+            duration = end - start
+            return (start - duration).normalize(), (end - duration).normalize()
+        # Default to previous year comparison
+        year = pd.Timestamp.now().year - 1
+        return pd.Timestamp(f'{year}-01-01'), pd.Timestamp(f'{year}-12-31')
+    if name == 'year_over_year':
+        return start - pd.DateOffset(years=1), end - pd.DateOffset(years=1)
+    if name == 'month_over_month':
+        return start - pd.DateOffset(months=1), end - pd.DateOffset(months=1)
+    if name in TRAILING_DAYS:
+        return end - pd.Timedelta(days=TRAILING_DAYS[name] - 1), end
+    raise ValueError(f"Unknown comparison period: {name}")
+
+
+def _widen(values: np.ndarray) -> np.ndarray:
+    # Accumulate in 64 bits so that narrow integer and float32 columns do not overflow or drift
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64, copy=False)
+    return values.astype(np.float64, copy=False)
+
+
+def _sub_selector(selector: RowSelector, start: int, stop: int) -> RowSelector:
+    if isinstance(selector, slice):
+        return slice(selector.start + start, selector.start + stop)
+    return selector[start:stop]
+
+
+class PeriodComparison:
+    """Totals of the filtered window and of any number of comparison windows.
+
+    The dimension filters are the same for every window; only the dates
+    differ. So the union of all windows is selected once, reduced to one
+    row of summed measures per day and turned into prefix sums, after which
+    each window's totals are two lookups. Customer metrics use the matching
+    contiguous range of the (date-sorted) row selection. Adding comparison
+    windows therefore costs almost nothing beyond widening the union.
+    Integer measures are exact; float sums may differ from a direct sum in
+    the last ulp.
+    """
+
+    def __init__(self, dataset, filters: Dict = None):
+        self.dataset = dataset
+        self.filters = dict(filters or {})
+        dates = dataset.filter_engine.dates
+        first, last = (pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])) if len(dates) else (pd.Timestamp.now(),) * 2
+        self.start, self.end = window_bounds(self.filters, first, last)
+
+    def windows(self, comparisons: List[str]) -> Dict[str, Window]:
+        windows = {'current': (self.start, self.end)}
+        for name in comparisons:
+            windows[name] = comparison_window(name, self.start, self.end, self.filters)
+        return windows
+
+    def compute(self, comparisons: List[str]) -> Dict[str, Dict]:
+        """Totals per window, keyed by 'current' and the comparison names"""
+        windows = self.windows(comparisons)
+        union = dict(self.filters,
+                     start_date=min(start for start, _ in windows.values()).isoformat(),
+                     end_date=max(end for _, end in windows.values()).isoformat())
+
+        # One grouped pass: per-day sums of every measure over the union
+        cells = self.dataset.get_aggregate_frame(union)
+        cell_dates = cells['Date'].to_numpy()
+        day_starts = np.flatnonzero(np.concatenate([[True], cell_dates[1:] != cell_dates[:-1]])) if len(cells) else np.array([], dtype=np.int64)
+        days = cell_dates[day_starts]
+        prefix = {}
+        for column in MEASURES:
+            values = _widen(cells[column].to_numpy())
+            day_sums = np.add.reduceat(values, day_starts) if len(cells) else values[:0]
+            prefix[column] = np.concatenate([np.zeros(1, dtype=values.dtype), np.cumsum(day_sums)])
+
+        selector = self.dataset.filter_engine.select(union)
+        row_dates = self.dataset.filter_engine.dates[selector]
+        customers = self.dataset.customers
+
+        results = {}
+        for name, (start, end) in windows.items():
+            start64 = start.to_datetime64().astype(days.dtype)
+            end64 = end.to_datetime64().astype(days.dtype)
+            first_day = int(np.searchsorted(days, start64, side='left'))
+            stop_day = max(first_day, int(np.searchsorted(days, end64, side='right')))
+            totals = {key: prefix[column][stop_day] - prefix[column][first_day] for column, key in MEASURES.items()}
+            totals['orders'] = int(totals['orders'])
+            totals['avg_order_value'] = totals['revenue'] / totals['orders'] if totals['orders'] > 0 else np.nan
+
+            first_row = int(np.searchsorted(row_dates, start64, side='left'))
+            stop_row = max(first_row, int(np.searchsorted(row_dates, end64, side='right')))
+            rows = _sub_selector(selector, first_row, stop_row)
+            totals['customers'] = customers.distinct_count(rows)
+            totals['repeat_customer_rate'] = customers.repeat_rate(rows)
+            totals['start_date'] = start
+            totals['end_date'] = end
+            results[name] = totals
+
+        return results
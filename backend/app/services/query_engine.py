@@ -0,0 +1,223 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.data_generator import MONTHS
+
+# Columns a query can group by
+QUERY_DIMENSIONS = ['Country', 'State', 'Age_Group', 'Customer_Gender', 'Product_Category',
+                    'Sub_Category', 'Product', 'Year', 'Month']
+QUERY_MEASURES = ['Revenue', 'Profit', 'Cost', 'Order_Quantity']
+AGGREGATIONS = ['sum', 'mean', 'count', 'min', 'max']
+
+# What the cube cells (and out-of-core partials) can answer; the rest needs raw rows
+CELL_DIMENSIONS = {'Country', 'Age_Group', 'Product_Category', 'Year', 'Month'}
+CELL_AGGREGATIONS = {'sum', 'mean', 'count'}
+
+# Combined keys up to this many (or up to the row count) are aggregated into
+# dense arrays; beyond it the observed keys are sorted and numbered first
+DENSE_GROUP_LIMIT = 1 << 16
+
+Measure = Tuple[str, str]  # (column, aggregation)
+
+
+def output_name(name: str) -> str:
+    """Response key of a dimension column or a (column, aggregation) measure"""
+    if isinstance(name, tuple):
+        return f'{name[0].lower()}_{name[1]}'
+    return name.lower()
+
+
+def validate_query(dimensions: Sequence[str], measures: Sequence[Measure]):
+    unknown = [d for d in dimensions if d not in QUERY_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimensions: {', '.join(unknown)}. Available: {', '.join(QUERY_DIMENSIONS)}")
+    if not measures:
+        raise ValueError("At least one measure is required")
+    for column, agg in measures:
+        if column not in QUERY_MEASURES:
+            raise ValueError(f"Unknown measure: {column}. Available: {', '.join(QUERY_MEASURES)}")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg}. Use one of {', '.join(AGGREGATIONS)}")
+
+
+def cells_can_answer(dimensions: Sequence[str], measures: Sequence[Measure]) -> bool:
+    """Whether pre-aggregated cells (with a ``Rows`` count) hold enough detail for the query"""
+    return (all(d in CELL_DIMENSIONS for d in dimensions)
+            and all(agg in CELL_AGGREGATIONS for _, agg in measures))
+
+
+def dimension_codes(frame: pd.DataFrame, column: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer code per row (-1 for missing) and the label of each code, in display order"""
+    if column == 'Year':
+        years = frame['Year'].to_numpy() if 'Year' in frame else frame['Date'].dt.year.to_numpy()
+        first = int(years.min()) if len(years) else 0
+        last = int(years.max()) if len(years) else -1
+        return (years - first).astype(np.int64), np.arange(first, last + 1)
+
+    series = frame[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.array.codes.astype(np.int64), series.dtype.categories
+    else:
+        codes, labels = pd.factorize(series, sort=True, use_na_sentinel=True)
+    labels = np.asarray(labels, dtype=object)
+
+    if column == 'Month':
+        # Calendar order rather than alphabetical
+        order = [m for m in MONTHS if m in set(labels)] + sorted(m for m in labels if m not in MONTHS)
+        remap = np.append(pd.Index(order).get_indexer(labels), -1)  # the extra slot keeps -1 as -1
+        return remap[codes], np.asarray(order, dtype=object)
+    return codes.astype(np.int64), labels
+
+
+class GroupedResult:
+    """Measures per observed group, with groups in dimension order"""
+
+    def __init__(self, dimensions: List[str], codes: Dict[str, np.ndarray], labels: Dict[str, np.ndarray],
+                 values: Dict[Measure, np.ndarray]):
+        self.dimensions = dimensions
+        self.codes = codes  # per dimension, the code of each group (sorts like the labels)
+        self.labels = labels
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(next(iter(self.values.values())))
+
+    def keys(self, dimension: str, order: np.ndarray = None) -> List:
+        """Label of each group for a dimension (None for missing values)"""
+        codes = self.codes[dimension] if order is None else self.codes[dimension][order]
+        return self.labels[dimension][codes + 1].tolist()
+
+    def column(self, name) -> np.ndarray:
+        if name in self.codes:
+            return self.codes[name]
+        return self.values[name]
+
+    def page(self, sort_by: Optional[str] = None, descending: bool = True,
+             limit: Optional[int] = None, offset: int = 0) -> Dict:
+        """Sorted slice of the groups as columns.
+
+        ``sort_by`` is a dimension or measure response key; dimensions sort
+        in their display order (months by calendar). Ties, and every group
+        when ``sort_by`` is not given, keep the dimension order.
+        """
+        names = {output_name(name): name for name in [*self.dimensions, *self.values]}
+        order = np.arange(len(self))
+        if sort_by is not None:
+            if sort_by not in names:
+                raise ValueError(f"Cannot sort by {sort_by}. Use one of {', '.join(names)}")
+            values = self.column(names[sort_by])
+            order = np.argsort(-values if descending else values, kind='stable')
+        stop = None if limit is None else offset + limit
+        order = order[offset:stop]
+
+        columns = {}
+        for dimension in self.dimensions:
+            columns[output_name(dimension)] = self.keys(dimension, order)
+        for measure, values in self.values.items():
+            columns[output_name(measure)] = values[order]
+        return {
+            'dimensions': [output_name(d) for d in self.dimensions],
+            'measures': [output_name(m) for m in self.values],
+            'total_groups': len(self),
+            'offset': offset,
+            'limit': limit,
+            'columns': columns
+        }
+
+
+def group_aggregate(frame: pd.DataFrame, dimensions: Sequence[str], measures: Sequence[Measure],
+                    dropna: bool = True) -> GroupedResult:
+    """Aggregate measures per combination of the dimensions.
+
+    The dimension codes are combined into one integer key per row (mixed
+    radix, first dimension most significant, so key order is dimension
+    order). When the key space is small the sums and counts are one
+    ``np.bincount`` each over the keys; otherwise the observed keys are
+    numbered with ``np.unique`` first. Min and max sort the rows by key once
+    and use ``ufunc.reduceat`` over the group boundaries. A ``Rows`` column
+    weights the counts (and so the means) of pre-aggregated cells. Integer
+    sums are exact and keep an integer type. Rows with a missing dimension
+    value are left out, like a pandas groupby does, unless ``dropna`` is
+    off; they then form groups labelled None.
+    """
+    dimensions = list(dict.fromkeys(dimensions))
+    measures = list(dict.fromkeys(measures))
+    n_rows = len(frame)
+
+    codes, labels, sizes = [], {}, []
+    for dimension in dimensions:
+        dim_codes, dim_labels = dimension_codes(frame, dimension)
+        codes.append(dim_codes + 1)  # 0 is the missing value
+        labels[dimension] = np.concatenate([np.array([None], dtype=object), np.asarray(dim_labels, dtype=object)])
+        sizes.append(len(dim_labels) + 1)
+
+    n_keys = 1
+    for size in sizes:
+        n_keys *= size
+    if n_keys >= np.iinfo(np.int64).max:
+        raise ValueError("Too many dimension combinations to group by")
+    rows = None
+    if dropna and codes:
+        complete = np.logical_and.reduce([dim_codes > 0 for dim_codes in codes])
+        if not complete.all():
+            rows = np.flatnonzero(complete)
+            codes = [dim_codes[rows] for dim_codes in codes]
+            n_rows = len(rows)
+
+    def column_values(column: str) -> np.ndarray:
+        values = frame[column].to_numpy()
+        return values if rows is None else values[rows]
+
+    keys = np.ravel_multi_index(codes, sizes) if codes else np.zeros(n_rows, dtype=np.int64)
+
+    dense = n_keys <= max(DENSE_GROUP_LIMIT, n_rows)
+    if dense:
+        groups, n_groups = keys, n_keys
+    else:
+        observed, groups = np.unique(keys, return_inverse=True)
+        groups, n_groups = groups.ravel(), len(observed)
+
+    weights = column_values('Rows') if 'Rows' in frame else None
+    counts = np.bincount(groups, weights=weights, minlength=n_groups)
+    if weights is None or np.issubdtype(weights.dtype, np.integer):
+        counts = counts.astype(np.int64)
+    is_present = counts > 0
+    present = np.flatnonzero(is_present)
+    group_keys = present if dense else observed[present]
+    counts = counts[present]
+
+    sorted_order = None
+    values = {}
+    for column, agg in measures:
+        if agg == 'count':
+            values[(column, agg)] = counts
+            continue
+        data = column_values(column)
+        if agg in ('sum', 'mean'):
+            sums = np.bincount(groups, weights=data, minlength=n_groups)[present]
+            if np.issubdtype(data.dtype, np.integer):
+                sums = sums.astype(np.int64)
+            values[(column, agg)] = sums if agg == 'sum' else sums / counts
+            continue
+        if sorted_order is None:
+            # Rows ordered by their group's rank among the present groups. The
+            # order within a group does not matter, and ranks that fit in 16
+            # bits get numpy's radix sort.
+            ranks = (np.cumsum(is_present) - 1)[groups]
+            if len(present) <= np.iinfo(np.uint16).max + 1:
+                sorted_order = np.argsort(ranks.astype(np.uint16), kind='stable')
+            else:
+                sorted_order = np.argsort(ranks)
+            starts = np.searchsorted(ranks[sorted_order], np.arange(len(present)))
+        ufunc = np.minimum if agg == 'min' else np.maximum
+        values[(column, agg)] = ufunc.reduceat(data[sorted_order], starts) if n_rows else data[:0]
+
+    group_codes = np.unravel_index(group_keys, sizes) if sizes else []
+    return GroupedResult(
+        dimensions,
+        {dimension: dim_codes.astype(np.int64) - 1 for dimension, dim_codes in zip(dimensions, group_codes)},
+        labels,
+        values
+    )
@@ -0,0 +1,239 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+from app import config
+from app.services.cache_service import cached
+from app.services.data_service import Dataset, data_service
+
+# Clusters, named by the rank of their centre's RFM score (best first)
+SEGMENT_NAMES = ['Champions', 'Loyal', 'Needs Attention', 'At Risk']
+FEATURES = ['recency_days', 'frequency', 'monetary']
+
+# The clusters are fitted on a sample of customers and every customer is
+# then assigned to the nearest centre: a full pass of MiniBatchKMeans over
+# millions of customers costs seconds in per-batch overhead, a prediction
+# a few milliseconds per million
+FIT_SAMPLE_CUSTOMERS = 100_000
+BATCH_SIZE = 4096
+RANDOM_STATE = 0
+
+
+class SegmentationPendingError(Exception):
+    """Raised when the segments of the current dataset version are still being computed"""
+
+
+def rfm_features(totals: pd.DataFrame, reference: np.datetime64) -> np.ndarray:
+    """log1p of days since the last order, order count and revenue, per customer"""
+    recency = (reference - totals['Last_Date'].to_numpy()) / np.timedelta64(1, 'D')
+    return np.log1p(np.column_stack([
+        np.maximum(recency, 0.0),
+        totals['Orders'].to_numpy(np.float64),
+        np.maximum(totals['Revenue'].to_numpy(np.float64), 0.0)
+    ]))
+
+
+def segment_ranks(kmeans: MiniBatchKMeans) -> np.ndarray:
+    """Rank of each cluster, best first: low recency, high frequency and monetary value"""
+    centers = kmeans.cluster_centers_
+    score = -centers[:, 0] + centers[:, 1] + centers[:, 2]
+    ranks = np.empty(len(centers), dtype=np.int8)
+    ranks[np.argsort(-score, kind='stable')] = np.arange(len(centers))
+    return ranks
+
+
+class SegmentModel:
+    """Fitted clusters and the segment of every customer of one dataset version"""
+
+    def __init__(self, dataset: Dataset, kmeans: MiniBatchKMeans, mean: np.ndarray, scale: np.ndarray,
+                 assignments: np.ndarray, fitted_version: str, updates: int, seconds: float):
+        self.version = dataset.version
+        self.source_version = dataset.source_version
+        self.batches = dataset.batches
+        self.n_appended = len(dataset.customers.appended)
+        self.kmeans = kmeans
+        self.mean = mean  # feature scaling of the full fit, kept through incremental updates
+        self.scale = scale
+        self.assignments = assignments  # segment rank per customer id, -1 for customers without orders
+        self.fitted_version = fitted_version
+        self.updates = updates
+        self.seconds = seconds
+        # Cluster centres in segment order, in feature units
+        centers = np.empty_like(kmeans.cluster_centers_)
+        centers[segment_ranks(kmeans)] = kmeans.cluster_centers_
+        self.centers = np.expm1(centers * scale + mean)
+
+    def can_update_to(self, dataset: Dataset) -> bool:
+        """Whether a dataset only adds ingested batches to this model's data"""
+        return (dataset.source_version == self.source_version and len(dataset.batches) > len(self.batches)
+                and dataset.batches[:len(self.batches)] == self.batches)
+
+
+class SegmentationService:
+    """RFM customer segmentation with k-means, trained off the request path.
+
+    Every customer (see app/services/customer_index.py) gets recency,
+    frequency and monetary features from the per-customer totals, and
+    MiniBatchKMeans groups them into ``SEGMENT_NAMES`` segments. Models are
+    built on a background thread whenever a dataset is published. A
+    dataset that only adds ingested batches updates the previous model
+    with ``partial_fit`` on the customers those rows touched, instead of
+    refitting. Requests only read the model of the current version and
+    get ``SegmentationPendingError`` while it is being computed.
+    """
+
+    def __init__(self):
+        self.data_service = data_service
+        self._model: Optional[SegmentModel] = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='segmentation')
+        if config.RFM_PRETRAIN:
+            self.data_service.on_publish(self.schedule)
+
+    @property
+    def version(self):
+        return self.data_service.version
+
+    def schedule(self, dataset: Dataset) -> bool:
+        """Build the model of a dataset in the background, unless it is built or under way"""
+        with self._lock:
+            if (self._model is not None and self._model.version == dataset.version) or dataset.version in self._pending:
+                return False
+            self._pending.add(dataset.version)
+        self._executor.submit(self._build, dataset)
+        return True
+
+    def _build(self, dataset: Dataset):
+        try:
+            # A newer dataset was published meanwhile; its own build covers these rows too
+            if dataset is not self.data_service.dataset:
+                return
+            started = time.perf_counter()
+            base = self._model
+            if base is not None and base.can_update_to(dataset):
+                model = self._update(base, dataset, started)
+            else:
+                model = self._fit(dataset, started)
+            with self._lock:
+                self._model = model
+            print(f"Customer segments of {dataset.version} {'updated' if model.updates else 'fitted'} "
+                  f"in {model.seconds:.2f}s")
+        except Exception as e:
+            print(f"Error building customer segments: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(dataset.version)
+
+    @staticmethod
+    def _reference(dataset: Dataset) -> np.datetime64:
+        dates = dataset.df['Date'].to_numpy()
+        return dates[-1] if len(dates) else np.datetime64('today')
+
+    def _fit(self, dataset: Dataset, started: float) -> SegmentModel:
+        totals = dataset.customers.totals
+        active = np.flatnonzero(totals['Orders'].to_numpy() > 0)
+        features = rfm_features(totals.iloc[active], self._reference(dataset))
+        mean = features.mean(axis=0) if len(features) else np.zeros(len(FEATURES))
+        scale = features.std(axis=0) if len(features) else np.ones(len(FEATURES))
+        scale[scale == 0] = 1.0
+        scaled = (features - mean) / scale
+
+        sample = scaled
+        if len(scaled) > FIT_SAMPLE_CUSTOMERS:
+            rng = np.random.default_rng(RANDOM_STATE)
+            sample = scaled[rng.choice(len(scaled), FIT_SAMPLE_CUSTOMERS, replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=min(len(SEGMENT_NAMES), max(1, len(sample))), batch_size=BATCH_SIZE,
+                                 n_init=3, random_state=RANDOM_STATE, compute_labels=False)
+        kmeans.fit(sample if len(sample) else np.zeros((1, len(FEATURES))))
+        return SegmentModel(dataset, kmeans, mean, scale, self._assign(kmeans, scaled, active, len(totals)),
+                            dataset.version, 0, time.perf_counter() - started)
+
+    def _update(self, base: SegmentModel, dataset: Dataset, started: float) -> SegmentModel:
+        """Move the centres towards the customers touched by the new rows, then reassign everyone.
+
+        Recency is relative to the newest order, so every customer's
+        features shift when rows arrive; the reassignment is a vectorized
+        nearest-centre lookup.
+        """
+        totals = dataset.customers.totals
+        active = np.flatnonzero(totals['Orders'].to_numpy() > 0)
+        scaled = (rfm_features(totals.iloc[active], self._reference(dataset)) - base.mean) / base.scale
+
+        appended = dataset.customers.appended[base.n_appended:]
+        touched = np.unique(np.concatenate(appended)) if appended else np.empty(0, dtype=np.int32)
+        position = np.full(len(totals), -1, dtype=np.int64)
+        position[active] = np.arange(len(active))
+        touched_features = scaled[position[touched][position[touched] >= 0]]
+        # The base model may still be serving requests
+        kmeans = copy.deepcopy(base.kmeans)
+        # partial_fit needs at least as many samples as clusters
+        if len(touched_features) >= kmeans.n_clusters:
+            for start in range(0, len(touched_features), BATCH_SIZE):
+                kmeans.partial_fit(touched_features[start:start + BATCH_SIZE])
+        return SegmentModel(dataset, kmeans, base.mean, base.scale, self._assign(kmeans, scaled, active, len(totals)),
+                            base.fitted_version, base.updates + 1, time.perf_counter() - started)
+
+    @staticmethod
+    def _assign(kmeans: MiniBatchKMeans, scaled: np.ndarray, active: np.ndarray, n_customers: int) -> np.ndarray:
+        """Segment of every customer id (-1 for customers without orders)"""
+        assignments = np.full(n_customers, -1, dtype=np.int8)
+        if len(scaled):
+            assignments[active] = segment_ranks(kmeans)[kmeans.predict(scaled)]
+        return assignments
+
+    def current_model(self) -> Tuple[Dataset, SegmentModel]:
+        """Dataset being served and its model; schedules the model and raises while it is not ready"""
+        dataset = self.data_service.dataset
+        if dataset is None:
+            raise ValueError("RFM segmentation is not available in out-of-core mode")
+        model = self._model
+        if model is None or model.version != dataset.version:
+            self.schedule(dataset)
+            raise SegmentationPendingError("Customer segments are being computed")
+        return dataset, model
+
+    @cached
+    def get_rfm_segmentation(self, filters: Dict = None) -> Dict:
+        """Revenue, profit, customers and orders of the selection per RFM segment"""
+        dataset, model = self.current_model()
+        customers = dataset.customers
+        selector = dataset.filter_engine.select(filters)
+        orders = customers.orders_per_customer(selector)
+        present = np.flatnonzero((orders > 0) & (model.assignments >= 0))
+        segments = model.assignments[present]
+        n_segments = len(model.centers)
+
+        def per_segment(values: np.ndarray) -> np.ndarray:
+            sums = np.bincount(segments, weights=values[present], minlength=n_segments)
+            return sums.astype(np.int64) if np.issubdtype(values.dtype, np.integer) else sums
+
+        return {
+            'method': 'rfm',
+            'segments': SEGMENT_NAMES[:n_segments],
+            'revenue': per_segment(customers.sum_per_customer(selector, dataset.df['Revenue'].to_numpy())),
+            'profit': per_segment(customers.sum_per_customer(selector, dataset.df['Profit'].to_numpy())),
+            'customer_count': np.bincount(segments, minlength=n_segments),
+            'order_count': per_segment(orders),
+            'centers': {name: model.centers[:, i] for i, name in enumerate(FEATURES)},
+            'model': {
+                'version': model.version,
+                'fitted_version': model.fitted_version,
+                'incremental_updates': model.updates,
+                'customers': int(np.count_nonzero(model.assignments >= 0)),
+                'seconds': model.seconds
+            }
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+segmentation_service = SegmentationService()
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.services.filter_engine import filters_key
+from app.services.metrics_service import phase
+
+
+def _freeze(value: Any) -> Hashable:
+    # Filter dicts by their canonical form, so equivalent filters share a computation
+    if isinstance(value, dict):
+        return filters_key(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def call_key(fn: Callable, args: tuple, kwargs: Dict) -> Optional[Hashable]:
+    """(method, owner, dataset version, canonical arguments) of a service call, or None if unhashable"""
+    owner = getattr(fn, '__self__', None)
+    key = (getattr(fn, '__qualname__', repr(fn)), id(owner), getattr(owner, 'version', None),
+           _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SingleFlight:
+    """Shares one in-flight computation between identical concurrent calls.
+
+    The first call for a key starts the computation; calls arriving with
+    the same key while it runs await the same task instead of starting
+    their own, and all of them get its result or its exception. The task is
+    shielded, so a caller that goes away does not cancel it for the others.
+    Keys include the dataset version, so a call never joins a computation
+    over replaced data.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.computations = 0
+        self.coalesced = 0
+        self.coalesced_by_method: Dict[str, int] = {}
+
+    async def run(self, key: Hashable, start: Callable[[], Awaitable]) -> Any:
+        """Await start() for the first call with this key, and its task for the concurrent ones"""
+        loop = asyncio.get_running_loop()
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+            self.coalesced_by_method[key[0]] = self.coalesced_by_method.get(key[0], 0) + 1
+            with phase('coalesced'):
+                return await asyncio.shield(task)
+
+        task = loop.create_task(start())
+        self._calls[key] = task
+        self.computations += 1
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as seen even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._calls),
+            'calls': self.calls,
+            'computations': self.computations,
+            'coalesced': self.coalesced,
+            'coalesced_rate': (self.coalesced / self.calls) if self.calls else 0.0,
+            'coalesced_by_method': dict(sorted(self.coalesced_by_method.items()))
+        }
+
+
+# Global instance
+single_flight = SingleFlight()
@@ -0,0 +1,264 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.services.dataset_schema import apply_compact_schema
+
+CSV_FILENAME = 'bike sport company.csv'
+SNAPSHOT_FORMAT_VERSION = 5
+MANIFEST_NAME = 'manifest.json'
+
+
+def find_csv_path() -> Optional[str]:
+    """Locate the source CSV file"""
+    possible_paths = [
+        f'data/{CSV_FILENAME}',
+        f'../{CSV_FILENAME}',
+        f'../../{CSV_FILENAME}',
+        os.path.join(os.path.dirname(__file__), f'../../data/{CSV_FILENAME}')
+    ]
+    if config.DATA_PATH:
+        possible_paths.insert(0, config.DATA_PATH)
+
+    for path in possible_paths:
+        abs_path = os.path.abspath(path)
+        if os.path.exists(abs_path):
+            return abs_path
+    return None
+
+
+def read_source_csv(csv_path: str) -> pd.DataFrame:
+    """Parse the source CSV into a compact DataFrame sorted by date"""
+    return prepare_source_frame(pd.read_csv(csv_path))
+
+
+def prepare_source_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Parsed CSV rows (of the whole file or a part of it) in their compact form, sorted by date"""
+    df['Date'] = pd.to_datetime(df['Date'])
+    df = df.sort_values('Date', kind='stable', ignore_index=True)
+    return apply_compact_schema(df, config.FLOAT32_MEASURES)
+
+
+def dataset_version(csv_path: str) -> str:
+    """Short identifier of the source file's current state, equal across processes"""
+    stat = os.stat(csv_path)
+    token = f'{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha1(token.encode()).hexdigest()[:12]
+
+
+def dictionary_code_dtype(n_categories: int) -> np.dtype:
+    """Narrowest code dtype, matching the one pandas uses for Categorical codes"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(csv_path: str) -> Dict:
+    """Size, mtime and content hash of a source file, to detect stale derived copies"""
+    stat = os.stat(csv_path)
+    return {
+        'path': csv_path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _file_sha256(csv_path)
+    }
+
+
+def source_matches(csv_path: str, source: Dict) -> bool:
+    """Whether a source file is still the one a fingerprint was taken of"""
+    stat = os.stat(csv_path)
+    if stat.st_size != source['size']:
+        return False
+    if stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    # Touched but possibly unchanged: fall back to the content hash
+    return _file_sha256(csv_path) == source['sha256']
+
+
+@contextlib.contextmanager
+def file_lock(lock_path: str):
+    """Exclusive inter-process lock held on a lock file (a no-op where fcntl is unavailable)"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SnapshotService:
+    """Columnar on-disk copy of the source CSV.
+
+    Each column is stored as its own ``.npy`` file so it can be memory-mapped
+    on load. Text columns are dictionary-encoded: the file holds integer codes
+    and the manifest holds the distinct values. The manifest also records the
+    size, mtime and SHA-256 of the CSV it was built from, which is how stale
+    snapshots are detected.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None, mmap: bool = True):
+        self.snapshot_dir = snapshot_dir
+        self.mmap = mmap
+
+    def snapshot_path(self, csv_path: str) -> str:
+        """Directory holding the snapshot of a given CSV"""
+        base_dir = self.snapshot_dir or os.path.join(os.path.dirname(csv_path), '.snapshot')
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        return os.path.join(base_dir, name)
+
+    def read_manifest(self, csv_path: str) -> Optional[Dict]:
+        manifest_path = os.path.join(self.snapshot_path(csv_path), MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def is_fresh(self, csv_path: str, manifest: Optional[Dict] = None) -> bool:
+        """Check whether the snapshot still matches the source CSV"""
+        manifest = manifest or self.read_manifest(csv_path)
+        if not manifest or manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            return False
+        if manifest.get('float32_measures') != config.FLOAT32_MEASURES:
+            return False
+
+        return source_matches(csv_path, manifest['source'])
+
+    def build(self, csv_path: str, df: Optional[pd.DataFrame] = None) -> str:
+        """Write a snapshot of the CSV, replacing any existing one"""
+        if df is None:
+            df = read_source_csv(csv_path)
+
+        target = self.snapshot_path(csv_path)
+        tmp_dir = f'{target}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for position, column in enumerate(df.columns):
+            series = df[column]
+            filename = f'{position:03d}.npy'
+            entry = {'name': column, 'file': filename}
+
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy()
+                entry['kind'] = 'datetime'
+            elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy()
+                entry['kind'] = 'numeric'
+            else:
+                # Sorted dictionary, so categorical groupbys order keys like strings do
+                codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+                values = codes.astype(dictionary_code_dtype(len(uniques)))
+                entry['kind'] = 'dictionary'
+                entry['categories'] = [str(value) for value in uniques]
+
+            np.save(os.path.join(tmp_dir, filename), values, allow_pickle=False)
+            columns.append(entry)
+
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'rows': int(len(df)),
+            'float32_measures': config.FLOAT32_MEASURES,
+            'source': source_fingerprint(csv_path),
+            'columns': columns
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished directory into place; readers that already
+        # memory-mapped the old files keep them until they let go.
+        old_dir = f'{target}.old-{os.getpid()}'
+        if os.path.exists(target):
+            os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return target
+
+    @contextlib.contextmanager
+    def build_lock(self, csv_path: str):
+        """Exclusive lock so that only one process (re)builds a snapshot at a time"""
+        with file_lock(f'{self.snapshot_path(csv_path)}.lock'):
+            yield
+
+    def load(self, csv_path: str, categorical: bool = True) -> Optional[pd.DataFrame]:
+        """Load the snapshot, or return None if it is missing or stale.
+
+        Text columns come back as Categoricals whose codes are the
+        memory-mapped arrays themselves (or as plain strings without
+        ``categorical``), so no column is copied into process memory and
+        processes mapping the same files share them.
+        """
+        manifest = self.read_manifest(csv_path)
+        if not self.is_fresh(csv_path, manifest):
+            return None
+
+        path = self.snapshot_path(csv_path)
+        mmap_mode = 'r' if self.mmap else None
+        data = {}
+        for entry in manifest['columns']:
+            values = np.load(os.path.join(path, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+            if entry['kind'] == 'dictionary' and categorical:
+                dtype = pd.CategoricalDtype(entry['categories'])
+                values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+            elif entry['kind'] == 'dictionary':
+                # Trailing None so that the NA code (-1) decodes to a missing value
+                categories = np.array(entry['categories'] + [None], dtype=object)
+                values = categories.take(values)
+            data[entry['name']] = values
+
+        return pd.DataFrame(data, copy=False)
+
+    def load_or_build(self, csv_path: str, categorical: bool = True) -> pd.DataFrame:
+        """Load from the snapshot when fresh, otherwise parse the CSV and rebuild it.
+
+        Concurrent callers (e.g. several uvicorn workers starting together)
+        serialize on the build lock: the first one publishes the snapshot and
+        the others attach to it.
+        """
+        source_df = None
+        try:
+            df = self.load(csv_path, categorical)
+            if df is None:
+                with self.build_lock(csv_path):
+                    df = self.load(csv_path, categorical)
+                    if df is None:
+                        source_df = read_source_csv(csv_path)
+                        print(f"Snapshot written to {self.build(csv_path, source_df)}")
+                        df = self.load(csv_path, categorical)
+        except Exception as e:
+            print(f"Snapshot unavailable: {e}")
+            df = None
+
+        if df is not None:
+            print(f"Data loaded from snapshot {self.snapshot_path(csv_path)}")
+            return df
+        return source_df if source_df is not None else read_source_csv(csv_path)
+
+
+# Global instance
+snapshot_service = SnapshotService(config.SNAPSHOT_DIR, mmap=config.SNAPSHOT_MMAP)
@@ -0,0 +1,359 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.customer_index import CUSTOMER_KEY
+from app.services.dataset_schema import concat_aligned
+from app.services.filter_engine import DIMENSION_COLUMNS, FilterEngine
+
+# 2**14 HyperLogLog registers: about 0.8% relative standard error
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / np.sqrt(HLL_REGISTERS)
+
+# t-digest compression: at most about compression / 2 centroids per digest
+DIGEST_COMPRESSION = 200
+PERCENTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+# Every stratum keeps at least this many sampled rows (or all of its rows)
+MIN_STRATUM_ROWS = 30
+SAMPLE_MEASURES = ['Revenue', 'Profit', 'Cost', 'Order_Quantity']
+
+CONFIDENCE_LEVEL = 0.95
+Z_SCORE = 1.959963984540054
+
+SKETCH_DIMENSIONS = list(DIMENSION_COLUMNS.values())
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64 (64 for zero)"""
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (values >> np.uint64(64 - shift)) == 0
+        zeros += shift * empty
+        values[empty] <<= np.uint64(shift)
+    return zeros + ((values >> np.uint64(63)) == 0)
+
+
+def hll_registers(hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(register, rank) of each 64-bit hash"""
+    registers = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int32)
+    ranks = np.minimum(_leading_zeros(hashes << np.uint64(HLL_PRECISION)) + 1, 64 - HLL_PRECISION + 1)
+    return registers, ranks.astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray) -> float:
+    """Cardinality estimate of a dense register array, with linear counting for small counts"""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+
+def _compress(groups: np.ndarray, means: np.ndarray, weights: np.ndarray,
+              lows: np.ndarray, highs: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Merge sorted centroids into t-digest centroids, per group.
+
+    Input is sorted by group, then by mean. Consecutive centroids whose
+    quantile falls in the same unit of the k1 scale function are merged,
+    which keeps the tails at near-single values and the middle coarse.
+    Returns the groups, means, weights and value ranges of the result.
+    """
+    if not len(means):
+        return groups, means, weights, lows, highs
+    starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+    counts = np.diff(np.append(starts, len(groups)))
+    cumulative = np.cumsum(weights)
+    before = np.repeat((cumulative - weights)[starts], counts)
+    totals = np.repeat(np.add.reduceat(weights, starts), counts)
+    q = (cumulative - before - weights / 2) / totals
+    k = np.floor(DIGEST_COMPRESSION / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))).astype(np.int64)
+
+    bounds = np.flatnonzero(np.concatenate([[True], (groups[1:] != groups[:-1]) | (k[1:] != k[:-1])]))
+    merged_weights = np.add.reduceat(weights, bounds)
+    return (groups[bounds], np.add.reduceat(means * weights, bounds) / merged_weights, merged_weights,
+            np.minimum.reduceat(lows, bounds), np.maximum.reduceat(highs, bounds))
+
+
+def digest_quantile(centroids: pd.DataFrame, q: float) -> Tuple[float, float, float]:
+    """(estimate, low, high) of a quantile from one digest's centroids.
+
+    The bounds are the value range of the centroid holding the quantile's
+    rank, widened to include the interpolated estimate.
+    """
+    means = centroids['Mean'].to_numpy()
+    weights = centroids['Weight'].to_numpy()
+    lows = centroids['Low'].to_numpy()
+    highs = centroids['High'].to_numpy()
+    cumulative = np.cumsum(weights)
+    target = q * cumulative[-1]
+    centres = cumulative - weights / 2
+    value = float(np.interp(target, np.concatenate([[0.0], centres, cumulative[-1:]]),
+                            np.concatenate([lows[:1], means, highs[-1:]])))
+    index = min(int(np.searchsorted(cumulative, target, side='left')), len(means) - 1)
+    return value, min(value, float(lows[index])), max(value, float(highs[index]))
+
+
+def merge_digests(centroids: pd.DataFrame) -> pd.DataFrame:
+    """Recompress the centroids of several digests into one digest"""
+    centroids = centroids.sort_values('Mean', kind='stable')
+    _, means, weights, lows, highs = _compress(
+        np.zeros(len(centroids), dtype=np.int64), centroids['Mean'].to_numpy(), centroids['Weight'].to_numpy(),
+        centroids['Low'].to_numpy(), centroids['High'].to_numpy())
+    return pd.DataFrame({'Mean': means, 'Weight': weights, 'Low': lows, 'High': highs})
+
+
+def sketch_cells(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Distinct-customer and order-value sketches of a frame, per dimension cell.
+
+    Returns the cells (one row per country, age group and category
+    combination), the non-empty HyperLogLog registers of each cell and the
+    t-digest centroids of each cell's order values.
+    """
+    grouped = df.groupby(SKETCH_DIMENSIONS, sort=True, observed=True, dropna=False)
+    cell_ids = grouped.ngroup().to_numpy()
+    cells = grouped.size().index.to_frame(index=False).astype(object)
+
+    keys = df[CUSTOMER_KEY]
+    complete = keys.notna().all(axis=1).to_numpy()
+    registers, ranks = hll_registers(pd.util.hash_pandas_object(keys, index=False).to_numpy()[complete])
+    slot = cell_ids[complete].astype(np.int64) * HLL_REGISTERS + registers
+    top = pd.Series(ranks).groupby(slot).max()
+    hll = pd.DataFrame({'Cell': (top.index // HLL_REGISTERS).astype(np.int32),
+                        'Register': (top.index % HLL_REGISTERS).astype(np.int32),
+                        'Rank': top.to_numpy().astype(np.uint8)})
+
+    values = df['Revenue'].to_numpy().astype(np.float64)
+    order = np.lexsort((values, cell_ids))
+    values = values[order]
+    groups, means, weights, lows, highs = _compress(cell_ids[order], values, np.ones(len(values)), values, values)
+    digests = pd.DataFrame({'Cell': groups.astype(np.int32), 'Mean': means, 'Weight': weights,
+                            'Low': lows, 'High': highs})
+    return cells, hll, digests
+
+
+def stratified_sample(df: pd.DataFrame, fraction: float, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Uniform sample within each product category of a frame.
+
+    Returns the sampled row positions (in frame order), their stratum
+    codes, and the row and sample counts per stratum.
+    """
+    # Factorized as plain values, so unobserved categories do not become empty strata
+    codes, uniques = pd.factorize(df['Product_Category'].to_numpy(dtype=object), use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    wanted = np.minimum(counts, np.maximum(MIN_STRATUM_ROWS, np.ceil(fraction * counts).astype(np.int64)))
+    order = np.lexsort((rng.random(len(df)), codes))
+    rank = np.arange(len(df)) - np.repeat(np.cumsum(counts) - counts, counts)
+    chosen = np.sort(order[rank < np.repeat(wanted, counts)])
+    return chosen, codes[chosen], counts, wanted
+
+
+def month_slices(df: pd.DataFrame) -> Iterable[pd.DataFrame]:
+    """Views of a date-sorted frame, one per calendar month"""
+    if not len(df):
+        return
+    dates = df['Date']
+    months = pd.date_range(dates.iloc[0].to_period('M').to_timestamp(), dates.iloc[-1], freq='MS')
+    bounds = np.append(dates.searchsorted(months[1:], side='left'), len(df))
+    start = 0
+    for stop in bounds:
+        yield df.iloc[start:stop]
+        start = stop
+
+
+class Synopsis:
+    """Sample and sketches answering summary statistics approximately.
+
+    Built once per dataset from its monthly pieces:
+
+    - a stratified sample (strata: month x product category) from which
+      sums, the order count and ratios are estimated with the usual
+      stratified (domain) estimators and their variance;
+    - per month and dimension cell, sparse HyperLogLog registers of the
+      customer key, merged by register-wise maximum for a distinct count;
+    - per month and dimension cell, a t-digest of order values, merged for
+      the order-value percentiles.
+
+    Months entirely inside the filtered dates use the stored sketches; the
+    (at most two) months a date bound cuts through are sketched from their
+    matching rows at query time, so the sketch answers carry no date
+    rounding. Intervals are 95% normal intervals for the sampled measures,
+    +-1.96 relative standard errors for the distinct count, and centroid
+    value ranges for the percentiles.
+    """
+
+    def __init__(self, sample: pd.DataFrame, strata: pd.DataFrame, months: pd.DataFrame,
+                 cells: pd.DataFrame, hll: pd.DataFrame, digests: pd.DataFrame):
+        self.sample = sample
+        self.strata = strata
+        self.months = months
+        self.cells = cells
+        self.hll = hll
+        self.digests = digests
+        self.sample_engine = FilterEngine(sample)
+
+    @classmethod
+    def build(cls, frames: Iterable[pd.DataFrame], fraction: float, seed: int = 0) -> 'Synopsis':
+        """Synopsis of a dataset given as date-sorted frames, one per calendar month"""
+        samples, strata, months, cells, hlls, digests = [], [], [], [], [], []
+        n_strata = n_cells = 0
+        for frame in frames:
+            if not len(frame):
+                continue
+            month = frame['Date'].iloc[0].to_period('M').to_timestamp()
+            # Seeded per month, so the sample does not depend on how the months are read
+            rng = np.random.default_rng([seed, month.year, month.month])
+            chosen, codes, counts, wanted = stratified_sample(frame, fraction, rng)
+            samples.append(frame.iloc[chosen][['Date'] + SKETCH_DIMENSIONS + SAMPLE_MEASURES]
+                           .assign(Stratum=(codes + n_strata).astype(np.int32)))
+            strata.append(pd.DataFrame({'Rows': counts, 'Sampled': wanted}))
+            n_strata += len(counts)
+
+            frame_cells, hll, digest = sketch_cells(frame)
+            months.append({'Month': month, 'First': frame['Date'].iloc[0], 'Last': frame['Date'].iloc[-1]})
+            cells.append(frame_cells.assign(Month=month))
+            hlls.append(hll.assign(Cell=hll['Cell'] + n_cells))
+            digests.append(digest.assign(Cell=digest['Cell'] + n_cells))
+            n_cells += len(frame_cells)
+
+        if not samples:
+            raise ValueError("Cannot build a synopsis of an empty dataset")
+        sample = concat_aligned(samples).sort_values('Date', kind='stable', ignore_index=True)
+        return cls(sample, pd.concat(strata, ignore_index=True), pd.DataFrame(months),
+                   pd.concat(cells, ignore_index=True), pd.concat(hlls, ignore_index=True),
+                   pd.concat(digests, ignore_index=True))
+
+    @property
+    def nbytes(self) -> int:
+        frames = (self.sample, self.strata, self.months, self.cells, self.hll, self.digests)
+        return int(sum(frame.memory_usage(index=False, deep=True).sum() for frame in frames))
+
+    def _month_coverage(self, filters: Dict) -> Tuple[np.ndarray, List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        """Months entirely inside the filtered dates, and the date ranges of the months cut by a bound"""
+        start = pd.to_datetime(filters['start_date']) if filters.get('start_date') else None
+        end = pd.to_datetime(filters['end_date']) if filters.get('end_date') else None
+        first = self.months['First'].to_numpy()
+        last = self.months['Last'].to_numpy()
+        full = np.ones(len(self.months), dtype=bool)
+        overlaps = full.copy()
+        if start is not None:
+            full &= first >= start.to_datetime64()
+            overlaps &= last >= start.to_datetime64()
+        if end is not None:
+            full &= last <= end.to_datetime64()
+            overlaps &= first <= end.to_datetime64()
+        partial = []
+        for month_first, month_last in self.months.loc[overlaps & ~full, ['First', 'Last']].itertuples(index=False):
+            partial.append((max(start, month_first) if start is not None else month_first,
+                            min(end, month_last) if end is not None else month_last))
+        return self.months['Month'].to_numpy()[full], partial
+
+    def _stored_cells(self, filters: Dict, months: np.ndarray) -> np.ndarray:
+        selected = self.cells['Month'].isin(months).to_numpy()
+        for key, column in DIMENSION_COLUMNS.items():
+            if filters.get(key):
+                selected = selected & self.cells[column].isin(filters[key]).to_numpy()
+        return selected
+
+    def summary(self, filters: Optional[Dict], rows: Callable[[Dict], pd.DataFrame]) -> Dict:
+        """Estimated summary statistics with confidence intervals.
+
+        ``rows`` returns the dataset rows matching a filter dict; it is only
+        called for the months a date bound cuts through.
+        """
+        filters = dict(filters or {})
+        totals, intervals = self._estimate_totals(filters)
+        customers, percentiles = self._estimate_sketches(filters, rows)
+        totals['total_customers'], intervals['total_customers'] = customers
+        return dict(totals, order_value_percentiles={name: value for name, (value, _, _) in percentiles.items()},
+                    approximate=True, confidence_level=CONFIDENCE_LEVEL,
+                    confidence_intervals=dict(intervals, order_value_percentiles={
+                        name: [low, high] for name, (_, low, high) in percentiles.items()}))
+
+    def _estimate_totals(self, filters: Dict) -> Tuple[Dict, Dict]:
+        """Stratified estimates of the sums, the order count and the two ratios"""
+        match = np.zeros(len(self.sample), dtype=np.float64)
+        match[self.sample_engine.select(filters)] = 1.0
+        strata = self.sample['Stratum'].to_numpy()
+        population = self.strata['Rows'].to_numpy().astype(np.float64)
+        sampled = self.strata['Sampled'].to_numpy().astype(np.float64)
+
+        def estimate(values: np.ndarray) -> Tuple[float, float]:
+            # Total and its variance: sum of N_h * mean_h, with the finite population correction
+            sums = np.bincount(strata, weights=values, minlength=len(population))
+            squares = np.bincount(strata, weights=values * values, minlength=len(population))
+            means = sums / sampled
+            variances = np.where(sampled > 1, (squares - sums * means) / np.maximum(sampled - 1, 1), 0.0)
+            variance = np.sum(population ** 2 * (1 - sampled / population) * np.maximum(variances, 0) / sampled)
+            return float(np.sum(population * means)), float(variance)
+
+        measures = {column: self.sample[column].to_numpy().astype(np.float64) * match for column in SAMPLE_MEASURES}
+        sums = {column: estimate(values) for column, values in measures.items()}
+        orders, orders_variance = estimate(match)
+        revenue, profit = sums['Revenue'][0], sums['Profit'][0]
+
+        def ratio(numerator: str, total: float, indicator: np.ndarray) -> Tuple[float, float]:
+            # Linearized variance of a ratio of two estimated totals
+            value = sums[numerator][0] / total
+            _, variance = estimate(measures[numerator] - value * indicator)
+            return value, variance / total ** 2
+
+        def interval(value: float, variance: float, floor: float = -np.inf) -> List[float]:
+            margin = Z_SCORE * np.sqrt(variance)
+            return [float(max(floor, value - margin)), float(value + margin)]
+
+        totals = {
+            'total_revenue': revenue,
+            'total_profit': profit,
+            'total_orders': int(round(orders)),
+            'avg_order_value': np.nan,
+            'profit_margin': 0
+        }
+        intervals = {
+            'total_revenue': interval(*sums['Revenue'], floor=0.0),
+            'total_profit': interval(*sums['Profit']),
+            'total_orders': interval(orders, orders_variance, floor=0.0),
+            'avg_order_value': [np.nan, np.nan],
+            'profit_margin': [0, 0]
+        }
+        if orders > 0:
+            value, variance = ratio('Revenue', orders, match)
+            totals['avg_order_value'], intervals['avg_order_value'] = value, interval(value, variance)
+        if revenue > 0:
+            value, variance = ratio('Profit', revenue, measures['Revenue'])
+            totals['profit_margin'] = value * 100
+            intervals['profit_margin'] = [bound * 100 for bound in interval(value, variance)]
+        return totals, intervals
+
+    def _estimate_sketches(self, filters: Dict, rows: Callable[[Dict], pd.DataFrame]) -> Tuple[Tuple[int, List[float]], Dict]:
+        """Distinct customers and order-value percentiles from the stored and query-time sketches"""
+        full_months, partial_months = self._month_coverage(filters)
+        selected = self._stored_cells(filters, full_months)
+        hll = self.hll[selected[self.hll['Cell'].to_numpy()]]
+        digests = self.digests[selected[self.digests['Cell'].to_numpy()]]
+
+        hll_parts, digest_parts = [hll], [digests]
+        for start, end in partial_months:
+            month_rows = rows(dict(filters, start_date=start.isoformat(), end_date=end.isoformat()))
+            if len(month_rows):
+                _, month_hll, month_digests = sketch_cells(month_rows)
+                hll_parts.append(month_hll)
+                digest_parts.append(month_digests)
+
+        registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+        hll = pd.concat(hll_parts, ignore_index=True)
+        np.maximum.at(registers, hll['Register'].to_numpy(), hll['Rank'].to_numpy())
+        count = hll_estimate(registers) if len(hll) else 0.0
+        margin = Z_SCORE * HLL_RELATIVE_ERROR * count
+        customers = (int(round(count)), [max(0.0, count - margin), count + margin])
+
+        digests = pd.concat(digest_parts, ignore_index=True)
+        if not len(digests):
+            return customers, {name: (np.nan, np.nan, np.nan) for name in PERCENTILES}
+        merged = merge_digests(digests)
+        return customers, {name: digest_quantile(merged, q) for name, q in PERCENTILES.items()}
@@ -0,0 +1 @@
+# Empty file to make Python recognize this as a package
@@ -0,0 +1,147 @@
+"""Benchmarks of the service methods and routes on synthetic datasets.
+
+Each case runs against generated datasets of several sizes and a mix of
+representative filters. Wall time (median and best of several runs) and
+peak traced memory are recorded, and can be saved as a baseline and
+compared against it. Run through ``python cli.py bench``.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from app import config
+from app.services.data_generator import generate_sales
+from app.services.data_service import Dataset, data_service
+from app.services.dashboard_service import dashboard_service
+from app.services.executor_service import compute_executor
+from app.services.kpi_service import kpi_service
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Representative filter mix, by name
+FILTER_MIX = {
+    'all': None,
+    'year': {'start_date': '2015-01-01', 'end_date': '2015-12-31'},
+    'countries': {'countries': ['France', 'Germany']},
+    'segment': {'age_groups': ['Adults (35-64)'], 'product_categories': ['Bikes', 'Clothing']},
+    'narrow': {'start_date': '2015-03-01', 'end_date': '2015-03-31', 'countries': ['Canada'],
+               'product_categories': ['Accessories']}
+}
+
+# Service methods, by case name
+SERVICE_CASES = {
+    'filtered_data': lambda f: data_service.get_filtered_data(f),
+    'summary_stats': lambda f: data_service.get_summary_stats(f),
+    'revenue_by_month': lambda f: data_service.get_revenue_by_month(f),
+    'top_products': lambda f: data_service.get_top_products(f),
+    'geographic_performance': lambda f: data_service.get_geographic_performance(f),
+    'age_group_analysis': lambda f: data_service.get_age_group_analysis(f),
+    'seasonal_trends': lambda f: data_service.get_seasonal_trends(f),
+    'customer_segmentation': lambda f: data_service.get_customer_segmentation(f),
+    'timeseries_week': lambda f: data_service.get_timeseries(f, 'week', 4),
+    'query_state_product': lambda f: data_service.query(f, ('State', 'Product'), (('Revenue', 'sum'), ('Profit', 'max')),
+                                                        'revenue_sum', True, 20),
+    'main_kpis': lambda f: kpi_service.calculate_main_kpis(f),
+    'performance_metrics': lambda f: kpi_service.get_performance_metrics(f),
+    'compare_periods': lambda f: kpi_service.compare_periods(f),
+    'dashboard_batch': lambda f: dashboard_service.get_batch(f)
+}
+
+# Routes called with the filters as POST body, by case name
+ROUTE_CASES = {
+    'route_summary': ('/api/dashboard/summary', lambda f: f or {}),
+    'route_geographic': ('/api/dashboard/geographic', lambda f: f or {}),
+    'route_top_products': ('/api/analytics/products/top', lambda f: f or {}),
+    'route_customer_segments': ('/api/analytics/customer-segments', lambda f: f or {}),
+    'route_main_kpis': ('/api/kpi/main', lambda f: f or {}),
+    'route_dashboard_batch': ('/api/dashboard/batch', lambda f: {'filters': f or {}})
+}
+
+
+def measure(fn: Callable, repeat: int) -> Dict:
+    """Median and best wall time over `repeat` runs after a warm-up, then peak traced memory of one run"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'median_s': statistics.median(timings), 'min_s': min(timings), 'peak_bytes': peak}
+
+
+def run_suite(sizes: List[int] = None, repeat: int = 5, select: Optional[str] = None,
+              seed: int = 0, progress: Callable[[str, Dict], None] = None) -> Dict[str, Dict]:
+    """Run every case (or those whose name contains `select`) and return results by case id"""
+    if compute_executor.mode != 'thread':
+        raise RuntimeError("Route benchmarks need BIKE_EXECUTOR_MODE=thread")
+    from fastapi.testclient import TestClient
+    import main
+
+    # Measure the computations themselves, not cache hits
+    cache_enabled, config.CACHE_ENABLED = config.CACHE_ENABLED, False
+    previous_dataset = data_service.dataset
+    results = {}
+    try:
+        client = TestClient(main.app)
+        for size in sizes or DEFAULT_SIZES:
+            df = generate_sales(size, seed=seed)
+            cases = {}
+            cases[f'load[{size}]'] = lambda: Dataset(df, f'bench-{size}', 'benchmark')
+            for name, fn in SERVICE_CASES.items():
+                for filter_name, filters in FILTER_MIX.items():
+                    cases[f'{name}[{size}][{filter_name}]'] = (lambda fn=fn, filters=filters: fn(filters))
+            for name, (path, body) in ROUTE_CASES.items():
+                for filter_name, filters in FILTER_MIX.items():
+                    cases[f'{name}[{size}][{filter_name}]'] = (
+                        lambda path=path, payload=body(filters): client.post(path, json=payload).raise_for_status())
+
+            data_service._publish(Dataset(df, f'bench-{size}', 'benchmark'))
+            for case_id, fn in cases.items():
+                if select and select not in case_id:
+                    continue
+                results[case_id] = measure(fn, repeat)
+                if progress:
+                    progress(case_id, results[case_id])
+    finally:
+        config.CACHE_ENABLED = cache_enabled
+        if previous_dataset is not None:
+            data_service._publish(previous_dataset)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 0.25,
+            min_delta_s: float = 0.001) -> List[str]:
+    """Cases slower (or using more memory) than the baseline by more than `threshold`.
+
+    Time differences below `min_delta_s` are ignored as noise.
+    """
+    regressions = []
+    for case_id, result in results.items():
+        reference = baseline.get(case_id)
+        if not reference:
+            continue
+        slower = result['median_s'] - reference['median_s']
+        if slower > min_delta_s and result['median_s'] > reference['median_s'] * (1 + threshold):
+            regressions.append(f"{case_id}: {reference['median_s'] * 1e3:.2f}ms -> {result['median_s'] * 1e3:.2f}ms")
+        if reference['peak_bytes'] and result['peak_bytes'] > reference['peak_bytes'] * (1 + threshold):
+            regressions.append(f"{case_id}: peak {reference['peak_bytes'] / 1e6:.1f}MB -> {result['peak_bytes'] / 1e6:.1f}MB")
+    return regressions
+
+
+def load_baseline(path: str) -> Dict[str, Dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save_baseline(path: str, results: Dict[str, Dict]):
+    with open(path, 'w') as f:
+        json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=1, sort_keys=True)
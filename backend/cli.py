@@ -0,0 +1,107 @@
+import argparse
+import sys
+import time
+
+from app.services.data_generator import SalesGenerator
+from app.services.snapshot_service import SnapshotService, find_csv_path, snapshot_service
+
+
+def cmd_snapshot(args):
+    """Build the columnar snapshot ahead of deployment"""
+    csv_path = args.csv or find_csv_path()
+    if not csv_path:
+        print("CSV file not found.")
+        return 1
+
+    service = SnapshotService(args.output) if args.output else snapshot_service
+    if not args.force and service.is_fresh(csv_path):
+        print(f"Snapshot is up to date: {service.snapshot_path(csv_path)}")
+        return 0
+
+    start = time.perf_counter()
+    target = service.build(csv_path)
+    print(f"Snapshot written to {target} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def cmd_generate(args):
+    """Write a synthetic dataset for load and scale testing"""
+    file_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+    generator = SalesGenerator(args.seed, args.start_date, args.end_date)
+
+    start = time.perf_counter()
+    summary = generator.write(args.output, args.rows, file_format, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['rows']:,} rows ({summary['bytes'] / 1e6:.1f} MB) written to {summary['path']} "
+          f"in {elapsed:.1f}s ({summary['rows'] / max(elapsed, 1e-9):,.0f} rows/s)")
+    return 0
+
+
+def cmd_bench(args):
+    """Benchmark service methods and routes, optionally against a baseline"""
+    import os
+    from benchmarks.suite import compare, load_baseline, run_suite, save_baseline
+
+    def report(case_id, result):
+        print(f"{case_id:<60} {result['median_s'] * 1e3:>10.2f}ms {result['min_s'] * 1e3:>10.2f}ms "
+              f"{result['peak_bytes'] / 1e6:>9.1f}MB")
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    print(f"{'case':<60} {'median':>12} {'best':>12} {'peak mem':>11}")
+    results = run_suite(sizes, args.repeat, args.select, args.seed, progress=report)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.threshold, args.min_delta_ms / 1e3)
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bike Analytics backend utilities")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    snapshot = subparsers.add_parser('snapshot', help="Build the columnar snapshot of the CSV")
+    snapshot.add_argument('--csv', help="Source CSV (defaults to the usual lookup paths)")
+    snapshot.add_argument('--output', help="Snapshot base directory (defaults to <csv dir>/.snapshot)")
+    snapshot.add_argument('--force', action='store_true', help="Rebuild even if the snapshot is fresh")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    generate = subparsers.add_parser('generate', help="Generate a synthetic sales dataset")
+    generate.add_argument('--rows', type=int, default=1_000_000, help="Number of rows (default 1,000,000)")
+    generate.add_argument('--output', required=True, help="Output file (.csv or .parquet)")
+    generate.add_argument('--format', choices=['csv', 'parquet'], help="Output format (defaults to the file extension)")
+    generate.add_argument('--seed', type=int, default=0, help="Random seed (default 0)")
+    generate.add_argument('--start-date', default='2011-01-01', help="First order date (default 2011-01-01)")
+    generate.add_argument('--end-date', default='2016-07-31', help="Last order date (default 2016-07-31)")
+    generate.add_argument('--chunk-rows', type=int, default=1_000_000, help="Rows generated and written at a time")
+    generate.set_defaults(func=cmd_generate)
+
+    bench = subparsers.add_parser('bench', help="Benchmark service methods and routes on synthetic data")
+    bench.add_argument('--sizes', default='10000,100000,1000000', help="Comma-separated dataset sizes")
+    bench.add_argument('--repeat', type=int, default=5, help="Timed runs per case (default 5)")
+    bench.add_argument('-k', '--select', help="Only run cases whose id contains this text")
+    bench.add_argument('--seed', type=int, default=0, help="Seed of the synthetic datasets")
+    bench.add_argument('--baseline', default='benchmarks/baseline.json', help="Baseline file")
+    bench.add_argument('--save-baseline', action='store_true', help="Record the results as the new baseline")
+    bench.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown or memory growth (default 0.25)")
+    bench.add_argument('--min-delta-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this (default 1ms)")
+    bench.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import analytics, dashboard, kpi
+from app.routes import admin, analytics, dashboard, health, ingest, kpi, metrics, query, reports
+from app import config
+from app.services.data_service import data_service
+from app.services.executor_service import compute_executor
+from app.services.forecast_service import forecast_service
+from app.services.segmentation_service import segmentation_service
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in the background so the port is bound right away; /api routes answer 503 until done
+    data_service.start_loading()
+    if config.RELOAD_INTERVAL_SECONDS > 0:
+        data_service.start_reload_watcher(config.RELOAD_INTERVAL_SECONDS)
+    yield
+    compute_executor.shutdown()
+    forecast_service.shutdown()
+    segmentation_service.shutdown()
+    data_service.shutdown()
+
 app = FastAPI(
     title="Bike Company Analytics API",
     description="Data analytics API for bike sport company",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# 503 for API calls while the dataset loads; inside CORS so browsers can read the response
+app.add_middleware(health.ReadinessMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,18 +46,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps everything, CORS included
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(kpi.router, prefix="/api/kpi", tags=["kpi"])
+app.include_router(query.router, prefix="/api", tags=["query"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(ingest.router, prefix="/api/ingest", tags=["ingest"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(health.router, tags=["health"])
+if config.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 def read_root():
     return {"message": "Bike Company Analytics API is running"}
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
-
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
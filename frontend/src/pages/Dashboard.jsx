@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import KPICard from '../components/KPICard';
 import Chart from '../components/Chart';
 import FilterPanel from '../components/FilterPanel';
-import { kpiService, dashboardService, analyticsService } from '../services/api';
+import { dashboardService, analyticsService } from '../services/api';
 import { RefreshCw } from 'lucide-react';
 
 const Dashboard = () => {
@@ -21,28 +21,16 @@ const Dashboard = () => {
       setLoading(true);
       setError(null);
 
-      const requests = Object.keys(filters).length > 0
-        ? [
-            kpiService.getFilteredKPIs(filters),
-            dashboardService.getFilteredRevenueTrend(filters),
-            dashboardService.getFilteredGeographicData(filters),
-            dashboardService.getFilteredAgeGroupData(filters),
-            analyticsService.getFilteredSeasonalTrends(filters),
-          ]
-        : [
-            kpiService.getMainKPIs(),
-            dashboardService.getRevenueTrend(),
-            dashboardService.getGeographicData(),
-            dashboardService.getAgeGroupData(),
-            analyticsService.getSeasonalTrends(),
-          ];
-
-      const responses = await Promise.all(requests);
+      const response = await dashboardService.getBatch(
+        filters,
+        ['kpis', 'revenue_trend', 'geographic', 'age_groups', 'seasonal']
+      );
+      const panels = response.data;
       
-      setKpis(responses[0].data);
+      setKpis(panels.kpis);
       
       // Transform revenue data for chart
-      const revenueResponse = responses[1].data;
+      const revenueResponse = panels.revenue_trend;
       setRevenueData(
         revenueResponse.labels?.map((label, index) => ({
           name: label,
@@ -51,7 +39,7 @@ const Dashboard = () => {
       );
 
       // Transform geographic data for chart
-      const geoResponse = responses[2].data;
+      const geoResponse = panels.geographic;
       setGeographicData(
         geoResponse.countries?.map((country, index) => ({
           name: country,
@@ -60,7 +48,7 @@ const Dashboard = () => {
       );
 
       // Transform age group data for chart
-      const ageResponse = responses[3].data;
+      const ageResponse = panels.age_groups;
       setAgeGroupData(
         ageResponse.age_groups?.map((group, index) => ({
           name: group,
@@ -69,7 +57,7 @@ const Dashboard = () => {
       );
 
       // Transform seasonal data for chart
-      const seasonalResponse = responses[4].data;
+      const seasonalResponse = panels.seasonal;
       setSeasonalData(
         seasonalResponse.months?.map((month, index) => ({
           name: month.slice(0, 3), // Abbreviate month names
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import Chart from '../components/Chart';
-import { analyticsService } from '../services/api';
+import { analyticsService, reportsService } from '../services/api';
 import { 
   FileText, 
   Download, 
@@ -167,9 +167,25 @@ const Reports = () => {
     { id: 'alerts', name: 'Alertes', icon: AlertCircle }
   ];
 
-  const handleExport = (format) => {
-    // Simulate export functionality
-    alert(`Export en ${format} en cours de développement`);
+  const handleExport = async (format) => {
+    if (format !== 'CSV') {
+      // Simulate export functionality
+      alert(`Export en ${format} en cours de développement`);
+      return;
+    }
+
+    try {
+      const response = await reportsService.exportRows({}, 'csv');
+      const url = window.URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = 'ventes.csv';
+      link.click();
+      window.URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error('Export error:', err);
+      alert("Erreur lors de l'export des données");
+    }
   };
 
   const handlePrint = () => {
@@ -15,6 +15,7 @@ export const kpiService = {
   getFilteredKPIs: (filters) => api.post('/api/kpi/main', filters),
   getPerformanceMetrics: () => api.get('/api/kpi/performance'),
   getFilteredPerformanceMetrics: (filters) => api.post('/api/kpi/performance', filters),
+  comparePeriods: (filters, comparisons) => api.post('/api/kpi/compare', { filters, comparisons }),
 };
 
 // Dashboard Service
@@ -23,10 +24,13 @@ export const dashboardService = {
   getFilteredSummary: (filters) => api.post('/api/dashboard/summary', filters),
   getRevenueTrend: () => api.get('/api/dashboard/revenue-trend'),
   getFilteredRevenueTrend: (filters) => api.post('/api/dashboard/revenue-trend', filters),
+  getTimeseries: (filters, granularity = 'month', window) =>
+    api.post('/api/dashboard/timeseries', filters, { params: { granularity, window } }),
   getGeographicData: () => api.get('/api/dashboard/geographic'),
   getFilteredGeographicData: (filters) => api.post('/api/dashboard/geographic', filters),
   getAgeGroupData: () => api.get('/api/dashboard/age-groups'),
   getFilteredAgeGroupData: (filters) => api.post('/api/dashboard/age-groups', filters),
+  getBatch: (filters, panels) => api.post('/api/dashboard/batch', { filters, panels }),
 };
 
 // Analytics Service
@@ -40,4 +44,10 @@ export const analyticsService = {
   getFilterOptions: () => api.get('/api/analytics/filters/options'),
 };
 
+// Reports Service
+export const reportsService = {
+  exportRows: (filters, format = 'csv', gzip = false) =>
+    api.post('/api/reports/export', { filters, format, gzip }, { responseType: 'blob' }),
+};
+
 export default api;
\ No newline at end of file